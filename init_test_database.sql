@@ -1,3 +1,5 @@
+/** Lets the maintenance tasks return the free pages to the file system in small batches. */
+PRAGMA auto_vacuum = INCREMENTAL;
 
 /**
  ########################################
@@ -21,6 +23,8 @@ CREATE TABLE IF NOT EXISTS USER_ (
     FOREIGN KEY (department_id) REFERENCES Department(department_id)
 );
 
+CREATE INDEX IF NOT EXISTS user_department ON USER_ (department_id);
+
 
 CREATE TABLE IF NOT EXISTS JURY (
     jury_id INTEGER PRIMARY KEY,
@@ -45,9 +49,17 @@ CREATE TABLE IF NOT EXISTS Student (
     thesis_topic TEXT,
     graduation_status TEXT,
     is_thesis_sent BOOLEAN,
+    row_version INTEGER NOT NULL DEFAULT 0, /** Incremented on every update, see bind_database. */
     FOREIGN KEY(student_id) REFERENCES User_(user_id)
 );
 
+/** Writers that do not check the row version still move it forward. */
+CREATE TRIGGER IF NOT EXISTS student_row_version AFTER UPDATE ON Student
+WHEN NEW.row_version = OLD.row_version
+BEGIN
+    UPDATE Student SET row_version = OLD.row_version + 1 WHERE student_id = NEW.student_id;
+END;
+
 CREATE TABLE IF NOT EXISTS Advisor (
     advisor_id INTEGER PRIMARY KEY,
     doctoral_speciality TEXT,
@@ -62,6 +74,8 @@ CREATE TABLE IF NOT EXISTS Instructor (
     FOREIGN KEY (advisor_id) REFERENCES Advisor(advisor_id)
 );
 
+CREATE INDEX IF NOT EXISTS instructor_advisor ON Instructor (advisor_id);
+
 CREATE TABLE IF NOT EXISTS Recommended (
     recommendation_id INTEGER PRIMARY KEY,
     student_id INTEGER,
@@ -70,6 +84,8 @@ CREATE TABLE IF NOT EXISTS Recommended (
     FOREIGN KEY (advisor_id) REFERENCES Advisor(advisor_id)
 );
 
+CREATE INDEX IF NOT EXISTS recommended_student ON Recommended (student_id);
+
 CREATE TABLE IF NOT EXISTS Proposal (
     proposal_id INTEGER PRIMARY KEY,
     student_id INTEGER UNIQUE,
@@ -120,6 +136,8 @@ CREATE TABLE IF NOT EXISTS Member (
     FOREIGN KEY (jury_id) REFERENCES JURY(jury_id)
 );
 
+CREATE INDEX IF NOT EXISTS member_jury ON Member (jury_id);
+
 CREATE TABLE IF NOT EXISTS Defending (
     defending_id INTEGER PRIMARY KEY,
     dissertation_id INTEGER,
@@ -128,6 +146,8 @@ CREATE TABLE IF NOT EXISTS Defending (
     FOREIGN KEY (student_id) REFERENCES Student(student_id)
 );
 
+CREATE INDEX IF NOT EXISTS defending_dissertation ON Defending (dissertation_id);
+
 CREATE TABLE IF NOT EXISTS Evaluation (
     evaluation_id INTEGER PRIMARY KEY,
     dissertation_id INTEGER,
@@ -137,12 +157,159 @@ CREATE TABLE IF NOT EXISTS Evaluation (
                                           FOREIGN KEY (dissertation_id) REFERENCES Dissertation(dissertation_id)
 );
 
+/**
+  Tallies of the decisions made in each dissertation and its status,
+    updated in the same transaction as the approvals and evaluations.
+ */
+CREATE TABLE IF NOT EXISTS DissertationStatus(
+    dissertation_id INTEGER PRIMARY KEY,
+    member_count INTEGER NOT NULL DEFAULT 0,
+    correction_count INTEGER NOT NULL DEFAULT 0,
+    rejected_count INTEGER NOT NULL DEFAULT 0,
+    approved_count INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'Pending',
+    FOREIGN KEY (dissertation_id) REFERENCES Dissertation(dissertation_id)
+);
+
+CREATE INDEX IF NOT EXISTS dissertation_status ON DissertationStatus (status);
+
+/**
+  Summaries of the students' relations, a student's profile is read in a
+    single lookup. The triggers below refresh the summary of a student
+    whenever a row concerning them changes, see get_user.
+ */
+CREATE TABLE IF NOT EXISTS StudentSummary (
+    student_id INTEGER PRIMARY KEY,
+    latest_thesis_id INTEGER NOT NULL DEFAULT -1,
+    is_advisors_recommended BOOLEAN NOT NULL DEFAULT FALSE,
+    has_dissertation BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (student_id) REFERENCES Student(student_id)
+);
+
+CREATE VIEW IF NOT EXISTS StudentSummarySource AS
+SELECT Student.student_id,
+       IFNULL((SELECT Has.thesis_id FROM Has JOIN Thesis ON Thesis.thesis_id = Has.thesis_id
+               WHERE Has.student_id = Student.student_id
+               ORDER BY Thesis.submission_date DESC, Has.has_id DESC LIMIT 1), -1),
+       EXISTS (SELECT 1 FROM Instructor WHERE Instructor.student_id = Student.student_id)
+           OR EXISTS (SELECT 1 FROM Recommended WHERE Recommended.student_id = Student.student_id)
+           OR EXISTS (SELECT 1 FROM Proposal WHERE Proposal.student_id = Student.student_id),
+       EXISTS (SELECT 1 FROM Member WHERE Member.dissertation_id =
+           (SELECT dissertation_id FROM Defending WHERE Defending.student_id = Student.student_id
+            ORDER BY defending_id LIMIT 1))
+FROM Student;
+
+CREATE TRIGGER IF NOT EXISTS student_summary_insert AFTER INSERT ON Student
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = NEW.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS student_summary_delete AFTER DELETE ON Student
+BEGIN
+    DELETE FROM StudentSummary WHERE student_id = OLD.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS has_summary_insert AFTER INSERT ON Has
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = NEW.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS has_summary_delete AFTER DELETE ON Has
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = OLD.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS has_summary_update AFTER UPDATE OF student_id ON Has
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (OLD.student_id, NEW.student_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS instructor_summary_insert AFTER INSERT ON Instructor
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = NEW.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS instructor_summary_delete AFTER DELETE ON Instructor
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = OLD.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS instructor_summary_update AFTER UPDATE OF student_id ON Instructor
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (OLD.student_id, NEW.student_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS recommended_summary_insert AFTER INSERT ON Recommended
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = NEW.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS recommended_summary_delete AFTER DELETE ON Recommended
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = OLD.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS recommended_summary_update AFTER UPDATE OF student_id ON Recommended
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (OLD.student_id, NEW.student_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS proposal_summary_insert AFTER INSERT ON Proposal
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = NEW.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS proposal_summary_delete AFTER DELETE ON Proposal
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = OLD.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS proposal_summary_update AFTER UPDATE OF student_id ON Proposal
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (OLD.student_id, NEW.student_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS defending_summary_insert AFTER INSERT ON Defending
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = NEW.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS defending_summary_delete AFTER DELETE ON Defending
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id = OLD.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS defending_summary_update AFTER UPDATE OF student_id ON Defending
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (OLD.student_id, NEW.student_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS thesis_summary_update AFTER UPDATE OF submission_date ON Thesis
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (SELECT student_id FROM Has WHERE thesis_id = NEW.thesis_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS thesis_summary_delete AFTER DELETE ON Thesis
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (SELECT student_id FROM Has WHERE thesis_id = OLD.thesis_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS member_summary_insert AFTER INSERT ON Member
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (SELECT student_id FROM Defending WHERE dissertation_id = NEW.dissertation_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS member_summary_delete AFTER DELETE ON Member
+BEGIN
+    INSERT OR REPLACE INTO StudentSummary SELECT * FROM StudentSummarySource WHERE student_id IN (SELECT student_id FROM Defending WHERE dissertation_id = OLD.dissertation_id);
+END;
+
 /**
   This is a pair of Student and Advisors that has instructor relationship
     between each other.
  */
 INSERT INTO USER_ VALUES (0, 'Scott', 'Aaronson', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'studenttest@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (0, TRUE, TRUE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE);
+INSERT INTO Student VALUES (0, TRUE, TRUE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE, 0);
 INSERT INTO USER_ VALUES (1, 'Kathleen', 'Booth', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'advisortest@iyte.edu.tr', 0);
 INSERT INTO Advisor VALUES (1, 'Systems Programming');
 INSERT INTO Instructor VALUES (0, 0, 1);
@@ -156,9 +323,9 @@ INSERT INTO Department VALUES (0, 'Computer Engineering', 'Bilgisayar Mühendisl
 INSERT INTO USER_ VALUES (3, 'Harry', 'Bouwman', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'bouwman@iyte.edu.tr', 0);
 INSERT INTO Advisor VALUES (3, 'Operating Systems');
 INSERT INTO USER_ VALUES (4, 'Sherlock', 'Holmes', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'holmes@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (4, FALSE, TRUE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE);
+INSERT INTO Student VALUES (4, FALSE, TRUE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE, 0);
 INSERT INTO USER_ VALUES (5, 'John', 'Watson', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'watson@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (5, FALSE, TRUE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE);
+INSERT INTO Student VALUES (5, FALSE, TRUE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE, 0);
 INSERT INTO Proposal VALUES (0, 4, 3);
 INSERT INTO Proposal VALUES (1, 5, 3);
 
@@ -167,16 +334,16 @@ INSERT INTO Proposal VALUES (1, 5, 3);
   This is a student without an advisor, but she is recommended two.
  */
 INSERT INTO User_ VALUES (2, 'Barbara', 'Liskov', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'studenttest2@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (2, FALSE, FALSE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE);
+INSERT INTO Student VALUES (2, FALSE, FALSE, 2, 'Computer Engineering', 'Graph Visualisation', 'NA', FALSE, 0);
 INSERT INTO Recommended VALUES (0, 2, 1);
 INSERT INTO Recommended VALUES (1, 2, 3);
 
 INSERT INTO USER_ VALUES (6, 'Conan', 'Doyle', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'doyle@iyte.edu.tr', 0);
 INSERT INTO Advisor VALUES (6, 'Operating Systems');
 INSERT INTO User_ VALUES (7, 'James', 'Moriarty', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'moriarty@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (7, TRUE, TRUE, 2, 'Computer Engineering', NULL, 'NA', FALSE);
+INSERT INTO Student VALUES (7, TRUE, TRUE, 2, 'Computer Engineering', NULL, 'NA', FALSE, 0);
 INSERT INTO User_ VALUES (8, 'Mycroft', 'Holmes', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'holmes2@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (8, TRUE, TRUE, 2, 'Computer Engineering', NULL, 'NA', FALSE);
+INSERT INTO Student VALUES (8, TRUE, TRUE, 2, 'Computer Engineering', NULL, 'NA', FALSE, 0);
 INSERT INTO Instructor VALUES(1, 7, 6);
 INSERT INTO Instructor VALUES(2, 8, 6);
 
@@ -191,15 +358,15 @@ INSERT INTO Instructor VALUES(2, 8, 6);
 INSERT INTO USER_ VALUES (9, 'Agatha', 'Christie', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'christie@iyte.edu.tr', 0);
 INSERT INTO Advisor VALUES (9, 'Operating Systems');
 INSERT INTO User_ VALUES (10, 'Hercule', 'Poirot', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'poirot@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (10, FALSE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', FALSE);
+INSERT INTO Student VALUES (10, FALSE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', FALSE, 0);
 INSERT INTO User_ VALUES (11, 'Arthur', 'Hastings', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'hastings@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (11, FALSE, TRUE, 2, 'Computer Engineering', 'Robotics', 'NA', FALSE);
+INSERT INTO Student VALUES (11, FALSE, TRUE, 2, 'Computer Engineering', 'Robotics', 'NA', FALSE, 0);
 INSERT INTO User_ VALUES (12, 'Jane', 'Marple', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'marple@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (12, FALSE, TRUE, 2, 'Computer Engineering', 'Fault Tollerance', 'NA', FALSE);
+INSERT INTO Student VALUES (12, FALSE, TRUE, 2, 'Computer Engineering', 'Fault Tollerance', 'NA', FALSE, 0);
 INSERT INTO User_ VALUES (13, 'Harold', 'Japp', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'japp@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (13, FALSE, TRUE, 2, 'Computer Engineering', 'Embedded Systems', 'NA', FALSE);
+INSERT INTO Student VALUES (13, FALSE, TRUE, 2, 'Computer Engineering', 'Embedded Systems', 'NA', FALSE, 0);
 INSERT INTO User_ VALUES (14, 'Raymond', 'West', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'west@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (14, FALSE, TRUE, 2, 'Computer Engineering', 'Assembly Language', 'NA', FALSE);
+INSERT INTO Student VALUES (14, FALSE, TRUE, 2, 'Computer Engineering', 'Assembly Language', 'NA', FALSE, 0);
 
 INSERT INTO Proposal VALUES (2, 10, 9);
 INSERT INTO Proposal VALUES (3, 11, 9);
@@ -208,7 +375,7 @@ INSERT INTO Proposal VALUES (5, 13, 9);
 INSERT INTO Proposal VALUES (6, 14, 9);
 
 INSERT INTO User_ VALUES (15, 'Sophia', 'Leonides', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'leonides@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (15, FALSE, FALSE, 2, 'Computer Engineering', NULL, 'NA', FALSE);
+INSERT INTO Student VALUES (15, FALSE, FALSE, 2, 'Computer Engineering', NULL, 'NA', FALSE, 0);
 
 INSERT INTO Recommended VALUES (2, 15, 9);
 
@@ -218,7 +385,7 @@ INSERT INTO USER_ VALUES (16, 'Ariadne', 'Oliver', '$pbkdf2-sha256$29000$xNh7j3H
 INSERT INTO Advisor VALUES (16, 'Character Encoding');
 INSERT INTO Jury VALUES (16, TRUE, 'Izmir Institute of Technology', '+90 5XX XXX XX XX', FALSE);
 INSERT INTO User_ VALUES (17, 'Jane', 'Grey', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'grey@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (17, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE);
+INSERT INTO Student VALUES (17, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE, 0);
 INSERT INTO Thesis VALUES (0, 'theses/grey_thesis_example0.pdf', 'grey_thesis_example0.pdf', 15, 'Artificial Intelligence', 1621129273);
 INSERT INTO Has VALUES (0, 0, 17); /** Add an example thesis.*/
 INSERT INTO Thesis VALUES (1, 'theses/grey_thesis_example1.pdf', 'grey_thesis_example1.pdf', 10, 'Artificial Intelligence', 1621129275);
@@ -244,9 +411,9 @@ INSERT INTO Member VALUES (1, 1, 20);
 INSERT INTO Member VALUES (6, 0, 16);
 
 INSERT INTO User_ VALUES (21, 'Elinor Katharine', 'Carlisle', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'katharine@std.iyte.edu.tr', 1);
-INSERT INTO Student VALUES (21, TRUE, TRUE, 2, 'Medieval History', 'Danelaw', 'NA', FALSE);
+INSERT INTO Student VALUES (21, TRUE, TRUE, 2, 'Medieval History', 'Danelaw', 'NA', FALSE, 0);
 INSERT INTO User_ VALUES (22, 'Mary', 'Gerrard', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'gerrard@std.iyte.edu.tr', 1);
-INSERT INTO Student VALUES (22, TRUE, TRUE, 2, 'Roman History', 'Third Century Crisis', 'NA', FALSE);
+INSERT INTO Student VALUES (22, TRUE, TRUE, 2, 'Roman History', 'Third Century Crisis', 'NA', FALSE, 0);
 
 INSERT INTO User_ VALUES (23, 'Jessie', 'Hopkins', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'hopkins@iyte.edu.tr', 1);
 INSERT INTO Advisor VALUES (23, 'Bronze Age Collapse');
@@ -279,16 +446,16 @@ INSERT INTO Defending VALUES (3, 3, 21);
 INSERT INTO Member VALUES (5, 3, 20);
 
 INSERT INTO User_ VALUES (26, 'Bob', 'Nathan', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'nathan@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (26, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', FALSE);
+INSERT INTO Student VALUES (26, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', FALSE, 0);
 INSERT INTO Instructor VALUES (6, 26, 16);
 INSERT INTO Thesis VALUES (2, 'theses/bob_nathan_thesis.pdf', 'artificial_intelligence_in_speedrunning.pdf', 10, 'Artificial Intelligence', 1621129275);
 INSERT INTO Has VALUES (2, 2, 26); /** Add another example thesis.*/
 
 INSERT INTO User_ VALUES (27, 'Ged', 'Sparrowhawk', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'sparrowhawk@std.iyte.edu.tr', 1);
-INSERT INTO Student VALUES (27, FALSE, FALSE, 2, 'History', 'Earthsea History Before Erreth-Akbe', 'NA', FALSE);
+INSERT INTO Student VALUES (27, FALSE, FALSE, 2, 'History', 'Earthsea History Before Erreth-Akbe', 'NA', FALSE, 0);
 
 INSERT INTO User_ VALUES (28, 'Tenar', 'Atuan', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'atuan@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (28, FALSE, FALSE, 2, 'Computer Engineering', 'Advanced Raycasting', 'NA', FALSE);
+INSERT INTO Student VALUES (28, FALSE, FALSE, 2, 'Computer Engineering', 'Advanced Raycasting', 'NA', FALSE, 0);
 
 INSERT INTO User_ VALUES (29, 'Emily', 'Inglethorp', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'inglethorp@iyte.edu.tr', 0);
 INSERT INTO Advisor VALUES (29, 'Bioinformatics');
@@ -299,7 +466,7 @@ INSERT INTO Advisor VALUES (30, 'Computer Chess');
 INSERT INTO JURY VALUES (30, TRUE, 'Izmir Institute of Technology', '+90 5XX XXX XX XX', FALSE);
 
 INSERT INTO User_ VALUES (31, 'Jack', 'Renauld', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'renauld@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (31, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE);
+INSERT INTO Student VALUES (31, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE, 0);
 INSERT INTO Thesis VALUES (3, 'theses/example_thesis_copy.pdf', 'example_thesis.pdf', 15, 'Artificial Intelligence', 1621129273);
 INSERT INTO Instructor(student_id, advisor_id) VALUES (31, 30);
 INSERT INTO Has VALUES (3, 3, 31); /** Add an example thesis.*/
@@ -309,7 +476,7 @@ INSERT INTO Member VALUES (7, 4, 20);
 INSERT INTO Member VALUES (8, 4, 30);
 
 INSERT INTO User_ VALUES (32, 'Denise', 'Oulard', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'oulard@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (32, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE);
+INSERT INTO Student VALUES (32, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE, 0);
 INSERT INTO Instructor(student_id, advisor_id) VALUES (32, 30);
 INSERT INTO Thesis VALUES (4, 'theses/example_thesis_copy2.pdf', 'example_thesis2.pdf', 15, 'Artificial Intelligence', 1621129273);
 INSERT INTO Has VALUES (4, 4, 32); /** Add an example thesis.*/
@@ -319,7 +486,7 @@ INSERT INTO Member VALUES (9, 5, 20);
 INSERT INTO Member VALUES (10, 5, 30);
 
 INSERT INTO User_ VALUES (33, 'Françoise', 'Arrichet', '$pbkdf2-sha256$29000$xNh7j3HunXMuxRgDAGBMyQ$Z8D9vpTaauX/jIxrgxtCkba83F/rVI1LeYAtpHCIhRg', 'arrichet@std.iyte.edu.tr', 0);
-INSERT INTO Student VALUES (33, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE);
+INSERT INTO Student VALUES (33, TRUE, TRUE, 2, 'Computer Engineering', 'Artificial Intelligence', 'NA', TRUE, 0);
 INSERT INTO Instructor(student_id, advisor_id) VALUES (33, 30);
 INSERT INTO Thesis VALUES (5, 'theses/example_thesis_copy3.pdf', 'example_thesis3.pdf', 15, 'Artificial Intelligence', 1621129273);
 INSERT INTO Has VALUES (5, 5, 33); /** Add an example thesis.*/
@@ -327,3 +494,24 @@ INSERT INTO Dissertation VALUES (6, 1620129275, FALSE); /** Add a dissertation.
 INSERT INTO Defending VALUES (6, 6, 33);
 INSERT INTO Member VALUES (11, 6, 20);
 INSERT INTO Member VALUES (12, 6, 30);
+
+/** Tally the decisions made in each dissertation, see DissertationStatus. */
+INSERT OR REPLACE INTO DissertationStatus
+SELECT dissertation_id,
+       (SELECT COUNT(*) FROM Member WHERE Member.dissertation_id = Dissertation.dissertation_id),
+       (SELECT COUNT(*) FROM Evaluation WHERE Evaluation.dissertation_id = Dissertation.dissertation_id
+        AND evaluation = 'Correction'),
+       (SELECT COUNT(*) FROM Evaluation WHERE Evaluation.dissertation_id = Dissertation.dissertation_id
+        AND evaluation = 'Rejected'),
+       (SELECT COUNT(*) FROM Evaluation WHERE Evaluation.dissertation_id = Dissertation.dissertation_id
+        AND evaluation = 'Approved'),
+       'Pending'
+FROM Dissertation;
+
+UPDATE DissertationStatus SET status = CASE
+    WHEN NOT (SELECT is_approved FROM Dissertation
+              WHERE Dissertation.dissertation_id = DissertationStatus.dissertation_id) THEN 'Pending'
+    WHEN correction_count + rejected_count + approved_count != member_count THEN 'Undecided'
+    WHEN correction_count >= rejected_count AND correction_count >= approved_count THEN 'Correction'
+    WHEN rejected_count >= approved_count THEN 'Rejected'
+    ELSE 'Approved' END;
@@ -2,15 +2,20 @@
 This file includes the app routes.
 """
 from datetime import datetime, timezone, timedelta
+import click
 from os import getenv, urandom, remove
 from flask_cors import CORS
 from flask import Flask
 from flask_jwt_extended import JWTManager, create_access_token, set_access_cookies, get_jwt_identity, get_jwt
 
 from mbsbackend.blueprints.form_routes import create_form_routes
-from mbsbackend.datatypes.classes.user_classes import User_
+from mbsbackend.datatypes.classes.user_classes import Advisor, User_, departments
+from mbsbackend.datatypes.analytics import global_analytics
+from mbsbackend.datatypes.archive import archive_graduated_students
 from mbsbackend.datatypes.classes.user_utility import convert_department, get_user
-from mbsbackend.datatypes.database import global_query_handler
+from mbsbackend.datatypes.database import global_query_handler, ConcurrentUpdateException, QueryDeadlineException
+from mbsbackend.datatypes.maintenance import global_maintenance
+from mbsbackend.datatypes.migrations import migrate_database
 from mbsbackend.external_services.plagiarism_api import PlagiarismManager
 from mbsbackend.server_internals.authentication import authenticate
 from mbsbackend.server_internals.consants import version_number
@@ -42,11 +47,87 @@ def create_app() -> Flask:
     app.register_blueprint(create_login_routes())
     app.register_blueprint(create_recommendations_routes())
     app.register_blueprint(create_form_routes())
+    app.register_blueprint(create_dashboard_routes())
+
+    migrate_database()  # Fills the tables a database initialised by an earlier version lacks.
+    departments.load()  # Reference data is read once, rather than for every serialised user.
+
+    if getenv("FLASK_DB_MAINTENANCE_INTERVAL") or getenv("FLASK_DB_BACKUP_DIRECTORY") \
+            or getenv("FLASK_DB_ANALYTICS_INTERVAL"):
+        global_maintenance.start()  # Runs in the background, only once per process.
+
+    @app.cli.command('db-maintenance')
+    def run_database_maintenance():
+        """
+        Run the database maintenance now and print what was done.
+        """
+        for step in global_maintenance.run():
+            print(f"{step.database}: {step.step} took {step.duration:.3f} s, {step.detail}")
+
+    @app.cli.command('db-backup')
+    @click.argument('directory', default='backups')
+    def back_up_database(directory):
+        """
+        Back up the database to a directory while the app keeps running.
+        """
+        for step in global_maintenance.backup(directory):
+            print(f"{step.database}: {step.detail} Took {step.duration:.3f} s.")
+
+    @app.cli.command('db-analytics')
+    def export_analytics():
+        """
+        Export the analytics snapshot the statistics are computed from.
+        """
+        global_maintenance.analytics = global_maintenance.analytics or global_analytics
+        step = global_maintenance.export_analytics()
+        print(f"{step.detail} Took {step.duration:.3f} s.")
+
+    @app.cli.command('db-provision-juries')
+    @click.argument('advisor_ids', nargs=-1, type=int)
+    def provision_juries(advisor_ids):
+        """
+        Make the given advisors, or every advisor, that are not jury members yet ones.
+        """
+        print(f"Made {Advisor.provision_juries(list(advisor_ids) or None)} advisors jury members.")
+
+    @app.cli.command('db-migrate')
+    def migrate():
+        """
+        Fill the tables a database initialised by an earlier version lacks.
+        """
+        print(f"Filled {migrate_database()} rows.")
+
+    @app.cli.command('db-archive')
+    def archive_graduates():
+        """
+        Move the records of the graduated students to the archive.
+        """
+        print(f"Archived {archive_graduated_students()} graduated students.")
 
     @app.route('/')
     def test_url():
         return f"Server up! {version_number}.", 200
 
+    query_budget = float(getenv("FLASK_DB_REQUEST_BUDGET_MS", "10000")) / 1000
+
+    @app.before_request
+    def start_query_budget():
+        global_query_handler.set_time_budget(query_budget)
+        global_query_handler.begin_read_scope()  # Reads of a request see a single snapshot.
+
+    @app.teardown_request
+    def end_query_budget(exception):
+        global_query_handler.set_time_budget(None)
+        global_query_handler.end_read_scope()
+
+    @app.errorhandler(QueryDeadlineException)
+    def query_deadline_exceeded(error):
+        return {"msg": "Server is busy, try again later."}, 503
+
+    @app.errorhandler(ConcurrentUpdateException)
+    def concurrent_update(error):
+        return {"msg": "Record was modified by another request, try again."}, 409
+
     @jwt.user_lookup_loader
     def curr_user(header, payload) -> User_:
         return User_.fetch(payload['sub']['user_id'])
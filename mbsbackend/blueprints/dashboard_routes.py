@@ -0,0 +1,56 @@
+"""
+This file includes the app routes of the users' dashboards.
+"""
+from typing import Tuple
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required, current_user
+from mbsbackend.datatypes.classes.user_classes import Advisor, DBR, Jury
+from mbsbackend.datatypes.analytics import global_analytics, department_statistics, statistics_by_department
+from mbsbackend.datatypes.dashboards import advisor_dashboard, dbr_dashboard, jury_dashboard
+from mbsbackend.server_internals.verification import returns_json
+
+
+def create_dashboard_routes() -> Blueprint:
+
+    dashboard_routes = Blueprint('dashboard_routes', __name__)
+
+    @dashboard_routes.route('/dashboard', methods=['GET'])
+    @returns_json
+    @jwt_required()
+    def get_dashboard() -> Tuple[dict, int]:
+        """
+        Get the front page of an advisor, a jury member or a DBR.
+        """
+        user = current_user.downcast()
+        if isinstance(user, Advisor):
+            return advisor_dashboard(user.advisor_id, user.department_id, Jury.has(user.advisor_id)), 200
+        elif isinstance(user, Jury):
+            return jury_dashboard(user.jury_id), 200
+        elif isinstance(user, DBR):
+            return dbr_dashboard(user.department_id), 200
+        return {"msg": "Only advisors, jury members and DBRs have dashboards."}, 403
+
+    @dashboard_routes.route('/statistics', methods=['GET'])
+    @returns_json
+    @jwt_required()
+    def get_statistics() -> Tuple[dict, int]:
+        """
+        Get the statistics of the department of a DBR, and the headline
+            statistics of every department, as of the last analytics export.
+        """
+        dbr = current_user.downcast()
+        if not isinstance(dbr, DBR):
+            return {"msg": "Only DBRs can see the statistics."}, 403
+        try:
+            bins = int(request.args.get('bins', 10))
+        except ValueError:
+            return {"msg": "Bins must be an integer."}, 400
+        if not 0 < bins <= 100:
+            return {"msg": "Bins must be between 1 and 100."}, 400
+        columns = global_analytics.load()
+        return {"exported_at": global_analytics.exported_at,
+                "department": department_statistics(columns, dbr.department_id, bins),
+                "departments": {str(department_id): statistics
+                                for department_id, statistics in statistics_by_department(columns).items()}}, 200
+
+    return dashboard_routes
@@ -1,12 +1,14 @@
 """
 This file includes the app routes.
 """
+import time
 from typing import Tuple, List
 from flask import request, Blueprint
 from flask_jwt_extended import jwt_required, current_user
 from mbsbackend.datatypes.classes.user_classes import Student, Advisor, DBR, Jury
 from mbsbackend.datatypes.classes.user_utility import get_user
 from mbsbackend.datatypes.classes.thesis_classes import Evaluation
+from mbsbackend.datatypes.scheduling import busy_jury_members, free_slots
 from mbsbackend.external_services.obs_api import OBSApi
 from mbsbackend.server_internals.verification import returns_json, full_json
 
@@ -25,29 +27,41 @@ def create_dissertation_routes():
         advisor = current_user.downcast()
         if not isinstance(advisor, Advisor):
             return {"msg": "Only advisor can view the jury member list."}, 403
-        advisors: List[Advisor] = Advisor.fetch_where('department_id', advisor.department_id)
-        for advisor in advisors:
-            if not advisor.jury_credentials:
-                advisor.create_jury()
-        jury_members = advisors
-        outside_jury_members = Jury.fetch_where('department_id', 2)  # Out of faculty members are given 2 by tradition.
-        jury_members.extend(outside_jury_members)
-        return {"jury_members": [jury.user_id for jury in jury_members]}, 200
+        return {"jury_members": Jury.roster_of(advisor.department_id)}, 200
 
     @dissertation_routes.route('/jury', methods=['POST'])
-    @full_json(requiried_keys=('name_', 'surname', 'email', 'institution', 'phone_number'))
+    @full_json(required_keys=('name_', 'surname', 'email', 'institution', 'phone_number'),
+               key_types={'name_': str, 'surname': str, 'email': str, 'institution': str, 'phone_number': str})
     @jwt_required()
-    def post_jury() -> Tuple[dict, int]:
+    def post_jury(payload: dict) -> Tuple[dict, int]:
         """
         An advisor can add a new, external Jury member to the system.
         """
         advisor = current_user.downcast()
-        req: dict = request.json
         if not isinstance(advisor, Advisor):
             return {"msg": "Only advisor add a new jury member."}, 403
-        new_jury_member = Jury.add_new_jury(req, advisor.department_id)
+        new_jury_member = Jury.add_new_jury(payload, advisor.department_id)
         return get_user(Jury, new_jury_member.jury_id), 201
 
+    @dissertation_routes.route('/jury/slots', methods=['GET'])
+    @returns_json
+    @jwt_required()
+    def get_free_slots() -> Tuple[dict, int]:
+        """
+        Suggest dissertation dates at which every one of the given jury
+            members, and the advisor, is free.
+        """
+        advisor = current_user.downcast()
+        if not isinstance(advisor, Advisor):
+            return {"msg": "Only advisor can schedule dissertations."}, 403
+        try:
+            jury_members = [int(jury_id) for jury_id in request.args.get('jury_members', '').split(',') if jury_id]
+            after = int(request.args.get('after', time.time()))
+            count = int(request.args.get('count', 5))
+        except ValueError:
+            return {"msg": "Jury members, after and count must be integers."}, 400
+        return {"slots": free_slots([advisor.advisor_id, *jury_members], after, count)}, 200
+
     @dissertation_routes.route('/jury/<jury_id>', methods=['GET'])
     @returns_json
     @jwt_required()
@@ -85,9 +99,11 @@ def create_dissertation_routes():
             return {"msg": "Student does not have a dissertation."}, 404
 
     @dissertation_routes.route('/dissertation/<student_id>', methods=['POST'])
-    @full_json(required_keys=('jury_members', 'dissertation_date'))
+    @full_json(required_keys=('jury_members', 'dissertation_date'),
+               key_types={'jury_members': List[int], 'dissertation_date': int, 'allow_conflicts': bool,
+                          'new_members': List[dict]})
     @jwt_required()
-    def create_new_dissertation(student_id) -> Tuple[dict, int]:
+    def create_new_dissertation(student_id, payload: dict) -> Tuple[dict, int]:
         """
         Create a new dissertation.
 
@@ -100,20 +116,25 @@ def create_dissertation_routes():
             return {'msg': 'Requires advisor user to do this.'}, 403
         elif not Student.has(id_):
             return {'msg': 'Student not found.'}, 404
-        student = Student.fetch(id_)
-        if student.advisor.advisor_id != advisor.advisor_id:
+        elif not advisor.is_advisor_of(id_):
             return {"msg": "Not the advisor of this student."}, 403
-        elif student.dissertation_info:
+        student = Student.fetch(id_)
+        if student.dissertation_info:
             return {"msg": "Student already has one [possibly proposed] dissertation."}, 409
-        if not Jury.has(advisor.advisor_id):
-            advisor.create_jury()  # Generate Jury portion of an advisor if not already declared.
-        jury_members = request.json.get('jury_members', [])  # By default empty.
-        if 'new_members' in request.json:
+        jury_members = payload['jury_members']
+        busy_members = busy_jury_members([advisor.advisor_id, *jury_members], payload['dissertation_date'])
+        if busy_members and not payload.get('allow_conflicts', False):
+            return {"msg": "Jury members have another dissertation at this date.", "busy_jury_ids": busy_members}, 409
+        # Advisors listed by GET /jury, including this one, may not be Jury members yet.
+        Advisor.provision_juries([advisor.advisor_id, *jury_members])
+        if 'new_members' in payload:
             jury_members.extend(Jury.add_new_jury(new_member, advisor.department_id).jury_id
-                                for new_member in request.json['new_members'])
-        dissertation = student.create_dissertation_for(jury_members, request.json['dissertation_date'])
+                                for new_member in payload['new_members'])
+        dissertation = student.create_dissertation_for(jury_members, payload['dissertation_date'])
         if dissertation is None:
             return {"msg": "Jury member not found"}, 404
+        elif busy_members:  # Created anyway, as it was asked for.
+            return {"msg": "Dissertation is created, with conflicts.", "busy_jury_ids": busy_members}, 201
         return {"msg": "Dissertation is created."}, 201
 
     @dissertation_routes.route('/dissertation/<student_id>', methods=['DELETE'])
@@ -151,20 +172,19 @@ def create_dissertation_routes():
             return {"msg": "You are unauthorised for this action."}, 403
         if student.dissertation_info:
             dissertation = student.dissertation
-            dissertation.is_approved = True
-            dissertation.update()  # Delete the object.
+            dissertation.approve()
             return student.dissertation_info, 200
         else:
             return {"msg": "Student does not have dissertation"}, 409
 
     @dissertation_routes.route('/evaluation/<student_id>', methods=['POST'])
-    @full_json(required_keys=('evaluation',))
+    @full_json(required_keys=('evaluation',), key_types={'evaluation': str})
     @jwt_required()
-    def post_evaluation(student_id) -> Tuple[dict, int]:
+    def post_evaluation(student_id, payload: dict) -> Tuple[dict, int]:
         """
         Evaluate a thesis as a jury member.
         """
-        if request.json['evaluation'] not in ('Correction', 'Rejected', 'Approved'):
+        if payload['evaluation'] not in ('Correction', 'Rejected', 'Approved'):
             return {"msg": "Invalid evaluation."}, 409
         user = current_user.downcast()
         id_ = int(student_id)
@@ -174,8 +194,7 @@ def create_dissertation_routes():
         if (not isinstance(user, Advisor) and not isinstance(user, Jury)) or not user.can_evaluate(student):
             return {"msg": "Unauthorized"}, 403
         dissertation = student.dissertation
-        evaluation = Evaluation(-1, dissertation.dissertation_id, user.user_id, request.json['evaluation'])
-        evaluation.create()
+        dissertation.evaluate(user.user_id, payload['evaluation'])
         return {"msg": "Created."}, 201
 
     @dissertation_routes.route('/evaluation/<student_id>', methods=['GET'])
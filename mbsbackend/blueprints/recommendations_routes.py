@@ -2,10 +2,11 @@
 This file includes the app routes used for recommending users.
 """
 from typing import Tuple
-from flask import request, Blueprint
+from flask import Blueprint
 from flask_jwt_extended import jwt_required, current_user
 from mbsbackend.datatypes.classes.user_classes import Student, DBR
 from mbsbackend.datatypes.classes.user_classes import Recommended
+from mbsbackend.datatypes.recommendations import recommend_advisors
 from mbsbackend.server_internals.verification import returns_json, full_json
 
 
@@ -44,10 +45,28 @@ def create_recommendations_routes() -> Blueprint:
             return {"msg": "Unauthorized"}, 403
         return {"students_without_recommendations": dbr.students_without_recommendations}, 200
 
+    @recommendations_routes.route('/recommendations/needed', methods=['POST'])
+    @full_json(key_types={'count': int})
+    @jwt_required()
+    def recommend_for_students_in_need(payload: dict) -> Tuple[dict, int]:
+        """
+        Recommend advisors to every student that needs recommendations, as DBR,
+            by matching their thesis topics to the advisors' specialties.
+        """
+        dbr = current_user.downcast()
+        if not isinstance(dbr, DBR):
+            return {"msg": "Unauthorised"}, 403
+        count = payload.get('count', 3)
+        if count < 1:
+            return {"msg": "Count must be a positive integer."}, 400
+        recommendations = recommend_advisors(dbr.students_without_recommendations, dbr.department_id, count)
+        return {"recommendations": {str(student_id): advisor_ids
+                                    for student_id, advisor_ids in recommendations.items()}}, 201
+
     @recommendations_routes.route('/recommendations/<student_id>', methods=['POST'])
-    @full_json(required_keys=('advisor_id',))
+    @full_json(required_keys=('advisor_id',), key_types={'advisor_id': int})
     @jwt_required()
-    def post_recommendations(student_id: str) -> Tuple[dict, int]:
+    def post_recommendations(student_id: str, payload: dict) -> Tuple[dict, int]:
         """
         Post a new recommendation for a student, as DBR.
         """
@@ -60,7 +79,7 @@ def create_recommendations_routes() -> Blueprint:
         student: Student = Student.fetch(id_)
         if student.department_id != dbr.department_id:
             return {"msg": "Unauthorised to view this student"}, 403
-        new_recommendation = Recommended(-1, int(student_id), request.json['advisor_id'])
+        new_recommendation = Recommended(-1, int(student_id), payload['advisor_id'])
         new_recommendation.create()
         return {"msg": "Recommendation created."}, 201
 
@@ -1,12 +1,11 @@
 from typing import Tuple, Union
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, current_user
-from dataclasses import asdict
 
-from mbsbackend.datatypes.classes.thesis_classes import Thesis
-from mbsbackend.datatypes.classes.user_classes import Student, Advisor, Jury, DBR
+from mbsbackend.datatypes.classes.user_classes import Student, Advisor, Jury, DBR, Dissertation
+from mbsbackend.datatypes.classes.thesis_classes import dissertation_statuses
 from mbsbackend.datatypes.classes.user_relationships import Proposal
-from mbsbackend.datatypes.classes.user_utility import get_user
+from mbsbackend.datatypes.classes.user_utility import get_user, get_archived_user
 from mbsbackend.server_internals.consants import forbidden_fields
 from mbsbackend.server_internals.verification import returns_json, full_json
 
@@ -23,6 +22,8 @@ def create_student_approval_routes() -> Blueprint:
         Get user information of a specific student.
         """
         student = get_user(Student, int(student_id))
+        if student is None:
+            student = get_archived_user(Student, int(student_id))  # Graduated students are archived.
         if student is None:
             return {'msg': 'Student not found.'}, 400
         return student, 200
@@ -30,7 +31,7 @@ def create_student_approval_routes() -> Blueprint:
     @student_approval_routes.route('/students/<student_id>', methods=["PATCH"])
     @full_json()
     @jwt_required()
-    def update_student_information(student_id: str) -> Tuple[dict, int]:
+    def update_student_information(student_id: str, payload: dict) -> Tuple[dict, int]:
         """
         Update information on a student, given that the student is the
             current user.
@@ -43,17 +44,15 @@ def create_student_approval_routes() -> Blueprint:
             return {"msg": "No such student."}, 404
         student = Student.fetch(id_)
         if isinstance(user, Student) and user.student_id == id_:
-            payload = request.json
             acceptable_fields = [field for field in payload if
                                  field not in forbidden_fields["Student"] and field in Student.__dataclass_fields__]
             for field in acceptable_fields:
                 setattr(user, field, payload[field])  # Update the field of the user.
             user.update()  # Update it in the database.
-        elif isinstance(user, Advisor) and user.advisor_id == student.advisor.advisor_id:
-            payload = request.json
+        elif isinstance(user, Advisor) and user.is_advisor_of(id_):
             acceptable_fields = [field for field in payload if
                                  field not in forbidden_fields["StudentAdvisor"] and field in Student.__dataclass_fields__]
-            if 'is_thesis_sent' in payload and Thesis.fetch(student.latest_thesis_id).plagiarism_ratio >= 20:
+            if 'is_thesis_sent' in payload and student.latest_thesis.plagiarism_ratio >= 20:
                 return {"msg": "Cannot submit thesis with plagiarism ratio larger than 15 percent."}, 409
             if 'thesis_topic' in payload and student.is_thesis_sent:
                 return {"msg": "Cannot change thesis topic after submitting thesis."}, 409
@@ -92,8 +91,8 @@ def create_student_approval_routes() -> Blueprint:
         recommendations = student.recommendations
         if not recommendations:
             return {"msg": "No recommended advisors found."}, 404
-        # If there are recommendations, convert them to dictionaries and return them as JSON.
-        return [asdict(recommendation) for recommendation in recommendations], 200
+        # If there are recommendations, return them, they are serialized when converted to JSON.
+        return recommendations, 200
 
     @student_approval_routes.route('/proposals', methods=['GET'])
     @returns_json
@@ -106,8 +105,7 @@ def create_student_approval_routes() -> Blueprint:
         advisor = current_user.downcast()
         if not isinstance(advisor, Advisor):  # If the current user is not an advisor.
             return {"msg": "Only the advisors can see their proposals."}, 403
-        proposals = advisor.proposals
-        return [asdict(proposal) for proposal in proposals], 200
+        return advisor.proposals, 200
 
     @student_approval_routes.route('/proposals/<proposal_id>', methods=['DELETE'])
     @returns_json
@@ -133,15 +131,14 @@ def create_student_approval_routes() -> Blueprint:
         return {"msg": "Proposal deleted."}, 204
 
     @student_approval_routes.route('/proposals', methods=["POST"])
-    @full_json(required_keys=('advisor_id',))
+    @full_json(required_keys=('advisor_id',), key_types={'advisor_id': int})
     @jwt_required()
-    def create_new_proposal() -> Tuple[dict, int]:
+    def create_new_proposal(payload: dict) -> Tuple[dict, int]:
         """
         A student user may create a proposal to an advisor
             user, provided that they're in their recommended list of
             advisors.
         """
-        payload = request.json
         student = current_user.downcast()
         if not isinstance(student, Student):
             return {"msg": "Unauthorised."}, 403
@@ -160,7 +157,7 @@ def create_student_approval_routes() -> Blueprint:
             student.update()
             proposal_ = Proposal(-1, student.student_id, advisor_id)
             proposal_.create()
-            return asdict(proposal_), 201
+            return proposal_.serialize(), 201
 
     @student_approval_routes.route('/proposals/<proposal_id>', methods=["PUT"])
     @returns_json
@@ -180,8 +177,8 @@ def create_student_approval_routes() -> Blueprint:
             return {"msg": "Student already accepted by another advisor."}, 409
         elif advisor.advisor_id != proposal.advisor_id:
             return {"msg": "Unauthorised advisor."}, 403
-        proposal.delete()
         advisor.set_advisor_to(student)  # Set the advisor's state.
+        proposal.delete()
         return {"msg": "Successful"}, 200
 
     @student_approval_routes.route('/students', methods=['GET'])
@@ -189,12 +186,19 @@ def create_student_approval_routes() -> Blueprint:
     @jwt_required()
     def get_managed_students() -> Tuple[Union[list, dict], int]:
         """
-        Get a list of Students managed by this advisor.
+        Get a list of Students managed by this advisor, if a status is given
+            only the students whose dissertations have that status are listed.
         """
         user = current_user.downcast()
         return_dict = {"students": [], "defenders": []}
         if not any(isinstance(user, accepted) for accepted in (Advisor, DBR, Jury)):  # If the current user is not an advisor.
             return {"msg": "Only the advisors can see their proposals."}, 403
+        status = request.args.get('status')
+        if status is not None and status not in dissertation_statuses:
+            return {"msg": "Invalid status."}, 400
+        elif isinstance(user, DBR) and status is not None:
+            return_dict['students'] = Dissertation.students_with_status(status, user.department_id)
+            return return_dict, 200
         if any(isinstance(user, one_of) for one_of in (Advisor, DBR)):
             return_dict['students'] = user.students
         elif isinstance(user, Jury):
@@ -202,6 +206,10 @@ def create_student_approval_routes() -> Blueprint:
         if isinstance(user, Advisor) and user.jury_credentials:
             jury_version = user.jury_credentials
             return_dict['defenders'] = jury_version.students
+        if status is not None:
+            with_status = set(Dissertation.students_with_status(status))
+            return_dict = {key: [student_id for student_id in students if student_id in with_status]
+                           for key, students in return_dict.items()}
         return return_dict, 200
 
     @student_approval_routes.route('/students/advisor/<student_id>', methods=['GET'])
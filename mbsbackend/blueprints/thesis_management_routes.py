@@ -6,12 +6,11 @@ from os import remove
 from typing import Tuple, Union
 from flask import Blueprint, request, Response, send_file
 from flask_jwt_extended import jwt_required, current_user
-from dataclasses import asdict
-
 from werkzeug.utils import secure_filename
 
 from mbsbackend.datatypes.classes.user_classes import Student
 from mbsbackend.datatypes.classes.thesis_classes import Thesis, Has
+from mbsbackend.datatypes.database import global_query_handler
 from mbsbackend.external_services.plagiarism_api import PlagiarismManager
 from mbsbackend.server_internals.verification import returns_json
 
@@ -45,9 +44,7 @@ def create_thesis_management_routes(plagiarism_api: PlagiarismManager) -> Bluepr
             return {"msg": "Thesis not found."}, 404
         # TODO: If there is time we should check further for user's identity as well.
         thesis = Thesis.fetch(thesis_id)
-        thesis_info = asdict(thesis)
-        del thesis_info['file_path']  # It is better if the user is unaware of this.
-        return thesis_info, 200
+        return thesis.serialize(), 200  # The file path is hidden, it is better if the user is unaware of it.
 
     @thesis_management_routes.route('/theses/<thesis_id>', methods=['GET'])
     @jwt_required()
@@ -60,9 +57,7 @@ def create_thesis_management_routes(plagiarism_api: PlagiarismManager) -> Bluepr
             return Response(dumps({"msg": "Thesis not found."}), status=404, mimetype='application/json')
         # TODO: If there is time we should check further for user's identity as well.
         thesis = Thesis.fetch(thesis_id)
-        thesis_info = asdict(thesis)
-        thesis_path = thesis_info['file_path']  # It is better if the user is unaware of this.
-        return send_file(os.path.join(os.getcwd(), thesis_path), mimetype='application/pdf',
+        return send_file(os.path.join(os.getcwd(), thesis.file_path), mimetype='application/pdf',
                          as_attachment=True, attachment_filename=thesis.original_name)
 
     @thesis_management_routes.route('/theses/<thesis_id>', methods=['DELETE'])
@@ -81,9 +76,10 @@ def create_thesis_management_routes(plagiarism_api: PlagiarismManager) -> Bluepr
             return {"msg": "Users cannot delete theses they do not own."}, 403
         thesis = Thesis.fetch(thesis_id)
         remove(os.path.join(os.getcwd(), thesis.file_path))  # Remove the thesis
-        has_relationship = Has.fetch_where('thesis_id', thesis.thesis_id)[0]
-        has_relationship.delete()  # Delete the ownership relationship
-        thesis.delete()  # Delete the associated metadata.
+        with global_query_handler.department_scope(student.department_id):
+            has_relationship = Has.fetch_where('thesis_id', thesis.thesis_id)[0]
+            has_relationship.delete()  # Delete the ownership relationship
+            thesis.delete()  # Delete the associated metadata.
         return {"msg": "Deleted thesis."}, 204
 
     @thesis_management_routes.route('/theses', methods=['POST'])
@@ -106,11 +102,10 @@ def create_thesis_management_routes(plagiarism_api: PlagiarismManager) -> Bluepr
         file.save(file_path)  # Save to theses directory.
         new_thesis_metadata = Thesis(-1, file_path, filename, plagiarism_api.get_plagiarism_ratio(filename),
                                      student.thesis_topic, round(time.time()))
-        new_thesis_metadata.create()
-        new_ownership = Has(-1, new_thesis_metadata.thesis_id, student.student_id)
-        new_ownership.create()
-        metadata = asdict(new_thesis_metadata)
-        del metadata['file_path']
-        return metadata, 201
+        with global_query_handler.department_scope(student.department_id):
+            new_thesis_metadata.create()
+            new_ownership = Has(-1, new_thesis_metadata.thesis_id, student.student_id)
+            new_ownership.create()
+        return new_thesis_metadata.serialize(), 201
 
     return thesis_management_routes
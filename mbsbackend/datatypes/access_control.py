@@ -0,0 +1,158 @@
+"""
+This module keeps the students each user may evaluate or advise in
+    memory, so that authorisation checks are set membership tests
+    rather than walks over the dissertations and their juries.
+"""
+from collections import Counter
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from mbsbackend.datatypes.database import global_query_handler, listen_to_resets, listen_to_writes
+
+
+class _AccessSet:
+    """
+    In-memory pairs of user ids and student ids, each pair backed by a
+        row of a relationship table. The pairs are kept up to date by the
+        write listeners below, changes made by any other connection cause
+        the pairs to be reloaded. Reloads build the pairs aside and
+        publish them at once, so that readers never see a partial set.
+    """
+    def __init__(self, query: str) -> None:
+        self.query = query  # Selects the row id, the user id and the student id.
+        self.rows: Dict[int, Tuple[int, int]] = {}
+        self.students: Dict[int, Counter] = {}  # Students of each user, counted per row.
+        self.data_version: Optional[int] = None  # Data version of the database the last time pairs were loaded.
+        self._lock = Lock()  # Serialises the writers, readers do not take it.
+
+    def load(self) -> None:
+        """
+        Load the pairs from the database.
+        """
+        data_version = global_query_handler.scoped_data_version()  # Taken first, later changes cause another reload.
+        rows: Dict[int, Tuple[int, int]] = {}
+        students: Dict[int, Counter] = {}
+        for row_id, user_id, student_id in global_query_handler.execute_latest_query(self.query):
+            rows[row_id] = (user_id, student_id)
+            students.setdefault(user_id, Counter())[student_id] += 1
+        with self._lock:
+            self.rows, self.students = rows, students
+            self.data_version = data_version  # Stamped only once the new pairs are published.
+
+    def has(self, user_id: int, student_id: int) -> bool:
+        """
+        Check if a user is paired with a student.
+
+        :param user_id: ID of the user.
+        :param student_id: ID of the student.
+        :return True if they are paired.
+        """
+        if self.data_version != global_query_handler.scoped_data_version():  # Someone else changed the database.
+            self.load()
+        return self.students.get(user_id, Counter())[student_id] > 0
+
+    def add(self, row_id: int, user_id: int, student_id: int) -> None:
+        with self._lock:
+            self._discard(row_id)
+            self.rows[row_id] = (user_id, student_id)
+            self.students.setdefault(user_id, Counter())[student_id] += 1
+
+    def discard(self, row_id: int) -> None:
+        with self._lock:
+            self._discard(row_id)
+
+    def _discard(self, row_id: int) -> None:
+        if row_id not in self.rows:
+            return
+        user_id, student_id = self.rows.pop(row_id)
+        self.students[user_id][student_id] -= 1
+        if self.students[user_id][student_id] <= 0:
+            del self.students[user_id][student_id]
+
+    def invalidate(self) -> None:
+        """
+        Force the pairs to be reloaded the next time they are used.
+        """
+        self.data_version = None
+
+
+_evaluations = _AccessSet("SELECT Member.member_id, Member.jury_id, Defending.student_id FROM Member"
+                          " JOIN Defending ON Defending.dissertation_id = Member.dissertation_id")
+_advisees = _AccessSet("SELECT id_, advisor_id, student_id FROM Instructor")
+
+
+def may_evaluate(user_id: int, student_id: int) -> bool:
+    """
+    Check if a user is a jury member in a dissertation of a student.
+
+    :param user_id: ID of the jury member, or the advisor.
+    :param student_id: ID of the student.
+    :return True if the user may evaluate the student.
+    """
+    return _evaluations.has(user_id, student_id)
+
+
+def may_advise(user_id: int, student_id: int) -> bool:
+    """
+    Check if a user is the advisor of a student.
+
+    :param user_id: ID of the advisor.
+    :param student_id: ID of the student.
+    :return True if the user advises the student.
+    """
+    return _advisees.has(user_id, student_id)
+
+
+def invalidate_access_sets() -> None:
+    """
+    Force the access sets to be reloaded the next time they are used,
+        must be called after Member, Defending or Instructor rows are
+        written in bulk without going through the bound classes.
+    """
+    _evaluations.invalidate()
+    _advisees.invalidate()
+
+
+def _on_member_write(operation: str, member: Any) -> None:
+    if operation == 'create':  # The student is only known if the dissertation is already being defended.
+        for student_id, in global_query_handler.execute_latest_query(
+                f"SELECT student_id FROM Defending WHERE dissertation_id = {member.dissertation_id}"):
+            _evaluations.add(member.member_id, member.jury_id, student_id)
+    elif operation == 'delete':
+        _evaluations.discard(member.member_id)
+    else:
+        _evaluations.invalidate()
+
+
+def _on_defending_write(operation: str, defending: Any) -> None:
+    if operation == 'update':
+        _evaluations.invalidate()
+        return
+    members = global_query_handler.execute_latest_query("SELECT member_id, jury_id FROM Member"
+                                                        f" WHERE dissertation_id = {defending.dissertation_id}")
+    for member_id, jury_id in members:
+        if operation == 'create':
+            _evaluations.add(member_id, jury_id, defending.student_id)
+        else:
+            _evaluations.discard(member_id)
+
+
+def _on_dissertation_write(operation: str, dissertation: Any) -> None:
+    if operation == 'delete':  # Its members and defending rows may have been left behind.
+        _evaluations.invalidate()
+
+
+def _on_instructor_write(operation: str, instructor: Any) -> None:
+    if operation == 'create':
+        _advisees.add(instructor.id_, instructor.advisor_id, instructor.student_id)
+    elif operation == 'delete':
+        _advisees.discard(instructor.id_)
+    else:
+        _advisees.invalidate()
+
+
+listen_to_writes('Member', _on_member_write)
+listen_to_writes('Defending', _on_defending_write)
+listen_to_writes('Dissertation', _on_dissertation_write)
+listen_to_writes('Instructor', _on_instructor_write)
+listen_to_resets(invalidate_access_sets)
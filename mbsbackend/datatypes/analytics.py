@@ -0,0 +1,222 @@
+"""
+This module exports the columns the department statistics are computed
+    from into NumPy arrays on disk, so that the statistics are computed
+    over memory mapped columns rather than by querying the database.
+"""
+from collections import Counter
+from os import getenv, listdir, makedirs, replace
+from os.path import exists, join
+from shutil import rmtree
+from threading import Lock
+from time import time, time_ns
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mbsbackend.datatypes.classes.thesis_classes import dissertation_status_column, dissertation_statuses
+from mbsbackend.datatypes.database import QueryHandler, global_query_handler
+
+_status_codes = ' '.join(f"WHEN '{status}' THEN {code}" for code, status in enumerate(dissertation_statuses))
+
+# Each table of the snapshot, the query it is exported with and the columns
+#   the query selects, alongside their types. Missing values are exported as
+#   -1 for integers and NaN for floats. Each row a query selects is computed
+#   from the rows of a single department, so that the queries can be gathered
+#   from every shard of a sharded database.
+snapshot_tables: Dict[str, Tuple[str, List[Tuple[str, type]]]] = {
+    'theses': ("SELECT Thesis.thesis_id, USER_.department_id, IFNULL(Thesis.plagiarism_ratio, -1),"
+               " Thesis.submission_date FROM Thesis JOIN Has ON Has.thesis_id = Thesis.thesis_id"
+               " JOIN USER_ ON USER_.user_id = Has.student_id",
+               [('thesis_id', np.int64), ('department_id', np.int64), ('plagiarism_ratio', np.int64),
+                ('submission_date', np.int64)]),
+    'dissertations': ("SELECT Dissertation.dissertation_id, USER_.department_id, Dissertation.jury_date,"
+                      f" CASE {dissertation_status_column} {_status_codes} END,"
+                      " Dissertation.jury_date - (SELECT MIN(Thesis.submission_date) FROM Has"
+                      " JOIN Thesis ON Thesis.thesis_id = Has.thesis_id WHERE Has.student_id = Defending.student_id)"
+                      " FROM Dissertation JOIN Defending ON Defending.dissertation_id = Dissertation.dissertation_id"
+                      " JOIN USER_ ON USER_.user_id = Defending.student_id"
+                      " LEFT JOIN DissertationStatus"
+                      " ON DissertationStatus.dissertation_id = Dissertation.dissertation_id",
+                      [('dissertation_id', np.int64), ('department_id', np.int64), ('jury_date', np.int64),
+                       ('status', np.int64), ('time_to_defense', np.float64)]),
+    'advisors': ("SELECT Advisor.advisor_id, USER_.department_id"
+                 " FROM Advisor JOIN USER_ ON USER_.user_id = Advisor.advisor_id",
+                 [('advisor_id', np.int64), ('department_id', np.int64), ('load', np.int64)]),
+}
+# The load of the advisors, appended to their rows. The students of an advisor
+#   may be in several shards, hence the loads are counted per shard and summed.
+_advisor_loads_query = "SELECT advisor_id, COUNT(*) FROM Instructor GROUP BY advisor_id"
+_current = 'current'  # Names the directory of the latest complete export.
+
+
+class AnalyticsSnapshot:
+    """
+    Columns of the tables statistics are computed from, exported to a
+        directory as one .npy file per column and read back memory mapped.
+        Each export is written to a directory of its own, which is then
+        published by replacing the file naming the current export, so that
+        readers always map the columns of a single export. Readers keep the
+        columns they mapped until they notice the new snapshot.
+    """
+    def __init__(self, directory: str) -> None:
+        """
+        :param directory: Directory the columns are exported to.
+        """
+        self.directory = directory
+        self.columns: Dict[str, Dict[str, np.ndarray]] = {}
+        self.exported_at: Optional[float] = None  # Time of the export the columns were loaded from.
+        self._loaded_from: Optional[str] = None  # Directory of the export the columns were loaded from.
+        self._lock = Lock()
+
+    def exists(self) -> bool:
+        return exists(join(self.directory, _current))
+
+    def _current_export(self) -> str:
+        with open(join(self.directory, _current)) as file:
+            return file.read().strip()
+
+    def export(self, query_handler: QueryHandler = global_query_handler) -> float:
+        """
+        Export the columns from the database, a query per table, to a
+            new directory and publish it once every column is written.
+
+        :param query_handler: Query handler of the database.
+        :return The time of the export.
+        """
+        export_name = f'export_{time_ns()}'
+        makedirs(join(self.directory, export_name))
+        for table, (query, columns) in snapshot_tables.items():
+            rows = query_handler.execute_gathered_query(query)
+            if table == 'advisors':
+                loads = Counter()
+                for advisor_id, load in query_handler.execute_gathered_query(_advisor_loads_query):
+                    loads[advisor_id] += load
+                rows = [(*row, loads[row[0]]) for row in rows]
+            for index, (column, type_) in enumerate(columns):
+                missing = np.nan if type_ is np.float64 else -1
+                values = np.array([missing if row[index] is None else row[index] for row in rows], dtype=type_)
+                np.save(join(self.directory, export_name, f'{table}.{column}.npy'), values)
+        exported_at = time()
+        np.save(join(self.directory, export_name, 'exported_at.npy'), np.array(exported_at))
+        temporary_name = join(self.directory, f'.{_current}')
+        with open(temporary_name, 'w') as file:
+            file.write(export_name)
+        replace(temporary_name, join(self.directory, _current))  # Readers see either the old or the new export.
+        self._remove_old_exports(export_name)
+        return exported_at
+
+    def _remove_old_exports(self, export_name: str) -> None:
+        """
+        Remove the exports older than the previous one, readers that read
+            the name of the previous export may still be mapping its files.
+
+        :param export_name: Name of the export just published.
+        """
+        exports = sorted((name for name in listdir(self.directory) if name.startswith('export_')),
+                         key=lambda name: int(name[len('export_'):]))
+        for name in exports[:max(exports.index(export_name) - 1, 0)]:
+            rmtree(join(self.directory, name), ignore_errors=True)
+
+    def load(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Map the columns of the latest snapshot to memory, exporting one
+            if there is no snapshot yet.
+
+        :return The columns of each table.
+        """
+        with self._lock:
+            if not self.exists():
+                self.export()
+            export_name = self._current_export()
+            if export_name != self._loaded_from:
+                export_directory = join(self.directory, export_name)
+                self.columns = {table: {column: np.load(join(export_directory, f'{table}.{column}.npy'),
+                                                        mmap_mode='r')
+                                        for column, _ in columns}
+                                for table, (_, columns) in snapshot_tables.items()}
+                self.exported_at = float(np.load(join(export_directory, 'exported_at.npy')))
+                self._loaded_from = export_name
+            return self.columns
+
+
+def _distribution(values: np.ndarray, bins: int, value_range: Optional[Tuple[float, float]] = None) -> dict:
+    """
+    Summarise the values with a histogram and percentiles.
+
+    :param values: Values, without the missing ones.
+    :param bins: Number of bins of the histogram.
+    :param value_range: Range of the histogram, the range of the values by default.
+    :return The count, mean, percentiles and histogram of the values.
+    """
+    if not len(values):
+        return {"count": 0, "mean": None, "percentiles": {}, "histogram": {"counts": [], "edges": []}}
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    percentiles = np.percentile(values, [25, 50, 75, 90])
+    return {"count": int(len(values)), "mean": float(values.mean()),
+            "percentiles": {str(rank): float(value) for rank, value in zip([25, 50, 75, 90], percentiles)},
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()}}
+
+
+def _approval_rate(status_counts: np.ndarray) -> Optional[float]:
+    decided = status_counts[dissertation_statuses.index('Correction'):].sum()
+    return float(status_counts[dissertation_statuses.index('Approved')] / decided) if decided else None
+
+
+def department_statistics(columns: Dict[str, Dict[str, np.ndarray]], department_id: int, bins: int = 10) -> dict:
+    """
+    Compute the statistics of a department from the snapshot columns.
+
+    :param columns: Columns of the snapshot.
+    :param department_id: ID of the department.
+    :param bins: Number of bins of the histograms.
+    :return Plagiarism ratio and time to defense distributions, dissertation
+        statuses and approval rate, and the load of the advisors.
+    """
+    theses, dissertations, advisors = columns['theses'], columns['dissertations'], columns['advisors']
+    ratios = theses['plagiarism_ratio'][(theses['department_id'] == department_id)
+                                        & (theses['plagiarism_ratio'] >= 0)]
+    in_department = dissertations['department_id'] == department_id
+    status_counts = np.bincount(dissertations['status'][in_department], minlength=len(dissertation_statuses))
+    days_to_defense = dissertations['time_to_defense'][in_department] / (24 * 60 * 60)
+    loads = advisors['load'][advisors['department_id'] == department_id]
+    return {"plagiarism_ratio": _distribution(ratios, bins, (0, 100)),
+            "dissertations": {"statuses": dict(zip(dissertation_statuses, status_counts.tolist())),
+                              "approval_rate": _approval_rate(status_counts)},
+            "days_to_defense": _distribution(days_to_defense[~np.isnan(days_to_defense)], bins),
+            "advisor_load": {**_distribution(loads.astype(np.float64), bins),
+                             "advisors_per_load": np.bincount(loads).tolist() if len(loads) else []}}
+
+
+def statistics_by_department(columns: Dict[str, Dict[str, np.ndarray]]) -> Dict[int, dict]:
+    """
+    Compute the headline statistics of every department at once, by
+        grouping the snapshot columns by department.
+
+    :param columns: Columns of the snapshot.
+    :return The number of theses, mean plagiarism ratio, number of dissertations,
+        approval rate and mean advisor load of each department.
+    """
+    theses, dissertations, advisors = columns['theses'], columns['dissertations'], columns['advisors']
+    department_ids = np.union1d(np.union1d(theses['department_id'], dissertations['department_id']),
+                                advisors['department_id']).astype(np.int64)
+    size = int(department_ids.max()) + 1 if len(department_ids) else 0
+    has_ratio = theses['plagiarism_ratio'] >= 0
+    thesis_counts = np.bincount(theses['department_id'][has_ratio], minlength=size)
+    ratio_sums = np.bincount(theses['department_id'][has_ratio], weights=theses['plagiarism_ratio'][has_ratio],
+                             minlength=size)
+    status_counts = np.zeros((size, len(dissertation_statuses)), dtype=np.int64)
+    np.add.at(status_counts, (dissertations['department_id'], dissertations['status']), 1)
+    advisor_counts = np.bincount(advisors['department_id'], minlength=size)
+    load_sums = np.bincount(advisors['department_id'], weights=advisors['load'], minlength=size)
+    return {int(department_id): {
+        "theses": int(thesis_counts[department_id]),
+        "mean_plagiarism_ratio": float(ratio_sums[department_id] / thesis_counts[department_id])
+        if thesis_counts[department_id] else None,
+        "dissertations": int(status_counts[department_id].sum()),
+        "approval_rate": _approval_rate(status_counts[department_id]),
+        "mean_advisor_load": float(load_sums[department_id] / advisor_counts[department_id])
+        if advisor_counts[department_id] else None,
+    } for department_id in department_ids}
+
+
+global_analytics = AnalyticsSnapshot(getenv('FLASK_DB_ANALYTICS_DIRECTORY', 'analytics'))
@@ -0,0 +1,74 @@
+"""
+This module moves the records of graduated students out of the
+    tables in use and into the archive, keeping those tables small.
+"""
+import re
+from typing import Dict, List
+
+from mbsbackend.datatypes.access_control import invalidate_access_sets
+from mbsbackend.datatypes.database import QueryHandler, global_query_handler, invalidate_id_indexes
+from mbsbackend.datatypes.scheduling import invalidate_calendar
+
+graduated_status = 'Graduated'  # Graduation status of students whose records are archived.
+_graduated_students = f"SELECT student_id FROM Student WHERE graduation_status = '{graduated_status}'"
+_create_table_pattern = re.compile(r"^CREATE TABLE (\w+)", re.IGNORECASE)
+
+# The records that belong to a graduated student, table by table. Records are
+#   deleted in this order too, so a table comes before the tables its criteria
+#   depends on. Table names are not qualified, so that the department tables
+#   of a shard are matched against the students in the global database.
+archived_records: Dict[str, str] = {
+    'Evaluation': f"dissertation_id IN (SELECT dissertation_id FROM Defending WHERE student_id IN ({_graduated_students}))",
+    'Member': f"dissertation_id IN (SELECT dissertation_id FROM Defending WHERE student_id IN ({_graduated_students}))",
+    'DissertationStatus': f"dissertation_id IN (SELECT dissertation_id FROM Defending WHERE student_id IN ({_graduated_students}))",
+    'Dissertation': f"dissertation_id IN (SELECT dissertation_id FROM Defending WHERE student_id IN ({_graduated_students}))",
+    'Defending': f"student_id IN ({_graduated_students})",
+    'Thesis': f"thesis_id IN (SELECT thesis_id FROM Has WHERE student_id IN ({_graduated_students}))",
+    'Has': f"student_id IN ({_graduated_students})",
+    'Instructor': f"student_id IN ({_graduated_students})",
+    'Recommended': f"student_id IN ({_graduated_students})",
+    'Proposal': f"student_id IN ({_graduated_students})",
+    'USER_': f"user_id IN ({_graduated_students})",
+    'Student': f"student_id IN ({_graduated_students})"
+}
+
+
+def _archive_queries(query_handler: QueryHandler) -> List[str]:
+    """
+    Generate the queries that move the records of graduated students
+        from a database file to its archive.
+
+    :param query_handler: Query handler of the database file.
+    :return The queries, to be executed in a single transaction.
+    """
+    schemas = dict(QueryHandler.execute_query(query_handler, "SELECT name, sql FROM main.sqlite_master"
+                                                             " WHERE type = 'table'"))
+    tables = [table for table in archived_records if table in schemas]
+    queries = [_create_table_pattern.sub(r"CREATE TABLE IF NOT EXISTS archive.\1", schemas[table]) for table in tables]
+    queries += [f"INSERT OR REPLACE INTO archive.{table} SELECT * FROM main.{table} WHERE {archived_records[table]}"
+                for table in tables]  # Copy everything first, as the criteria depend on the other tables.
+    queries += [f"DELETE FROM main.{table} WHERE {archived_records[table]}" for table in tables]
+    return queries
+
+
+def archive_graduated_students(query_handler: QueryHandler = global_query_handler) -> int:
+    """
+    Move the students who graduated, alongside their theses, dissertations,
+        juries' memberships and evaluations, to the archive. Each database
+        file is moved in a single transaction.
+
+    :param query_handler: Query handler whose databases are archived.
+    :return Number of students archived.
+    """
+    graduated = query_handler.execute_query(_graduated_students)
+    if not graduated:
+        return 0
+    handlers = query_handler.database_handlers()
+    main_handler = handlers.pop('main')
+    for handler in [*handlers.values(), main_handler]:  # Shards first, their criteria need the students.
+        handler.attach_archive(create=True)
+        handler.execute_transaction(_archive_queries(handler))
+    invalidate_id_indexes()
+    invalidate_access_sets()
+    invalidate_calendar()
+    return len(graduated)
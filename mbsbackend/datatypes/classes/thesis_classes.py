@@ -1,9 +1,9 @@
-from mbsbackend.datatypes.database import bind_database
+from mbsbackend.datatypes.database import bind_database, global_query_handler
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 
-@bind_database(obj_id_row='thesis_id')
+@bind_database(obj_id_row='thesis_id', hidden_fields=('file_path',))
 @dataclass
 class Thesis:
     """
@@ -53,6 +53,13 @@ class Has:
     student_id: int
 
 
+# Selects the thesis a student uploaded last, the same as StudentSummary.latest_thesis_id, which is
+#   maintained by triggers and should be read instead when the query handler maintains derived tables.
+latest_thesis_query = ("SELECT Has.thesis_id FROM Has JOIN Thesis ON Thesis.thesis_id = Has.thesis_id"
+                       " WHERE Has.student_id = {student_id} ORDER BY Thesis.submission_date DESC, Has.has_id DESC"
+                       " LIMIT 1")
+
+
 @bind_database(obj_id_row='evaluation_id')
 @dataclass
 class Evaluation:
@@ -75,9 +82,20 @@ class Evaluation:
         :return The consensus of the dissertation.
         """
         evaluations: List[Evaluation] = Evaluation.fetch_where('dissertation_id', dissertation_id)
+        return cls.consensus_of([evaluation.evaluation for evaluation in evaluations], member_count)
+
+    @staticmethod
+    def consensus_of(evaluations: List[str], member_count: int) -> str:
+        """
+        Get the consensus of the given evaluations.
+
+        :param evaluations: Evaluations made in a dissertation.
+        :param member_count: Number of jury members in dissertations.
+        :return The consensus of the dissertation.
+        """
         decisions = {"Correction": 0, "Rejected": 0, "Approved": 0}
         for evaluation in evaluations:
-            decisions[evaluation.evaluation] += 1
+            decisions[evaluation] += 1
         if sum(decisions.values()) == member_count:
             items = decisions.items()
             items = list(items)
@@ -85,3 +103,113 @@ class Evaluation:
             return items[0][0]
         else:
             return "Undecided"
+
+
+dissertation_statuses = ('Pending', 'Undecided', 'Correction', 'Rejected', 'Approved')
+evaluation_decisions = ('Correction', 'Rejected', 'Approved')
+# Same as Evaluation.consensus_of, ties are broken in the order of the decisions.
+_consensus_expression = ("CASE WHEN {corrections} + {rejections} + {approvals} != {members} THEN 'Undecided'"
+                         " WHEN {corrections} >= {rejections} AND {corrections} >= {approvals} THEN 'Correction'"
+                         " WHEN {rejections} >= {approvals} THEN 'Rejected'"
+                         " ELSE 'Approved' END")
+_status_expression = ("CASE WHEN NOT (SELECT is_approved FROM Dissertation"
+                      " WHERE Dissertation.dissertation_id = DissertationStatus.dissertation_id) THEN 'Pending'"
+                      " ELSE " + _consensus_expression.format(corrections='correction_count',
+                                                              rejections='rejected_count',
+                                                              approvals='approved_count',
+                                                              members='member_count') + " END")
+_decision_count = ("(SELECT COUNT(*) FROM Evaluation WHERE Evaluation.dissertation_id = Dissertation.dissertation_id"
+                   " AND evaluation = '{decision}')")
+# Status of the dissertation joined as Dissertation alongside its DissertationStatus row, derived
+#   from its members and evaluations in the same way when it has no tallies. Every query that
+#   reports the status of a dissertation selects this, so that they agree on dissertations without tallies.
+dissertation_status_column = ("IFNULL(DissertationStatus.status, CASE WHEN NOT Dissertation.is_approved THEN 'Pending'"
+                              " ELSE " + _consensus_expression.format(
+                                  corrections=_decision_count.format(decision='Correction'),
+                                  rejections=_decision_count.format(decision='Rejected'),
+                                  approvals=_decision_count.format(decision='Approved'),
+                                  members="(SELECT COUNT(*) FROM Member"
+                                          " WHERE Member.dissertation_id = Dissertation.dissertation_id)") + " END)")
+
+
+@bind_database(obj_id_row='dissertation_id')
+@dataclass
+class DissertationStatus:
+    """
+    Tallies of the decisions made in a dissertation and the status
+        they lead to, updated alongside the writes that change them.
+    """
+    dissertation_id: int
+    member_count: int
+    correction_count: int
+    rejected_count: int
+    approved_count: int
+    status: str
+
+    @classmethod
+    def status_of(cls, dissertation_id: int) -> Optional[str]:
+        """
+        Get the status of a dissertation, derived from its evaluations
+            if it has no tallies.
+
+        :param dissertation_id: ID of the dissertation.
+        :return The status, None if there is no such dissertation.
+        """
+        # The rows of a dissertation are in a single department, hence gathering them needs no merging.
+        rows = global_query_handler.execute_gathered_query(
+            f"SELECT {dissertation_status_column} FROM Dissertation LEFT JOIN DissertationStatus"
+            " ON DissertationStatus.dissertation_id = Dissertation.dissertation_id"
+            f" WHERE Dissertation.dissertation_id = {dissertation_id}")
+        return rows[0][0] if rows else None
+
+    @staticmethod
+    def start(dissertation_id: int, member_count: int) -> None:
+        """
+        Start the tallies of a new dissertation, replacing the tallies
+            left behind by a dissertation with the same id.
+
+        :param dissertation_id: ID of the dissertation.
+        :param member_count: Number of jury members in the dissertation.
+        """
+        global_query_handler.execute_query("INSERT OR REPLACE INTO DissertationStatus"
+                                           f" VALUES ({dissertation_id}, {member_count}, 0, 0, 0, 'Pending')")
+
+    @staticmethod
+    def refresh_query(dissertation_id: int) -> str:
+        """
+        Generate the query that derives the status of a dissertation
+            from its tallies.
+
+        :param dissertation_id: ID of the dissertation.
+        :return The query, to be executed after the tallies change.
+        """
+        return (f"UPDATE DissertationStatus SET status = {_status_expression}"
+                f" WHERE dissertation_id = {dissertation_id}")
+
+    @staticmethod
+    def backfill_query() -> str:
+        """
+        Generate the query that tallies the dissertations that have no
+            tallies yet, such as the ones made before the tallies were kept.
+
+        :return The query, which leaves the existing tallies as they are.
+        """
+        return ("INSERT INTO DissertationStatus SELECT Dissertation.dissertation_id,"
+                " (SELECT COUNT(*) FROM Member WHERE Member.dissertation_id = Dissertation.dissertation_id),"
+                f" {_decision_count.format(decision='Correction')}, {_decision_count.format(decision='Rejected')},"
+                f" {_decision_count.format(decision='Approved')}, {dissertation_status_column}"
+                " FROM Dissertation LEFT JOIN DissertationStatus"
+                " ON DissertationStatus.dissertation_id = Dissertation.dissertation_id"
+                " WHERE DissertationStatus.dissertation_id IS NULL")
+
+    @staticmethod
+    def tally_query(dissertation_id: int, evaluation: str) -> str:
+        """
+        Generate the query that counts a new decision in a dissertation.
+
+        :param dissertation_id: ID of the dissertation.
+        :param evaluation: The decision, one of evaluation_decisions.
+        :return The query, to be executed alongside the new evaluation.
+        """
+        column = f"{evaluation.lower()}_count"
+        return f"UPDATE DissertationStatus SET {column} = {column} + 1 WHERE dissertation_id = {dissertation_id}"
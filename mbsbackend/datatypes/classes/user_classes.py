@@ -1,11 +1,13 @@
 import datetime
 from time import strftime
 
-from mbsbackend.datatypes.database import bind_database
+from mbsbackend.datatypes.access_control import may_evaluate, may_advise
+from mbsbackend.datatypes.database import bind_database, global_query_handler, ReferenceTable
 from dataclasses import dataclass
 from typing import Optional, List, Union
 from .user_relationships import Proposal, Instructor, Recommended
-from .thesis_classes import Defending, Member, Has, Thesis, Evaluation
+from .thesis_classes import Defending, Member, Has, Thesis, Evaluation, DissertationStatus, latest_thesis_query, \
+    dissertation_status_column
 from .class_exceptions import StudentAlreadyHasAdvisorException
 
 
@@ -20,7 +22,13 @@ class Department:
     turkish_department_name: str
 
 
-@bind_database(obj_id_row='user_id')
+departments = ReferenceTable(Department)  # Departments are only added by hand, so they are kept in memory.
+outside_faculty_department_id = 2  # Jury members from outside the faculty are given this department by tradition.
+advisor_jury_institution = "Izmir Institute of Technology"  # Given to the advisors that are made Jury members.
+advisor_jury_phone_number = "+90 5XX XXX XX XX"
+
+
+@bind_database(obj_id_row='user_id', index_ids=True, hidden_fields=('password',))
 @dataclass
 class User_:
     """
@@ -52,10 +60,10 @@ class User_:
 
     @property
     def department(self) -> Department:
-        return Department.fetch(self.department_id)
+        return departments[self.department_id]
 
 
-@bind_database(obj_id_row='advisor_id')
+@bind_database(obj_id_row='advisor_id', index_ids=True, group_by='department_id')
 @dataclass
 class Advisor(User_):
     """
@@ -77,19 +85,20 @@ class Advisor(User_):
         Set this advisor to an advisor to a student.
 
         :param student: New advisee of the advisor.
+        :raise ConcurrentUpdateException: If the student was changed since it was fetched.
         """
+        student.is_approved = True
+        student.update()  # Update the student's state, fails if another advisor got there first.
         instructor_relationship = Instructor(-1, student.student_id, self.advisor_id)
         instructor_relationship.create()
-        student.is_approved = True
-        student.update()  # Update the student's state.
 
     @property
     def students(self) -> List[int]:
         """
         Get a list of student ids managed by this advisor.
         """
-        instructors = Instructor.fetch_where("advisor_id", self.advisor_id)  # Get Instructor entities.
-        return [instructor.student_id for instructor in instructors]  # Get the student IDs from them.
+        query = f"SELECT student_id FROM Instructor WHERE advisor_id = {self.advisor_id} ORDER BY id_"
+        return [student_id for student_id, in global_query_handler.execute_query(query)]
 
     @property
     def jury_credentials(self) -> Optional["Jury"]:
@@ -107,18 +116,49 @@ class Advisor(User_):
         Check if Jury is member in any of this student's
             dissertations.
         """
-        return self.advisor_id in student.dissertation_info['jury_ids']
+        return may_evaluate(self.advisor_id, student.student_id)
+
+    def is_advisor_of(self, student_id: int) -> bool:
+        """
+        Check if this Advisor is the advisor of a student.
+
+        :param student_id: ID of the student.
+        :return True if the Advisor advises the student.
+        """
+        return may_advise(self.advisor_id, student_id)
 
     def create_jury(self) -> None:
         """
         Make the advisor a Jury member as well.
         """
-        values = [self.advisor_id, False, "Izmir Institute of Technology",
-                        "+90 5XX XXX XX XX", False]
+        values = [self.advisor_id, False, advisor_jury_institution, advisor_jury_phone_number, False]
         Jury.create_unique(values)
 
-
-@bind_database(obj_id_row='jury_id')
+    @classmethod
+    def provision_juries(cls, advisor_ids: Optional[List[int]] = None) -> int:
+        """
+        Make the given advisors that are not Jury members yet ones,
+            with a single query. Ids that do not belong to advisors are
+            ignored.
+
+        :param advisor_ids: IDs of the advisors, every advisor if None.
+        :return Number of advisors made Jury members.
+        """
+        if advisor_ids is not None and not advisor_ids:
+            return 0
+        query = ("INSERT INTO JURY (jury_id, is_approved, institution, phone_number, is_appointed)"
+                 f" SELECT advisor_id, FALSE, '{advisor_jury_institution}', '{advisor_jury_phone_number}', FALSE"
+                 " FROM Advisor WHERE advisor_id NOT IN (SELECT jury_id FROM JURY)")
+        if advisor_ids is not None:
+            query += f" AND advisor_id IN ({', '.join(str(int(id_)) for id_ in advisor_ids)})"
+        global_query_handler.execute_query(query)
+        provisioned = global_query_handler.last_row_count()
+        if provisioned > 0:
+            Jury.invalidate_indexes()
+        return provisioned
+
+
+@bind_database(obj_id_row='jury_id', index_ids=True, group_by='department_id')
 @dataclass
 class Jury(User_):
     """
@@ -131,14 +171,30 @@ class Jury(User_):
     phone_number: str
     is_appointed: bool
 
+    @classmethod
+    def roster_of(cls, department_id: int) -> List[int]:
+        """
+        Get the ids of the jury members an advisor of the given department
+            can propose, the advisors of the department followed by the
+            members from outside the faculty. Advisors are made Jury
+            members when they are proposed or by the db-provision-juries
+            command, see Advisor.provision_juries.
+
+        :param department_id: ID of the department.
+        :return The ids of the jury members.
+        """
+        return Advisor.ids_where('department_id', department_id) \
+            + Jury.ids_where('department_id', outside_faculty_department_id)
+
     @property
     def students(self) -> List[int]:
-        if not Member.has_where('jury_id', self.jury_id):
-            return []
-        is_member_in: List[Member] = Member.fetch_where('jury_id', self.jury_id)
-        defending_relationships = [Defending.fetch_where('dissertation_id', member.dissertation_id)[0]
-                                   for member in is_member_in]
-        return [defending_relationship.student_id for defending_relationship in defending_relationships]
+        """
+        Get a list of student ids whose dissertations this jury is a member of.
+        """
+        query = ("SELECT Defending.student_id FROM Member"
+                 " JOIN Defending ON Defending.dissertation_id = Member.dissertation_id"
+                 f" WHERE Member.jury_id = {self.jury_id} ORDER BY Member.member_id")
+        return [student_id for student_id, in global_query_handler.execute_query(query)]
 
     @classmethod
     def add_new_jury(cls, req, dep_id):
@@ -155,10 +211,10 @@ class Jury(User_):
         Check if Jury is member in any of this student's
             dissertations.
         """
-        return self.jury_id in student.dissertation_info['jury_ids']
+        return may_evaluate(self.jury_id, student.student_id)
 
 
-@bind_database(obj_id_row='student_id')
+@bind_database(obj_id_row='student_id', version_row='row_version', index_ids=True, group_by='department_id')
 @dataclass
 class Student(User_):
     """
@@ -219,23 +275,34 @@ class Student(User_):
                                for has_relationship in Has.fetch_where('student_id', self.student_id)])
         return [Thesis.fetch(thesis_id) for thesis_id in theses_ids]
 
+    @property
+    def latest_thesis(self) -> Optional[Thesis]:
+        """
+        Return the thesis this Student uploaded last, None if
+            they have not uploaded any theses.
+        """
+        latest_thesis_id = self.latest_thesis_id
+        return Thesis.fetch(latest_thesis_id) if latest_thesis_id != -1 else None
+
     @property
     def latest_thesis_id(self) -> int:
-        theses_ = self.theses
-        theses_.sort(key=lambda thesis: thesis.submission_date)
-        theses_.reverse()
-        if theses_:
-            return theses_[0].thesis_id
-        else:
-            return -1
+        """
+        Return the id of the thesis this Student uploaded last, read
+            from their summary, or -1 if they have not uploaded any theses.
+        """
+        if global_query_handler.maintains_derived_tables:
+            rows = global_query_handler.execute_query("SELECT latest_thesis_id FROM StudentSummary"
+                                                      f" WHERE student_id = {self.student_id}")
+        else:  # The rows of a student are in a single department, hence gathering them needs no merging.
+            rows = global_query_handler.execute_gathered_query(latest_thesis_query.format(student_id=self.student_id))
+        return rows[0][0] if rows else -1
 
     @property
     def latest_thesis_name(self) -> str:
         """
         Generate thesis name from the filename.
         """
-        latest_thesis: Thesis = Thesis.fetch(self.latest_thesis_id)
-        file_name = latest_thesis.original_name
+        file_name = self.latest_thesis.original_name
         name_proper, extension = file_name.split('.')
         name_capitalised_and_parsed = ' '.join(map(lambda str_: str_.capitalize(), name_proper.split('_')))
         return name_capitalised_and_parsed
@@ -249,12 +316,7 @@ class Student(User_):
         :return Information amount the dissertation and
             the jury member.
         """
-        if not Defending.has_where('student_id', self.student_id):
-            return None
-        defending: Defending = Defending.fetch_where('student_id', self.student_id)[0]
-        dissertation: Dissertation = Dissertation.fetch(defending.dissertation_id)
-        dissertation_info = dissertation.get_info(self.student_id)
-        return dissertation_info
+        return Dissertation.info_of(self.student_id)
 
     @property
     def dissertation(self) -> "Dissertation":
@@ -271,17 +333,19 @@ class Student(User_):
             jury_members.append(self.advisor.advisor_id)
         if not all(Jury.has(jury_id) for jury_id in jury_members):
             return None
-        new_dissertation = Dissertation(-1, dissertation_date, False)
-        new_dissertation.create()
-        for jury_id in jury_members:
-            new_member = Member(-1, new_dissertation.dissertation_id, jury_id)
-            new_member.create()
-        defending = Defending(-1, new_dissertation.dissertation_id, self.student_id)
-        defending.create()
+        with global_query_handler.department_scope(self.department_id):
+            new_dissertation = Dissertation(-1, dissertation_date, False)
+            new_dissertation.create()
+            for jury_id in jury_members:
+                new_member = Member(-1, new_dissertation.dissertation_id, jury_id)
+                new_member.create()
+            defending = Defending(-1, new_dissertation.dissertation_id, self.student_id)
+            defending.create()
+            DissertationStatus.start(new_dissertation.dissertation_id, len(jury_members))
         return new_dissertation
 
 
-@bind_database(obj_id_row='dbr_id')
+@bind_database(obj_id_row='dbr_id', index_ids=True, group_by='department_id')
 @dataclass
 class DBR(User_):
     """
@@ -291,27 +355,25 @@ class DBR(User_):
 
     @property
     def students(self) -> List[int]:
-        if not Student.has_where('department_id', self.department_id):
-            return []
-        students = Student.fetch_where('department_id', self.department_id)
-        return [student.user_id for student in students]
+        return Student.ids_where('department_id', self.department_id)
 
     @property
     def students_without_recommendations(self) -> List[int]:
         """
         Return a list of Student IDs of the Students that need a recommendation.
         """
-        if not Student.has_where('department_id', self.department_id):
-            return []
-        students = Student.fetch_where('department_id', self.department_id)
-        return [student.user_id for student in students if not student.is_advisors_recommended]
+        query = ("SELECT Student.student_id FROM Student JOIN USER_ ON USER_.user_id = Student.student_id"
+                 f" WHERE USER_.department_id = {self.department_id}"
+                 " AND NOT EXISTS (SELECT 1 FROM Instructor WHERE Instructor.student_id = Student.student_id)"
+                 " AND NOT EXISTS (SELECT 1 FROM Recommended WHERE Recommended.student_id = Student.student_id)"
+                 " AND NOT EXISTS (SELECT 1 FROM Proposal WHERE Proposal.student_id = Student.student_id)"
+                 " ORDER BY Student.student_id")  # Same as is_advisors_recommended, for every student at once.
+        with global_query_handler.department_scope(self.department_id):
+            return [student_id for student_id, in global_query_handler.execute_query(query)]
 
     @property
     def advisors(self) -> List[int]:
-        if not Advisor.has_where('department_id', self.department_id):
-            return []
-        advisors = Advisor.fetch_where('department_id', self.department_id)
-        return [advisor.user_id for advisor in advisors]
+        return Advisor.ids_where('department_id', self.department_id)
 
 
 @bind_database(obj_id_row='dissertation_id')
@@ -330,18 +392,92 @@ class Dissertation:
         """
         Get info about dissertation.
         """
-        if not Member.has_where('dissertation_id', self.dissertation_id):
-            return None
-        member_relationships: List[Member] = Member.fetch_where('dissertation_id', self.dissertation_id)
-        jury_members: List["Jury"] = [Jury.fetch(member.jury_id) for member in member_relationships]
-        jury_ids = [jury.jury_id for jury in jury_members]
-        dissertation_info = {"jury_date": self.jury_date, "jury_ids": jury_ids, "student_id": student_id}
-        if not self.is_approved:
-            dissertation_info['status'] = 'Pending'
-        else:
-            dissertation_info['status'] = Evaluation.get_consensus(self.dissertation_id, len(jury_ids))
+        status = DissertationStatus.status_of(self.dissertation_id)
+        return self._project_info(self.dissertation_id, self.jury_date, status, student_id)
+
+    @classmethod
+    def info_of(cls, student_id: int) -> Optional[dict]:
+        """
+        Get info about the dissertation of a student, in two queries,
+            remembered until the request writes to the database or ends.
+
+        :param student_id: ID of the student defending the dissertation.
+        :return Info about the dissertation, or None if there is none.
+        """
+        cache = global_query_handler.read_scope_cache()
+        key = ('dissertation_info', student_id)
+        if cache is not None and key in cache:
+            return cache[key]
+        # The rows of a student are in a single department, hence gathering them needs no merging.
+        rows = global_query_handler.execute_gathered_query("SELECT Dissertation.dissertation_id, jury_date,"
+                                                           f" {dissertation_status_column} FROM Defending"
+                                                           " JOIN Dissertation"
+                                                           " ON Dissertation.dissertation_id = Defending.dissertation_id"
+                                                           " LEFT JOIN DissertationStatus ON"
+                                                           " DissertationStatus.dissertation_id = Dissertation.dissertation_id"
+                                                           f" WHERE Defending.student_id = {student_id}"
+                                                           " ORDER BY Defending.defending_id LIMIT 1")
+        dissertation_info = cls._project_info(*rows[0], student_id) if rows else None
+        if cache is not None:
+            cache[key] = dissertation_info
         return dissertation_info
 
+    @staticmethod
+    def _project_info(dissertation_id: int, jury_date: int, status: str, student_id: int) -> Optional[dict]:
+        """
+        Get info about a dissertation from its jury ids and its status,
+            without loading the jury members themselves.
+        """
+        rows = global_query_handler.execute_query(f"SELECT jury_id FROM Member"
+                                                  f" WHERE dissertation_id = {dissertation_id} ORDER BY member_id")
+        jury_ids = [jury_id for jury_id, in rows]
+        if not jury_ids:
+            return None
+        return {"jury_date": jury_date, "jury_ids": jury_ids, "student_id": student_id, "status": status}
+
+    @staticmethod
+    def students_with_status(status: str, department_id: Optional[int] = None) -> List[int]:
+        """
+        Get the students whose dissertations have a status.
+
+        :param status: One of the dissertation statuses.
+        :param department_id: ID of the department of the students, None for every department.
+        :return IDs of the students, in order.
+        """
+        query = ("SELECT Defending.student_id FROM DissertationStatus"
+                 " JOIN Defending ON Defending.dissertation_id = DissertationStatus.dissertation_id"
+                 " JOIN USER_ ON USER_.user_id = Defending.student_id"
+                 f" WHERE DissertationStatus.status = '{status}'")
+        if department_id is None:
+            return sorted(student_id for student_id, in global_query_handler.execute_query(query))
+        query += f" AND USER_.department_id = {department_id} ORDER BY Defending.student_id"
+        with global_query_handler.department_scope(department_id):
+            return [student_id for student_id, in global_query_handler.execute_query(query)]
+
+    def approve(self) -> None:
+        """
+        Approve the dissertation, its status is updated in the same
+            transaction.
+        """
+        global_query_handler.execute_transaction([
+            f"UPDATE Dissertation SET is_approved = TRUE WHERE dissertation_id = {self.dissertation_id}",
+            DissertationStatus.refresh_query(self.dissertation_id)])
+        self.__dict__['is_approved'] = True
+
+    def evaluate(self, jury_id: int, evaluation: str) -> None:
+        """
+        Record the evaluation of a jury member, the tallies and the
+            status are updated in the same transaction.
+
+        :param jury_id: ID of the jury member.
+        :param evaluation: The decision, Correction, Rejected or Approved.
+        """
+        global_query_handler.execute_transaction([
+            "INSERT INTO Evaluation (dissertation_id, jury_id, evaluation)"
+            f" VALUES ({self.dissertation_id}, {jury_id}, '{evaluation}')",
+            DissertationStatus.tally_query(self.dissertation_id, evaluation),
+            DissertationStatus.refresh_query(self.dissertation_id)])
+
     def delete_dissertation(self):
         """
         Delete a dissertation alongside with
@@ -352,10 +488,11 @@ class Dissertation:
         members = Member.fetch_where('dissertation_id', self.dissertation_id)
         for member in members:
             member.delete()
+        if DissertationStatus.has(self.dissertation_id):
+            DissertationStatus.fetch(self.dissertation_id).delete()
         self.delete()
 
     def get_jury_members(self, student_id: int) -> List[Jury]:
-        dissertation_info = self.get_info(student_id)
         jury_members = [Jury.fetch(id_) for id_ in self.get_info(student_id)['jury_ids']]
         return jury_members
 
@@ -1,7 +1,8 @@
 from typing import Optional
-from dataclasses import asdict
+from dataclasses import fields
 from .class_exceptions import InvalidUserClassException
-from .user_classes import Student, Advisor, DBR, Jury, Department, User_
+from .user_classes import Student, Advisor, DBR, Jury, User_, departments
+from ..database import global_query_handler
 
 
 def get_user(class_type: type, user_id: int) -> Optional[dict]:
@@ -16,19 +17,70 @@ def get_user(class_type: type, user_id: int) -> Optional[dict]:
         raise InvalidUserClassException
     if not class_type.has(user_id):
         return None
+    if class_type == Student and global_query_handler.maintains_derived_tables:
+        profile = _get_student_profile(user_id)
+        if profile is not None:
+            return profile
     user_ = class_type.fetch(user_id)
-    dict_ = asdict(user_)  # Get the user information as a dictionary.
+    dict_ = user_.serialize()  # Get the user information, except the password, as a dictionary.
     if class_type == Student:
         dict_['latest_thesis_id'] = user_.latest_thesis_id
         dict_['is_advisors_recommended'] = user_.is_advisors_recommended
         dict_['has_dissertation'] = user_.dissertation_info is not None
     elif class_type == Advisor:
         dict_['is_jury'] = user_.jury_credentials is not None
-    del dict_['password']  # Delete password information.
     convert_department(dict_)
     return dict_
 
 
+def _get_student_profile(student_id: int) -> Optional[dict]:
+    """
+    Get a student's information, alongside the summary of their
+        relations, with a single lookup.
+
+    :param student_id: ID of the student.
+    :return The student information as a dictionary or None if the
+        student has no summary.
+    """
+    user_fields = {field.name for field in fields(User_)}
+    columns = [field.name for field in fields(Student) if field.name != 'password']
+    selected = [f"USER_.{column}" if column in user_fields else f"Student.{column}" for column in columns]
+    rows = global_query_handler.execute_query(f"SELECT {', '.join(selected)}, StudentSummary.latest_thesis_id,"
+                                              " StudentSummary.is_advisors_recommended,"
+                                              " StudentSummary.has_dissertation"
+                                              " FROM USER_ JOIN Student ON Student.student_id = USER_.user_id"
+                                              " JOIN StudentSummary ON StudentSummary.student_id = USER_.user_id"
+                                              f" WHERE USER_.user_id = {student_id}")
+    if not rows:
+        return None
+    *values, latest_thesis_id, is_advisors_recommended, has_dissertation = rows[0]
+    dict_ = dict(zip(columns, values))
+    dict_['latest_thesis_id'] = latest_thesis_id
+    dict_['is_advisors_recommended'] = bool(is_advisors_recommended)
+    dict_['has_dissertation'] = bool(has_dissertation)
+    convert_department(dict_)
+    return dict_
+
+
+def get_archived_user(class_type: type, user_id: int) -> Optional[dict]:
+    """
+    Get an archived user's information excluding the password,
+        archived users are read only.
+
+    :param class_type: Class of the user, student or advisor.
+    :param user_id: ID of the user.
+    :return The user information as a dictionary or None if no such user was archived.
+    """
+    if class_type not in [Student, Advisor, DBR, Jury]:
+        raise InvalidUserClassException
+    if not class_type.has_archived(user_id):
+        return None
+    dict_ = class_type.fetch_archived(user_id).serialize()
+    convert_department(dict_)
+    dict_['is_archived'] = True
+    return dict_
+
+
 def convert_department(user_dict: dict) -> None:
     """
     Given a user dataclass' dictionary representation,
@@ -36,7 +88,7 @@ def convert_department(user_dict: dict) -> None:
         and its key to the name of the department.
     """
     department_id = user_dict['department_id']
-    department_name = Department.fetch(int(department_id)).department_name
+    department_name = departments[int(department_id)].department_name
     del user_dict['department_id']
     user_dict['department'] = department_name
 
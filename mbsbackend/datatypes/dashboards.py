@@ -0,0 +1,142 @@
+"""
+This module gathers the front page of each role in a fixed number of
+    aggregate queries, no matter how many students the user oversees.
+"""
+from typing import List, Optional, Tuple
+
+from mbsbackend.datatypes.classes.thesis_classes import dissertation_status_column, latest_thesis_query
+from mbsbackend.datatypes.database import global_query_handler
+
+# Joins the first dissertation a student defends, alongside its status, to the Student table.
+_dissertation_join = (" LEFT JOIN Defending ON Defending.defending_id ="
+                      " (SELECT MIN(defending_id) FROM Defending WHERE Defending.student_id = Student.student_id)"
+                      " LEFT JOIN Dissertation ON Dissertation.dissertation_id = Defending.dissertation_id"
+                      " LEFT JOIN DissertationStatus"
+                      " ON DissertationStatus.dissertation_id = Defending.dissertation_id")
+
+# Status of the joined dissertation, NULL if there is none.
+_status_column = f"CASE WHEN Dissertation.dissertation_id IS NULL THEN NULL ELSE {dissertation_status_column} END"
+
+
+def _latest_thesis_column() -> Tuple[str, str]:
+    """
+    Get the column of the latest thesis of each student and the join
+        it needs, read from their summary if the query handler maintains
+        it, from their theses otherwise.
+    """
+    if global_query_handler.maintains_derived_tables:
+        return ("IFNULL(StudentSummary.latest_thesis_id, -1)",
+                " LEFT JOIN StudentSummary ON StudentSummary.student_id = Student.student_id")
+    return f"IFNULL(({latest_thesis_query.format(student_id='Student.student_id')}), -1)", ""
+
+
+def _rows_as_dicts(columns: List[str], query: str) -> List[dict]:
+    return [dict(zip(columns, row)) for row in global_query_handler.execute_query(query)]
+
+
+def _defenders(jury_id: int) -> List[dict]:
+    """
+    Get the students whose dissertations a jury member is in, and
+        whether the member evaluated them yet, in a single query.
+
+    :param jury_id: ID of the jury member.
+    :return The students, in the order the member joined their juries.
+    """
+    # Each row comes from the department of the dissertation, the juries of a member may span departments.
+    rows = sorted(global_query_handler.execute_gathered_query(
+        "SELECT Member.member_id, Defending.student_id, USER_.name_, USER_.surname, Dissertation.jury_date,"
+        f" {_status_column},"
+        " EXISTS (SELECT 1 FROM Evaluation WHERE Evaluation.dissertation_id = Member.dissertation_id"
+        " AND Evaluation.jury_id = Member.jury_id)"
+        " FROM Member JOIN Defending ON Defending.dissertation_id = Member.dissertation_id"
+        " JOIN Dissertation ON Dissertation.dissertation_id = Member.dissertation_id"
+        " LEFT JOIN DissertationStatus ON DissertationStatus.dissertation_id = Member.dissertation_id"
+        " JOIN USER_ ON USER_.user_id = Defending.student_id"
+        f" WHERE Member.jury_id = {jury_id}"))
+    return [{'student_id': student_id, 'name_': name_, 'surname': surname, 'jury_date': jury_date, 'status': status,
+             'has_evaluated': bool(has_evaluated)}
+            for _, student_id, name_, surname, jury_date, status, has_evaluated in rows]
+
+
+def _pending_evaluations(defenders: List[dict]) -> List[int]:
+    return [defender['student_id'] for defender in defenders
+            if defender['status'] != 'Pending' and not defender['has_evaluated']]
+
+
+def advisor_dashboard(advisor_id: int, department_id: int, is_jury: bool) -> dict:
+    """
+    Get the proposals made to an advisor, the students they advise, the
+        students they are a jury member of, and the dissertations they
+        are yet to evaluate, in three queries.
+
+    :param advisor_id: ID of the advisor.
+    :param department_id: ID of the department of the advisor.
+    :param is_jury: True if the advisor is also a jury member.
+    :return The dashboard of the advisor.
+    """
+    latest_thesis_column, latest_thesis_join = _latest_thesis_column()
+    with global_query_handler.department_scope(department_id):
+        proposals = _rows_as_dicts(
+            ['proposal_id', 'student_id', 'name_', 'surname', 'thesis_topic'],
+            "SELECT Proposal.proposal_id, Proposal.student_id, USER_.name_, USER_.surname, Student.thesis_topic"
+            " FROM Proposal JOIN USER_ ON USER_.user_id = Proposal.student_id"
+            " JOIN Student ON Student.student_id = Proposal.student_id"
+            f" WHERE Proposal.advisor_id = {advisor_id} ORDER BY Proposal.proposal_id")
+        students = _rows_as_dicts(
+            ['student_id', 'name_', 'surname', 'thesis_topic', 'is_thesis_sent', 'latest_thesis_id', 'jury_date',
+             'status'],
+            "SELECT Student.student_id, USER_.name_, USER_.surname, Student.thesis_topic, Student.is_thesis_sent,"
+            f" {latest_thesis_column}, Dissertation.jury_date, {_status_column}"
+            " FROM Instructor JOIN Student ON Student.student_id = Instructor.student_id"
+            " JOIN USER_ ON USER_.user_id = Student.student_id" + latest_thesis_join + _dissertation_join +
+            f" WHERE Instructor.advisor_id = {advisor_id} ORDER BY Instructor.id_")
+        defenders = _defenders(advisor_id) if is_jury else []
+    for student in students:
+        student['is_thesis_sent'] = bool(student['is_thesis_sent'])
+    return {"proposals": proposals, "students": students, "defenders": defenders,
+            "pending_evaluations": _pending_evaluations(defenders)}
+
+
+def jury_dashboard(jury_id: int) -> dict:
+    """
+    Get the students a jury member is in the jury of, and the
+        dissertations they are yet to evaluate, in a single query.
+
+    :param jury_id: ID of the jury member.
+    :return The dashboard of the jury member.
+    """
+    defenders = _defenders(jury_id)
+    return {"defenders": defenders, "pending_evaluations": _pending_evaluations(defenders)}
+
+
+def dbr_dashboard(department_id: int) -> dict:
+    """
+    Get the state of every student of a department, their advisors,
+        recommendations and dissertations, in a single query.
+
+    :param department_id: ID of the department.
+    :return The dashboard of the department.
+    """
+    with global_query_handler.department_scope(department_id):
+        students = _rows_as_dicts(
+            ['student_id', 'name_', 'surname', 'thesis_topic', 'advisor_id', 'recommended_advisors',
+             'proposal_count', 'jury_date', 'status'],
+            "SELECT Student.student_id, USER_.name_, USER_.surname, Student.thesis_topic, Instructor.advisor_id,"
+            " (SELECT GROUP_CONCAT(advisor_id) FROM"
+            " (SELECT advisor_id FROM Recommended WHERE Recommended.student_id = Student.student_id"
+            " ORDER BY recommendation_id)),"
+            " (SELECT COUNT(*) FROM Proposal WHERE Proposal.student_id = Student.student_id),"
+            f" Dissertation.jury_date, {_status_column}"
+            " FROM Student JOIN USER_ ON USER_.user_id = Student.student_id"
+            " LEFT JOIN Instructor ON Instructor.student_id = Student.student_id" + _dissertation_join +
+            f" WHERE USER_.department_id = {department_id} ORDER BY Student.student_id")
+    status_counts = {}
+    for student in students:
+        recommended: Optional[str] = student['recommended_advisors']
+        student['recommended_advisors'] = [int(advisor_id) for advisor_id in recommended.split(',')] \
+            if recommended else []
+        student['needs_recommendation'] = student['advisor_id'] is None and not student['recommended_advisors'] \
+            and not student['proposal_count']
+        if student['status'] is not None:
+            status_counts[student['status']] = status_counts.get(student['status'], 0) + 1
+    return {"students": students, "status_counts": status_counts}
@@ -2,13 +2,51 @@
 This module contains functions and classes that connect to the
     database.
 """
+import re
+from bisect import insort
 from abc import abstractmethod, ABC
-from os import getenv, remove
-from os.path import exists
+from contextlib import contextmanager
+from os import getenv, remove, makedirs
+from os.path import exists, join
 import sqlite3
-from typing import Optional, Any, Dict, List, Union
+from types import MappingProxyType
+from typing import Optional, Any, Dict, Iterable, List, Set, Union, Iterator, Mapping, Callable
 from dataclasses import is_dataclass
-from threading import Lock
+from threading import Lock, Condition, Event, local
+from time import sleep, monotonic
+
+
+class _PendingWrite:
+    """
+    A write query waiting to be committed as a part of a group,
+        holds the results of the query once the group is committed.
+    """
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self.last_row_id: Optional[int] = None
+        self.row_count = -1
+        self.error: Optional[Exception] = None
+        self.done = Event()  # Set when the group containing this write is committed.
+        self.is_started = False  # Set once the leader of the group executes the write.
+        self.is_cancelled = False  # Set if the writer ran out of time before the write was executed.
+
+
+class QueryDeadlineException(Exception):
+    """
+    Raised when a query cannot be completed within the time budget
+        of the thread executing it.
+    """
+    pass
+
+
+def _is_read_query(query: str) -> bool:
+    """
+    Check if a query only reads from the database.
+
+    :param query: Query to check.
+    :return True if the query is a SELECT query.
+    """
+    return query.lstrip().lower().startswith("select")
 
 
 class QueryHandler(ABC):
@@ -16,15 +54,28 @@ class QueryHandler(ABC):
     Class that encapsulates queries to the underlying
         DBMS.
     """
-    def __init__(self, conn: Union[sqlite3.Connection], cur: Union[sqlite3.Cursor], lock_for_access):
+    maintains_derived_tables = True  # Whether the triggers keep the summary tables up to date.
+
+    def __init__(self, conn: Union[sqlite3.Connection], cur: Union[sqlite3.Cursor], lock_for_access,
+                 group_commit_window: float = 0.0):
         """
         If lock_for_access is set to True, lock the database before making
             any changes.
+
+        If group_commit_window is larger than zero, write queries that arrive
+            from different threads within this many seconds of each other are
+            committed together in a single transaction.
         """
         self.connection = conn
         self.cursor = cur
         self.should_lock = lock_for_access
         self.lock = Lock()
+        self.group_commit_window = group_commit_window
+        self._local = local()  # Per thread results, such as the last inserted row id.
+        self._group_condition = Condition()  # Guards the pending writes and the leader flag.
+        self._pending_writes: List[_PendingWrite] = []
+        self._is_group_led = False  # True while a thread is collecting a group of writes.
+        self._is_archive_attached = False
 
     def execute_query(self, query: str) -> Optional[list]:
         """
@@ -36,19 +87,441 @@ class QueryHandler(ABC):
         :return The results of the fetch statement,
             or None.
         """
+        if getattr(self._local, 'is_read_scope', False):
+            if _is_read_query(query):
+                reader = self._snapshot_reader()
+                if reader is not None:
+                    return self._execute_in_snapshot(reader, query)
+            else:
+                self._end_snapshot()  # So that the reads after this write can see it.
+        if self.group_commit_window > 0 and not _is_read_query(query):
+            self._remaining_time()  # Do not even queue the write if the time is up.
+            return self._execute_in_group(query)
         return_value = None
-        if self.should_lock:
-            self.lock.acquire()
+        self._acquire_lock()
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is not None:  # Interrupt the query once the deadline passes.
+            self.connection.set_progress_handler(lambda: monotonic() > deadline, 1000)
         try:
             self.cursor.execute(query)
-            if "select" in query.lower():  # If this is a select query.
+            if _is_read_query(query):  # If this is a select query.
                 return_value = self.cursor.fetchall()  # Fetch and return the results.
+            self._local.last_row_id = self.cursor.lastrowid
+            self._local.row_count = self.cursor.rowcount
             self.connection.commit()  # Otherwise commit the results.
+        except sqlite3.OperationalError as error:
+            if deadline is None or monotonic() <= deadline:
+                raise
+            self.connection.rollback()  # Do not leave the interrupted write's transaction open.
+            raise QueryDeadlineException("Query was interrupted as it exceeded its time budget.") from error
         finally:
+            if deadline is not None:
+                self.connection.set_progress_handler(None, 0)
             if self.should_lock:
                 self.lock.release()
         return return_value
 
+    def begin_read_scope(self) -> None:
+        """
+        Let the reads this thread makes from now on share a single read
+            transaction, hence a single snapshot of the database, that is
+            opened at the first read. Reads in the snapshot neither take
+            the lock nor commit. A write by this thread ends the snapshot,
+            the next read opens a new one that includes the write.
+        """
+        self._local.is_read_scope = True
+
+    def end_read_scope(self) -> None:
+        """
+        End the read transaction of this thread, if any, and return
+            to taking the lock for every query.
+        """
+        self._local.is_read_scope = False
+        self._end_snapshot()
+        reader = getattr(self._local, 'reader', None)
+        if reader is not None:
+            reader.close()
+            self._local.reader = None
+
+    def read_scope_cache(self) -> Optional[dict]:
+        """
+        Get the dictionary this thread memoizes values derived from the
+            database in, it is emptied when the thread writes to the
+            database or its read scope ends, as the snapshot is.
+
+        :return The dictionary, or None outside of a read scope.
+        """
+        if not getattr(self._local, 'is_read_scope', False):
+            return None
+        if getattr(self._local, 'scope_cache', None) is None:
+            self._local.scope_cache = {}
+        return self._local.scope_cache
+
+    def _connect_reader(self) -> Optional[sqlite3.Connection]:
+        """
+        Open a connection that reads from the same database, a reader
+            may not be used for writes.
+
+        :return The connection, or None if the handler does not support
+            read snapshots.
+        """
+        return None
+
+    def _snapshot_reader(self) -> Optional[sqlite3.Connection]:
+        """
+        Get this thread's reader, opening it and its read transaction
+            if necessary.
+
+        :return The reader, or None if the handler does not support read
+            snapshots.
+        """
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            reader = self._connect_reader()
+            if reader is None:
+                return None
+            self._local.reader = reader
+            self._local.is_reader_archive_attached = False
+        if self._is_archive_attached and not self._local.is_reader_archive_attached:
+            if reader.in_transaction:
+                reader.rollback()  # Databases cannot be attached within a transaction.
+            reader.execute(f"ATTACH DATABASE '{self.archive_name()}' AS archive")
+            self._local.is_reader_archive_attached = True
+        if not reader.in_transaction:
+            reader.execute("BEGIN DEFERRED")  # The snapshot is taken at the first read.
+        return reader
+
+    def _end_snapshot(self) -> None:
+        """
+        End this thread's read transaction, if any.
+        """
+        self._local.scope_cache = None
+        reader = getattr(self._local, 'reader', None)
+        if reader is not None and reader.in_transaction:
+            reader.rollback()  # Nothing was written, there is nothing to commit.
+
+    def _execute_in_snapshot(self, reader: sqlite3.Connection, query: str) -> list:
+        """
+        Execute a read query in this thread's read transaction.
+
+        :param reader: Reader of this thread.
+        :param query: Read query to execute.
+        :return The results of the query.
+        """
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is not None:
+            self._remaining_time()
+            reader.set_progress_handler(lambda: monotonic() > deadline, 1000)
+        try:
+            return reader.execute(query).fetchall()
+        except sqlite3.OperationalError as error:
+            if deadline is None or monotonic() <= deadline:
+                raise
+            raise QueryDeadlineException("Query was interrupted as it exceeded its time budget.") from error
+        finally:
+            if deadline is not None:
+                reader.set_progress_handler(None, 0)
+
+    def set_time_budget(self, budget: Optional[float]) -> None:
+        """
+        Set the time budget of the queries this thread executes from
+            now on, queries that wait for the lock or run past the budget
+            raise QueryDeadlineException.
+
+        :param budget: Time budget in seconds, or None to remove the budget.
+        """
+        self._local.deadline = None if budget is None else monotonic() + budget
+
+    def _remaining_time(self) -> Optional[float]:
+        """
+        Get the time remaining in this thread's time budget.
+
+        :return Remaining time in seconds, or None if there is no budget.
+        :raise QueryDeadlineException: If the time budget is exhausted.
+        """
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is None:
+            return None
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            raise QueryDeadlineException("Time budget for the queries is exhausted.")
+        return remaining
+
+    def _acquire_lock(self) -> None:
+        """
+        Acquire the lock if locking is enabled, waiting at most as long
+            as this thread's time budget allows.
+
+        :raise QueryDeadlineException: If the lock cannot be acquired in time.
+        """
+        if not self.should_lock:
+            return
+        remaining = self._remaining_time()
+        if not self.lock.acquire(timeout=-1 if remaining is None else remaining):
+            raise QueryDeadlineException("Timed out while waiting for the database.")
+
+    def _execute_in_group(self, query: str) -> None:
+        """
+        Queue a write query to be committed alongside the other writes
+            that arrive within the group commit window. The first thread
+            to queue a write leads the group, waits for the window to pass
+            and commits every write in the group, the rest simply wait.
+            A write that is not executed within this thread's time budget
+            is withdrawn from its group.
+
+        :param query: Write query to execute.
+        :raise The error raised while executing this particular query, if any.
+        :raise QueryDeadlineException: If the write is withdrawn.
+        """
+        pending = _PendingWrite(query)
+        with self._group_condition:
+            self._pending_writes.append(pending)
+            is_leader = not self._is_group_led
+            self._is_group_led = True
+        if is_leader:
+            sleep(self.group_commit_window)  # Let the rest of the burst arrive.
+            with self._group_condition:
+                group, self._pending_writes = self._pending_writes, []
+                self._is_group_led = False  # Writes arriving from now on form the next group.
+            self._commit_group(group)
+        deadline = getattr(self._local, 'deadline', None)
+        if not pending.done.wait(timeout=None if deadline is None else max(deadline - monotonic(), 0)):
+            with self._group_condition:
+                if not pending.is_started:
+                    pending.is_cancelled = True  # The leader skips it, or it is never taken into a group.
+                    if pending in self._pending_writes:
+                        self._pending_writes.remove(pending)
+                    raise QueryDeadlineException("Timed out while waiting for the group commit.")
+            pending.done.wait()  # Already executed, its group is being committed.
+        self._local.last_row_id = pending.last_row_id
+        self._local.row_count = pending.row_count
+        if pending.error is not None:
+            raise pending.error
+
+    def _commit_group(self, group: List[_PendingWrite]) -> None:
+        """
+        Execute a group of writes in a single transaction, each write
+            is isolated in its own savepoint so that a failing write
+            does not roll back the others. If the group itself fails, such
+            as when it cannot be committed, every write in it fails.
+
+        :param group: Writes to commit together.
+        """
+        try:
+            self._acquire_lock()  # Within the time budget of the leader.
+        except QueryDeadlineException as error:
+            for pending in group:
+                pending.error = error
+                pending.done.set()
+            return
+        try:
+            if not self.connection.in_transaction:
+                self.cursor.execute("BEGIN")
+            for pending in group:
+                with self._group_condition:
+                    if pending.is_cancelled:
+                        continue
+                    pending.is_started = True
+                self.cursor.execute("SAVEPOINT group_write")
+                try:
+                    self.cursor.execute(pending.query)
+                    pending.last_row_id = self.cursor.lastrowid
+                    pending.row_count = self.cursor.rowcount
+                except sqlite3.Error as error:
+                    self.cursor.execute("ROLLBACK TO group_write")  # Undo only this write.
+                    pending.error = error
+                self.cursor.execute("RELEASE group_write")
+            self.connection.commit()  # A single commit, hence a single fsync, for the group.
+        except Exception as error:  # Nothing in the group is committed.
+            if self.connection.in_transaction:
+                self.connection.rollback()
+            for pending in group:
+                pending.error = pending.error or error
+        finally:
+            if self.should_lock:
+                self.lock.release()
+            for pending in group:
+                pending.done.set()
+
+    def last_row_count(self) -> int:
+        """
+        Get the number of rows modified by the last write query
+            executed by this thread.
+
+        :return Number of rows modified.
+        """
+        return self._local.row_count
+
+    def data_version(self) -> int:
+        """
+        Get the data version of the database, this value changes
+            whenever a *different* connection commits a change, so
+            in-memory copies of the data can detect external changes.
+
+        :return The data version of the database.
+        """
+        return self.execute_pragma("PRAGMA data_version")[0][0]
+
+    def scoped_data_version(self) -> int:
+        """
+        Get the data version of the database, polled once per read scope
+            and remembered until the scope writes or ends, so that the
+            in-memory copies checked many times in a request do not query
+            the database for every check. Outside of a read scope the data
+            version is polled at every call.
+
+        :return The data version of the database.
+        """
+        cache = self.read_scope_cache()
+        if cache is None:
+            return self.data_version()
+        if 'data_version' not in cache:
+            cache['data_version'] = self.data_version()
+        return cache['data_version']
+
+    def execute_latest_query(self, query: str) -> list:
+        """
+        Execute a read query on the latest state of the database, rather
+            than in this thread's snapshot, for the in-memory copies of the
+            data that are shared by every thread. The read takes the lock
+            and leaves the snapshot of the read scope, if any, intact.
+
+        :param query: Read query to execute.
+        :return The results of the query.
+        """
+        is_read_scope = getattr(self._local, 'is_read_scope', False)
+        self._local.is_read_scope = False
+        try:
+            return self.execute_query(query)
+        finally:
+            self._local.is_read_scope = is_read_scope
+
+    def execute_gathered_query(self, query: str) -> list:
+        """
+        Execute a read query whose result is the union of its results in
+            each department, ie: each row it selects is computed from the
+            rows of a single department, alongside the global tables. Only
+            sharded query handlers make use of this, they gather the rows
+            from every shard and leave merging them to the caller.
+
+        :param query: Read query to execute.
+        :return The results of the query.
+        """
+        return self.execute_query(query)
+
+    def execute_pragma(self, pragma: str) -> list:
+        """
+        Execute a PRAGMA statement and return all of its rows.
+
+        :param pragma: PRAGMA statement to execute.
+        :return The rows returned by the statement.
+        """
+        self._acquire_lock()
+        try:
+            rows = self.cursor.execute(pragma).fetchall()
+            if self.connection.in_transaction:
+                self.connection.commit()
+            return rows
+        finally:
+            if self.should_lock:
+                self.lock.release()
+
+    def execute_transaction(self, queries: List[str]) -> None:
+        """
+        Execute several write queries in a single transaction, either
+            all of them take effect or none of them do.
+
+        :param queries: Write queries to execute, in order.
+        """
+        self._end_snapshot()  # So that the reads after these writes can see them.
+        self._acquire_lock()
+        try:
+            if not self.connection.in_transaction:
+                self.cursor.execute("BEGIN")
+            for query in queries:
+                self.cursor.execute(query)
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        finally:
+            if self.should_lock:
+                self.lock.release()
+
+    def archive_name(self) -> str:
+        """
+        Get the name of the archive file of this database, records
+            that are no longer in use are moved there.
+
+        :return Name of the archive file, next to the database file.
+        """
+        main_file = next(file for _, name, file in self.execute_pragma("PRAGMA database_list") if name == 'main')
+        root, extension = (main_file[:-3], '.db') if main_file.endswith('.db') else (main_file, '.db')
+        return f"{root}_archive{extension}"
+
+    def attach_archive(self, create: bool = False) -> bool:
+        """
+        Attach the archive file of this database as the schema archive.
+
+        :param create: Create the archive file if it does not exist.
+        :return True if the archive is attached.
+        """
+        if self._is_archive_attached:
+            return True
+        archive_name = self.archive_name()
+        if not create and not exists(archive_name):
+            return False
+        self.execute_pragma(f"ATTACH DATABASE '{archive_name}' AS archive")
+        self._is_archive_attached = True
+        return True
+
+    def backup(self, target_name: str, pages: int = 64, pause: float = 0.005) -> None:
+        """
+        Copy the database to another file while it is in use, a batch of
+            pages at a time. The lock is released between the batches, so
+            queries of the other threads are only delayed by one batch, and
+            their changes are carried over to the copy as it is made.
+
+        :param target_name: Name of the file to back up to.
+        :param pages: Number of pages to copy in a single batch.
+        :param pause: Seconds to wait between the batches.
+        """
+        def yield_between_batches(status: int, remaining: int, total: int) -> None:
+            if self.should_lock:
+                self.lock.release()
+            sleep(pause)
+            if self.should_lock:
+                self.lock.acquire()
+
+        target = sqlite3.connect(target_name)
+        if self.should_lock:
+            self.lock.acquire()
+        try:
+            self.connection.backup(target, pages=pages, progress=yield_between_batches)
+        finally:
+            if self.should_lock:
+                self.lock.release()
+            target.close()
+
+    def database_handlers(self) -> Dict[str, "QueryHandler"]:
+        """
+        Get the query handlers of each database file this handler uses.
+
+        :return A dictionary of database names and their query handlers.
+        """
+        return {'main': self}
+
+    @contextmanager
+    def department_scope(self, department_id: int) -> Iterator[None]:
+        """
+        Declare that the queries executed by this thread inside the
+            with block concern the given department. Only sharded
+            query handlers make use of this.
+
+        :param department_id: ID of the department.
+        """
+        yield
+
     @property
     @abstractmethod
     def last_inserted_row_id(self) -> int:
@@ -60,19 +533,77 @@ class QueryHandler(ABC):
         pass
 
 
+# Statements of an SQL script that create a table, a view, an index or a trigger, after their comments.
+_schema_statement_pattern = re.compile(r"^\s*(?:/\*.*?\*/\s*)*CREATE\b", re.DOTALL | re.IGNORECASE)
+
+
+def _schema_statements(script: str) -> List[str]:
+    """
+    Get the statements of an SQL script that create the schema,
+        leaving out the rows it inserts.
+
+    :param script: The SQL script.
+    :return The statements that create tables, views, indices and triggers, in order.
+    """
+    statements: List[str] = []
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if _schema_statement_pattern.match(statement):
+                statements.append(statement)
+            statement = ''
+    return statements
+
+
 class TestQueryHandler(QueryHandler):
     """
     Class that handles queries in the testing environment.
     """
-    def __init__(self, db_name) -> None:
+    def __init__(self, db_name, group_commit_window: float = 0.0, read_snapshots: bool = False) -> None:
+        """
+        If read_snapshots is set to True, the database is switched to
+            write-ahead logging, so that read transactions opened with
+            begin_read_scope do not block the writers.
+        """
         self.db_name = db_name
+        self.read_snapshots = read_snapshots
         is_init = exists(db_name)  # Check if the database was initialised.
         conn: sqlite3.Connection = sqlite3.connect(db_name, check_same_thread=False)
         cur: sqlite3.Cursor = conn.cursor()
         if not is_init:  # If the database was not previously initalised.
             with open("init_test_database.sql") as script_f:  # Initialise the database.
                 cur.executescript(script_f.read())
-        super().__init__(conn, cur, True)  # Locks are necessary for SQLite databases.
+        else:
+            self._migrate_schema(conn)
+        if read_snapshots:
+            cur.execute("PRAGMA journal_mode = WAL")
+        super().__init__(conn, cur, True, group_commit_window)  # Locks are necessary for SQLite databases.
+
+    @staticmethod
+    def _migrate_schema(connection: sqlite3.Connection) -> None:
+        """
+        Bring the schema of a database initialised by an earlier version
+            up to date, in a single transaction: add the columns it lacks,
+            then the tables, views, indices and triggers. The rows of the
+            new tables are filled by migrations.migrate_database.
+
+        :param connection: Connection to the database.
+        """
+        student_columns = [row[1] for row in connection.execute("PRAGMA table_info(Student)")]
+        with open("init_test_database.sql") as script_f:
+            statements = _schema_statements(script_f.read())  # Each is guarded by IF NOT EXISTS.
+        connection.execute("BEGIN")
+        with connection:  # Commits, or rolls back if a statement fails.
+            if student_columns and 'row_version' not in student_columns:
+                connection.execute("ALTER TABLE Student ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+            for statement in statements:
+                connection.execute(statement)
+
+    def _connect_reader(self) -> Optional[sqlite3.Connection]:
+        if not self.read_snapshots:
+            return None
+        return sqlite3.connect(self.db_name, check_same_thread=False, isolation_level=None)
 
     def reset_database(self) -> None:
         """
@@ -81,17 +612,387 @@ class TestQueryHandler(QueryHandler):
         self.lock.acquire()
         self.connection.close()
         remove(self.db_name)  # Remove the file.
+        for suffix in ['-wal', '-shm']:  # A stale log would be replayed into the new database.
+            if exists(self.db_name + suffix):
+                remove(self.db_name + suffix)
         self.connection = sqlite3.connect(self.db_name, check_same_thread=False)  # Reconnect.
         self.cursor = self.connection.cursor()
+        self._is_archive_attached = False  # Attachments do not survive the reconnection.
         with open('init_test_database.sql') as script_f:
             self.cursor.executescript(script_f.read())  # Reinitialise the database.
+        if self.read_snapshots:
+            self.cursor.execute("PRAGMA journal_mode = WAL")
         self.lock.release()  # Release the lock.
+        # The new connection may report the data version the copies were stamped with.
+        invalidate_id_indexes()
+        invalidate_reference_tables()
+        _notify_reset()
 
     def last_inserted_row_id(self) -> int:
-        return self.cursor.lastrowid
+        return self._local.last_row_id
+
+
+class ShardRoutingException(Exception):
+    """
+    Raised when a sharded query handler cannot decide which department
+        a write query belongs to.
+    """
+    pass
+
+
+"""
+Tables whose rows belong to a single department, in a sharded setup these
+    are kept in per department database files, with the predicates that
+    select the rows of a department when moving them out of the global
+    database, in the order they must be moved.
+"""
+department_tables: Dict[str, str] = {
+    'Instructor': "student_id IN ({department_users})",
+    'Recommended': "student_id IN ({department_users})",
+    'Proposal': "student_id IN ({department_users})",
+    'Has': "student_id IN ({department_users})",
+    'Defending': "student_id IN ({department_users})",
+    'Thesis': "thesis_id IN (SELECT thesis_id FROM main.Has)",
+    'Dissertation': "dissertation_id IN (SELECT dissertation_id FROM main.Defending)",
+    'Member': "dissertation_id IN (SELECT dissertation_id FROM main.Dissertation)",
+    'Evaluation': "dissertation_id IN (SELECT dissertation_id FROM main.Dissertation)",
+    'DissertationStatus': "dissertation_id IN (SELECT dissertation_id FROM main.Dissertation)",
+}
+_department_tables_lower = {table.lower() for table in department_tables}
+_table_pattern = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+# Department tables named anywhere in a query, except after a schema, such as main.Member, or as a foreign key.
+_department_table_pattern = re.compile(r"(?<![.\w])(?<!REFERENCES )(" + '|'.join(department_tables) + r")\b",
+                                       re.IGNORECASE)
+_several_rows_pattern = re.compile(r"\)\s*,\s*\(")
+# Tables kept up to date by the triggers of the department tables, hence stale in a sharded setup.
+_derived_table_pattern = re.compile(r"\bStudentSummary\b", re.IGNORECASE)
+_insert_pattern = re.compile(r"INSERT INTO \w+\s*\(([^)]*)\)\s*VALUES\s*\((.*)\)", re.IGNORECASE | re.DOTALL)
+_value_pattern = re.compile(r"'(?:[^']|'')*'|[^,\s][^,]*")
+_where_id_pattern = re.compile(r"\bWHERE\s+(\w+)\s*=\s*(-?\d+)\s*;?\s*$", re.IGNORECASE)
+_first_table_pattern = re.compile(r"\bFROM\s+(\w+)", re.IGNORECASE)
+# Reads whose results cannot be concatenated across shards, as they aggregate, limit or nest queries.
+_not_plain_pattern = re.compile(r"\b(?:COUNT|SUM|MIN|MAX|AVG|TOTAL|GROUP_CONCAT)\s*\(|\b(?:GROUP\s+BY|HAVING|DISTINCT"
+                                r"|LIMIT|UNION|INTERSECT|EXCEPT|EXISTS)\b|\(\s*SELECT\b", re.IGNORECASE)
+_shard_id_bits = 32  # Row ids generated in a shard start from (department_id + 1) << _shard_id_bits.
+
+
+class _ShardQueryHandler(QueryHandler):
+    """
+    Handles the queries of a single department's database file, the
+        global database is attached to it so that queries can still
+        join department tables with the user tables.
+    """
+    def __init__(self, shard_name: str, global_name: str, group_commit_window: float = 0.0) -> None:
+        conn: sqlite3.Connection = sqlite3.connect(shard_name, check_same_thread=False)
+        conn.execute(f"ATTACH DATABASE '{global_name}' AS global_db")
+        super().__init__(conn, conn.cursor(), True, group_commit_window)
+
+    def last_inserted_row_id(self) -> int:
+        return self._local.last_row_id
+
+
+class ShardedQueryHandler(TestQueryHandler):
+    """
+    Query handler that keeps the users and the departments in the global
+        database and the rows of the department tables in per department
+        database files, each with its own connection and lock, so that
+        writes in one department do not wait for the writes in another.
+
+    Row ids are unique across shards, hence queries that do not declare a
+        department (see department_scope) can be answered by every shard,
+        reads are gathered from all shards and writes are routed to the
+        shard that owns the row, or the student, they concern. Only plain
+        scans of a department table are gathered implicitly, the results
+        of reads that aggregate, limit or nest queries, or that start from
+        a global table, are not the concatenation of their results in
+        each shard. Such reads must be made in a department scope, or with
+        execute_gathered_query by callers that know how to merge them.
+
+    Queries are routed by the tables named right after FROM, JOIN, INTO
+        or UPDATE and by the id in a trailing WHERE clause, queries naming
+        department tables anywhere else, inserting several rows or matching
+        rows in several departments outside a department scope are refused
+        with a ShardRoutingException rather than sent to the wrong shard.
+
+    Triggers cannot reach across database files, so the triggers of the
+        department tables are not copied to the shards and the summary
+        tables are not maintained, reading them is refused and readers
+        check maintains_derived_tables to read the tables they summarise.
+        Reads in a read scope are not made on a snapshot either, each shard
+        answers with its latest state.
+    """
+    maintains_derived_tables = False
+
+    def __init__(self, db_name: str, shard_directory: str, group_commit_window: float = 0.0) -> None:
+        super().__init__(db_name, group_commit_window)
+        self.shard_directory = shard_directory
+        self.shards: Dict[int, _ShardQueryHandler] = {}
+        self._shards_lock = Lock()  # Guards opening new shards.
+        makedirs(shard_directory, exist_ok=True)
+        for department_id, in super().execute_query("SELECT department_id FROM Department"):
+            self._shard(department_id)
+
+    def _shard(self, department_id: int) -> _ShardQueryHandler:
+        """
+        Get the shard of a department, creating it if necessary.
+
+        :param department_id: ID of the department.
+        :return The query handler of the department's shard.
+        """
+        if department_id in self.shards:
+            return self.shards[department_id]
+        with self._shards_lock:
+            if department_id not in self.shards:
+                shard_name = join(self.shard_directory, f"department_{department_id}.db")
+                is_init = exists(shard_name)
+                shard = _ShardQueryHandler(shard_name, self.db_name, self.group_commit_window)
+                if not is_init:
+                    self._initialise_shard(shard, department_id)
+                else:
+                    self._migrate_shard(shard)
+                self.shards[department_id] = shard
+        return self.shards[department_id]
+
+    def _migrate_shard(self, shard: _ShardQueryHandler) -> None:
+        """
+        Create the department tables an existing shard lacks, such as the
+            ones added to the schema after the shard was initialised.
+
+        :param shard: Query handler of the shard.
+        """
+        self.lock.acquire()
+        try:
+            self._create_department_tables(shard)
+            shard.connection.commit()
+        finally:
+            self.lock.release()
+
+    def _create_department_tables(self, shard: _ShardQueryHandler) -> None:
+        """
+        Create the department tables and their indices a shard lacks, as
+            they are in the global database, the caller holds the lock.
+
+        :param shard: Query handler of the shard.
+        """
+        table_names = ', '.join(f"'{table}'" for table in department_tables)
+        schema = self.cursor.execute("SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL"
+                                     f" AND tbl_name IN ({table_names}) AND type != 'trigger'"
+                                     " ORDER BY type = 'table' DESC").fetchall()
+        existing = {name for name, in shard.cursor.execute("SELECT name FROM main.sqlite_master").fetchall()}
+        for type_, name, sql in schema:
+            if name in existing:
+                continue
+            if type_ == 'table':  # AUTOINCREMENT, so that row ids can start from the shard's base.
+                sql = sql.replace("INTEGER PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT", 1)
+            shard.cursor.execute(sql)
+
+    def _initialise_shard(self, shard: _ShardQueryHandler, department_id: int) -> None:
+        """
+        Create the department tables in a new shard, move the rows of the
+            department from the global database to it, and make sure the
+            row ids generated in the shard do not collide with other shards.
+
+        :param shard: Query handler of the new shard.
+        :param department_id: ID of the department the shard belongs to.
+        """
+        self.lock.acquire()  # The global database is written as well.
+        try:
+            shard.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")  # Must be set before the tables are created.
+            self._create_department_tables(shard)
+            department_users = f"SELECT user_id FROM global_db.USER_ WHERE department_id = {department_id}"
+            base_id = (department_id + 1) << _shard_id_bits
+            for table, predicate in department_tables.items():
+                primary_key = [row[1] for row in shard.cursor.execute(f"PRAGMA table_info({table})") if row[5]][0]
+                predicate = predicate.format(department_users=department_users)
+                shard.cursor.execute(f"INSERT INTO main.{table} SELECT * FROM global_db.{table} WHERE {predicate}")
+                shard.cursor.execute(f"DELETE FROM global_db.{table}"
+                                     f" WHERE {primary_key} IN (SELECT {primary_key} FROM main.{table})")
+                shard.cursor.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+                shard.cursor.execute(f"INSERT INTO sqlite_sequence VALUES ('{table}',"
+                                     f" MAX({base_id}, (SELECT IFNULL(MAX({primary_key}), 0) FROM main.{table})))")
+            shard.connection.commit()
+        finally:
+            self.lock.release()
+
+    @contextmanager
+    def department_scope(self, department_id: int) -> Iterator[None]:
+        previous_scope = getattr(self._local, 'department_id', None)
+        self._local.department_id = department_id
+        try:
+            yield
+        finally:
+            self._local.department_id = previous_scope
+
+    @staticmethod
+    def _department_tables_of(query: str) -> Set[str]:
+        """
+        Get the department tables a query reads or writes, department
+            tables named anywhere else than right after FROM, JOIN, INTO
+            or UPDATE, such as in a comma separated list of tables, would
+            not be routed, hence are refused.
+
+        :param query: Query to route.
+        :return Names of the department tables, in lower case.
+        :raise ShardRoutingException: If the query names department tables it cannot be routed by,
+            or reads a summary table.
+        """
+        if _derived_table_pattern.search(query):
+            raise ShardRoutingException("Summary tables are not maintained in a sharded setup, check"
+                                        " maintains_derived_tables and read the tables they summarise instead.")
+        tables = {table.lower() for table in _table_pattern.findall(query)} & _department_tables_lower
+        if not {table.lower() for table in _department_table_pattern.findall(query)} <= tables:
+            raise ShardRoutingException("Department tables must be named right after FROM, JOIN, INTO or UPDATE"
+                                        " for the query to be routed.")
+        return tables
+
+    def execute_query(self, query: str) -> Optional[list]:
+        if not self._department_tables_of(query):  # Only touches the global database.
+            return super().execute_query(query)
+        if not _is_read_query(query):
+            self._end_snapshot()  # Values memoized from the department tables are now stale.
+        department_id = getattr(self._local, 'department_id', None)
+        if department_id is not None:
+            return self._execute_on(self._shard(department_id), query)
+        elif _is_read_query(query):
+            if not self._is_plain_scan(query):
+                raise ShardRoutingException("Reads that aggregate, limit or nest queries over the department tables"
+                                            " must be made in a department scope, or gathered explicitly.")
+            return self._gather(query)
+        shard = self._route_write(query)
+        if shard is None:  # No shard has the row, hence there is nothing to change.
+            self._local.row_count = 0
+            return None
+        return self._execute_on(shard, query)
+
+    def execute_gathered_query(self, query: str) -> list:
+        if not self._department_tables_of(query):
+            return super().execute_query(query)
+        return self._gather(query)
+
+    def _gather(self, query: str) -> list:
+        return [row for shard in list(self.shards.values()) for row in shard.execute_query(query)]
+
+    @staticmethod
+    def _is_plain_scan(query: str) -> bool:
+        """
+        Check if the results of a read are the concatenation of its results
+            in each shard, ie: it scans a department table, joined to any
+            other table, without aggregating, limiting or nesting queries.
+
+        :param query: Read query to check.
+        :return True if the read can be gathered from every shard.
+        """
+        first_table = _first_table_pattern.search(query)
+        return first_table is not None and first_table.group(1).lower() in _department_tables_lower \
+            and _not_plain_pattern.search(query) is None
+
+    def execute_transaction(self, queries: List[str]) -> None:
+        """
+        Transactions cannot span database files, a transaction that writes
+            to the department tables is executed on the shard of the
+            department scope, or on the shard its first query is routed to.
+        """
+        if not any([self._department_tables_of(query) for query in queries]):
+            return super().execute_transaction(queries)
+        self._end_snapshot()
+        department_id = getattr(self._local, 'department_id', None)
+        shard = self._shard(department_id) if department_id is not None else self._route_write(queries[0])
+        if shard is not None:
+            shard.execute_transaction(queries)
+
+    def _execute_on(self, shard: _ShardQueryHandler, query: str) -> Optional[list]:
+        """
+        Execute a query on a shard, keeping its results for this thread.
+
+        :param shard: Query handler of the shard.
+        :param query: Query to execute.
+        :return The results of the query.
+        """
+        return_value = shard.execute_query(query)
+        self._local.last_row_id = shard.last_inserted_row_id()
+        self._local.row_count = shard.last_row_count()
+        return return_value
+
+    def _route_write(self, query: str) -> Optional[_ShardQueryHandler]:
+        """
+        Find the shard a write query outside of a department scope belongs to,
+            inserts of a single row are routed by the student or the dissertation
+            they concern, and updates and deletes by the row they change, which
+            their where clause must select with a single equality.
+
+        :param query: Write query to route.
+        :return The shard to execute the query on, or None if no shard has the row.
+        :raise ShardRoutingException: If the query cannot be routed.
+        """
+        table = _table_pattern.search(query).group(1)
+        insert_match = _insert_pattern.search(query)
+        if insert_match:
+            if _several_rows_pattern.search(insert_match.group(2)):  # The rows may be in several departments.
+                raise ShardRoutingException(f"Inserts of several rows into {table} must be made in a department scope.")
+            columns = [column.strip() for column in insert_match.group(1).split(',')]
+            values = _value_pattern.findall(insert_match.group(2))
+            if 'student_id' in columns:
+                student_id = values[columns.index('student_id')].strip()
+                department = super().execute_query(f"SELECT department_id FROM USER_ WHERE user_id = {student_id}")
+                if department:
+                    return self._shard(department[0][0])
+            elif 'dissertation_id' in columns:
+                return self._shard_having('Dissertation', 'dissertation_id', int(values[columns.index('dissertation_id')]))
+            raise ShardRoutingException(f"Cannot find the department of an insert into {table}.")
+        where_match = _where_id_pattern.search(query)
+        if where_match is None:
+            raise ShardRoutingException(f"Writes to {table} must be made in a department scope.")
+        return self._shard_having(table, where_match.group(1), int(where_match.group(2)))
+
+    def _shard_having(self, table: str, column: str, value: int) -> Optional[_ShardQueryHandler]:
+        """
+        Find the shard that has a row with the given value.
+
+        :param table: Table of the row.
+        :param column: Column to match.
+        :param value: Value of the column.
+        :return The shard that has the row, or None.
+        :raise ShardRoutingException: If several shards have such rows.
+        """
+        department_id = (value >> _shard_id_bits) - 1
+        if department_id in self.shards:  # Rows created in a shard carry the shard in their id.
+            return self.shards[department_id]
+        shards = [shard for shard in list(self.shards.values())  # Rows moved from the global database are looked up.
+                  if shard.execute_query(f"SELECT 1 FROM {table} WHERE {column} = {value} LIMIT 1")]
+        if len(shards) > 1:
+            raise ShardRoutingException(f"Rows of {table} with {column} = {value} are in several departments,"
+                                        " the write must be made in a department scope.")
+        return shards[0] if shards else None
+
+    def data_version(self) -> int:
+        return super().data_version() + sum(shard.data_version() for shard in list(self.shards.values()))
 
+    def database_handlers(self) -> Dict[str, QueryHandler]:
+        handlers: Dict[str, QueryHandler] = {'main': self}
+        handlers.update((f'department_{department_id}', shard) for department_id, shard in list(self.shards.items()))
+        return handlers
 
-global_query_handler = TestQueryHandler(getenv('FLASK_DB_NAME', 'mbs.db'))  # Declaring it in global will let flask threads handle this.
+    def set_time_budget(self, budget: Optional[float]) -> None:
+        super().set_time_budget(budget)
+        for shard in list(self.shards.values()):
+            shard._local.deadline = self._local.deadline  # Shards share the deadline of the thread.
+
+
+if getenv('FLASK_DB_SHARD_DIRECTORY'):
+    global_query_handler = ShardedQueryHandler(getenv('FLASK_DB_NAME', 'mbs.db'), getenv('FLASK_DB_SHARD_DIRECTORY'),
+                                               float(getenv('FLASK_DB_GROUP_COMMIT_MS', '0')) / 1000)
+else:
+    global_query_handler = TestQueryHandler(getenv('FLASK_DB_NAME', 'mbs.db'),
+                                            float(getenv('FLASK_DB_GROUP_COMMIT_MS', '0')) / 1000, read_snapshots=True)
+    # Declaring it in global will let flask threads handle this.
+
+
+class ConcurrentUpdateException(Exception):
+    """
+    Raised when a versioned record is updated using a stale copy, ie:
+        the record was changed by someone else after it was fetched.
+    """
+    pass
 
 
 def _stringfy(value: Any) -> str:
@@ -110,6 +1011,263 @@ def _stringfy(value: Any) -> str:
         value = f"'{value}'"  # Add the appropriate quotes.
     return str(value)
 
+class _IdIndex:
+    """
+    In-memory set of the object ids of a bound table, used to answer
+        existence checks without querying the database. Changes made
+        through the bound class are applied directly, changes made by
+        any other connection cause the index to be reloaded. Reloads
+        build the ids aside and publish them at once, so that readers
+        never see a partial set.
+    """
+    def __init__(self, table_name: str, obj_id_row: str) -> None:
+        self.query = f"SELECT {obj_id_row} FROM {table_name}"
+        self.ids: Set[int] = set()
+        self.data_version: Optional[int] = None  # Data version of the database the last time ids were loaded.
+        self._lock = Lock()  # Serialises the writers, readers do not take it.
+        _id_indexes.append(self)
+
+    def load(self) -> None:
+        """
+        Load the ids from the database.
+        """
+        data_version = global_query_handler.scoped_data_version()  # Taken first, later changes cause another reload.
+        ids = {row[0] for row in global_query_handler.execute_latest_query(self.query)}
+        with self._lock:
+            self.ids = ids
+            self.data_version = data_version  # Stamped only once the new ids are published.
+
+    def __contains__(self, object_id: int) -> bool:
+        if self.data_version != global_query_handler.scoped_data_version():  # Someone else changed the database.
+            self.load()
+        return object_id in self.ids
+
+    def add(self, object_id: int) -> None:
+        with self._lock:
+            self.ids.add(object_id)
+
+    def discard(self, object_id: int) -> None:
+        with self._lock:
+            self.ids.discard(object_id)
+
+
+class _GroupIndex:
+    """
+    In-memory ids of a bound table grouped by the value of one of its
+        fields, such as the students of each department, used to list
+        the members of a group without querying the database. The field
+        may belong to a superclass' table. Changes made through the bound
+        classes are applied directly, changes made by any other connection
+        cause the index to be reloaded. Reloads build the groups aside and
+        publish them at once, so that readers never see partial groups.
+    """
+    def __init__(self, table_name: str, obj_id_row: str, field: str, field_table: str, field_id_row: str) -> None:
+        self.table_name = table_name
+        self.field = field
+        self.field_table = field_table  # Table the field belongs to.
+        self.query = f"SELECT {table_name}.{obj_id_row}, {field_table}.{field} FROM {table_name}"
+        if field_table != table_name:
+            self.query += f" JOIN {field_table} ON {field_table}.{field_id_row} = {table_name}.{obj_id_row}"
+        self.id_column = f"{table_name}.{obj_id_row}"
+        self.groups: Dict[Any, List[int]] = {}  # Sorted ids of each group.
+        self.values: Dict[int, Any] = {}  # Group of each id.
+        self.data_version: Optional[int] = None  # Data version of the database the last time ids were loaded.
+        self._lock = Lock()  # Serialises the writers, readers do not take it.
+        _group_indexes.append(self)
+
+    def load(self) -> None:
+        """
+        Load the ids and their groups from the database.
+        """
+        data_version = global_query_handler.scoped_data_version()  # Taken first, later changes cause another reload.
+        values = {object_id: value for object_id, value in global_query_handler.execute_latest_query(self.query)}
+        groups: Dict[Any, List[int]] = {}
+        for object_id in sorted(values):
+            groups.setdefault(values[object_id], []).append(object_id)
+        with self._lock:
+            self.groups, self.values = groups, values
+            self.data_version = data_version  # Stamped only once the new groups are published.
+
+    def ids_in(self, value: Any) -> List[int]:
+        """
+        Get the ids in a group.
+
+        :param value: Value of the field shared by the group.
+        :return The ids in the group, in ascending order.
+        """
+        if self.data_version != global_query_handler.scoped_data_version():  # Someone else changed the database.
+            self.load()
+        return list(self.groups.get(value, []))
+
+    def add(self, object_id: int) -> None:
+        """
+        Add a newly inserted id to its group, reading its group from the database.
+        """
+        rows = global_query_handler.execute_latest_query(f"{self.query} WHERE {self.id_column} = {object_id}")
+        if rows:
+            self.move(object_id, rows[0][1])
+
+    def move(self, object_id: int, value: Any) -> None:
+        with self._lock:
+            self._discard(object_id)
+            self.values[object_id] = value
+            insort(self.groups.setdefault(value, []), object_id)
+
+    def discard(self, object_id: int) -> None:
+        with self._lock:
+            self._discard(object_id)
+
+    def _discard(self, object_id: int) -> None:
+        if object_id in self.values:
+            self.groups[self.values.pop(object_id)].remove(object_id)
+
+
+_id_indexes: List[_IdIndex] = []  # Every id index, so that they can be invalidated together.
+_group_indexes: List[_GroupIndex] = []
+
+
+def invalidate_id_indexes() -> None:
+    """
+    Force every id and group index to be reloaded the next time it is
+        used, must be called after rows are inserted or deleted in bulk
+        without going through the bound classes.
+    """
+    for index in [*_id_indexes, *_group_indexes]:
+        index.data_version = None
+
+
+class ReferenceTable:
+    """
+    Immutable in-memory copy of a small table that rarely changes, such
+        as Department, so that serialising a record does not need a query
+        per reference. The copy is loaded at the first use and kept until
+        it is invalidated, a missing id also causes a reload, as the record
+        may have been added since.
+    """
+    def __init__(self, class_type: type) -> None:
+        self.class_type = class_type
+        self._records: Optional[Mapping[int, Any]] = None
+        _reference_tables.append(self)
+
+    def load(self) -> Mapping[int, Any]:
+        """
+        Load the records of the table from the database.
+
+        :return A read only mapping of object ids to records.
+        """
+        if self.class_type._table_inheritance:
+            raise TypeError("Only the tables without superclasses can be used as reference tables.")
+        rows = global_query_handler.execute_latest_query(f"SELECT * FROM {self.class_type._table_name}")
+        records = [self.class_type(*row) for row in rows]
+        self._records = MappingProxyType({getattr(record, self.class_type._obj_id_row): record for record in records})
+        return self._records
+
+    @property
+    def records(self) -> Mapping[int, Any]:
+        """
+        Get every record of the table.
+
+        :return A read only mapping of object ids to records.
+        """
+        records = self._records
+        return records if records is not None else self.load()
+
+    def __getitem__(self, object_id: int) -> Any:
+        records = self.records
+        if object_id not in records:
+            records = self.load()
+        return records[object_id]
+
+    def invalidate(self) -> None:
+        """
+        Drop the copy, so that the next use loads the table again.
+        """
+        self._records = None
+
+
+_reference_tables: List[ReferenceTable] = []  # Every reference table, so that they can be invalidated together.
+
+
+def invalidate_reference_tables() -> None:
+    """
+    Force every reference table to be reloaded the next time it is used,
+        must be called after the reference data is changed.
+    """
+    for table in _reference_tables:
+        table.invalidate()
+
+
+_write_listeners: Dict[str, List[Callable[[str, Any], None]]] = {}  # Table names to their listeners.
+
+
+def listen_to_writes(table_name: str, listener: Callable[[str, Any], None]) -> None:
+    """
+    Call a listener after every write made to a table through its bound
+        class, so that data derived from the table can be kept up to date.
+
+    :param table_name: Name of the table, such as Member.
+    :param listener: Called with the operation, 'create', 'update' or
+        'delete', and the record written.
+    """
+    _write_listeners.setdefault(table_name, []).append(listener)
+
+
+_reset_listeners: List[Callable[[], None]] = []
+
+
+def listen_to_resets(listener: Callable[[], None]) -> None:
+    """
+    Call a listener after the database is reset, so that the data
+        derived from it elsewhere can be dropped.
+
+    :param listener: Called with no arguments.
+    """
+    _reset_listeners.append(listener)
+
+
+def _notify_reset() -> None:
+    """
+    Call the listeners after the database is reset.
+    """
+    for listener in _reset_listeners:
+        listener()
+
+
+def _notify_write(table_name: str, operation: str, record: Any) -> None:
+    """
+    Call the listeners of a table after a write.
+
+    :param table_name: Name of the table written to.
+    :param operation: One of 'create', 'update' or 'delete'.
+    :param record: The record written.
+    """
+    for listener in _write_listeners.get(table_name, []):
+        listener(operation, record)
+
+
+def _move_in_group_indexes(table_name: str, object_id: int, alterations: Dict[str, Any]) -> None:
+    """
+    Move an updated record to its new group in the group indexes grouped
+        by one of the updated fields.
+
+    :param table_name: Name of the updated table.
+    :param object_id: ID of the updated record.
+    :param alterations: Dictionary of changed field names and their new values.
+    """
+    for index in _group_indexes:
+        if index.field_table == table_name and index.field in alterations and object_id in index.values:
+            index.move(object_id, alterations[index.field])
+
+
+def _generate_set_clause(alterations: Dict[str, Any]) -> str:
+    """
+    Generate the SET clause of an UPDATE query.
+
+    :param alterations: Dictionary of changed field names and their new values.
+    :return the set clause, ie: "a = 1, b = 'text'".
+    """
+    return ', '.join(f"{row_name} = {_stringfy(value)}" for row_name, value in alterations.items())
+
 """
 Below is the main functions that deal with the connection between
     classes and their database bindings, upon reviewing this section
@@ -152,6 +1310,25 @@ def _generate_unique_fields(class_: type, inheritance_tree: Dict[type, List[str]
     return fields  # Remaining ones are the unique fields.
 
 
+def _generate_serializer(class_: type, hidden_fields: Set[str]) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Generate a function that converts an instance of the dataclass to a flat
+        dictionary of its visible fields. Unlike dataclasses.asdict, the
+        function neither recurses into nor copies the field values, and
+        it never reads the hidden fields.
+
+    :param class_: Dataclass to generate the serializer for.
+    :param hidden_fields: Fields left out of the dictionary.
+    :return the serializer, compiled once for the class.
+    """
+    assert is_dataclass(class_)
+    visible = [field for field in class_.__dataclass_fields__ if field not in hidden_fields]
+    items = ', '.join(f"{field!r}: self.{field}" for field in visible)
+    namespace: Dict[str, Any] = {}
+    exec(f"def serialize(self):\n    return {{{items}}}\n", namespace)  # A dict display, as dataclasses does.
+    return namespace['serialize']
+
+
 def _generate_inheritance_tree(class_: type) -> Dict[type, List[str]]:
     """
     Given a dataclass categorise its field names based on which superclass
@@ -176,7 +1353,8 @@ def _generate_inheritance_tree(class_: type) -> Dict[type, List[str]]:
     return fields
 
 
-def bind_database(obj_id_row: str):
+def bind_database(obj_id_row: str, version_row: Optional[str] = None, index_ids: bool = False,
+                  group_by: Optional[str] = None, hidden_fields: Iterable[str] = ()):
     """
     When decorating a dataclass, this decorator mutates the behaviour of the dataclass
         in the following ways:
@@ -190,6 +1368,8 @@ def bind_database(obj_id_row: str):
             bound database object.
         4) Adds the create method, which creates an object with the given id and
             row information.
+        5) Adds the serialize method, which converts the object to a dictionary
+            of its fields, except the hidden ones, for JSON responses.
 
     In order to bind the dataclass to the database, the database defined in the
         QueryHandler must already be instantiated and its schemas must be set up,
@@ -197,8 +1377,22 @@ def bind_database(obj_id_row: str):
         in the database *except* their naming convention which must be snake case,
         as per PEP8.
 
+    If a version_row is given, the bound table must have an integer column of
+        that name, which is not a field of the dataclass, updates then only succeed
+        if the record was not updated since it was fetched and raise
+        ConcurrentUpdateException otherwise.
+
     :param obj_id_row: The name of the field that holds
             the object id in the database.
+    :param version_row: The name of the column that holds
+            the row version in the database, if any.
+    :param index_ids: If True, keep the object ids of the table in
+            memory so that has answers without querying the database.
+    :param group_by: Name of a field, if given, the object ids of the table
+            are kept in memory grouped by the value of this field, so that
+            ids_where answers for this field without querying the database.
+    :param hidden_fields: Names of the fields that are never serialized,
+            in addition to the ones hidden by the bound parents of the class.
     :return the wrapper function that mutates the dataclass.
     """
     def wrapper(dataclass_: type) -> type:
@@ -213,6 +1407,17 @@ def bind_database(obj_id_row: str):
         inheritance_ = _generate_inheritance_tree(dataclass_)
         unique_ = _generate_unique_fields(dataclass_, inheritance_)
         tab_name = dataclass_.__name__
+        id_index = None
+        if index_ids:
+            id_index = _IdIndex(tab_name, obj_id_row)
+            id_index.load()  # Load the ids at startup.
+        group_index = None
+        if group_by is not None:
+            owner = next((type_ for type_, fields_ in inheritance_.items() if group_by in fields_), None)
+            group_index = _GroupIndex(tab_name, obj_id_row, group_by, owner._table_name if owner else tab_name,
+                                      owner._obj_id_row if owner else obj_id_row)
+            group_index.load()
+        hidden_ = frozenset({*getattr(dataclass_, '_hidden_fields', ()), *hidden_fields})
 
         class DatabaseBound(dataclass_):
             """
@@ -223,6 +1428,11 @@ def bind_database(obj_id_row: str):
             _unique_fields = unique_  # Fields unique to this class.
             _table_name = tab_name  # Construct the table_name.
             _obj_id_row = obj_id_row  # The first field is also the ID.
+            _version_row = version_row  # Column checked for concurrent updates, if any.
+            _id_index = id_index  # In-memory ids of the table, if indexed.
+            _group_index = group_index  # In-memory ids of the table grouped by a field, if any.
+            _hidden_fields = hidden_  # Fields never serialized.
+            serialize = _generate_serializer(dataclass_, hidden_)
 
             def _partition_changed_fields(self: "DatabaseBound") -> Dict["DatabaseBound", Dict["DatabaseBound", Any]]:
                 """
@@ -268,18 +1478,42 @@ def bind_database(obj_id_row: str):
                 # Get the alterations made to the object since the last update.
                 # Convert it into a tuple of row names and values.
                 alterations_per_type = self._partition_changed_fields()
+                if self._version_row is not None:  # Check the version first, so that stale copies change nothing.
+                    self._update_versioned(alterations_per_type.pop(self.__class__))
                 for type_ in alterations_per_type:  # For each alteration per table
                     alterations = alterations_per_type[type_]  # Get the alterations dictionary for this table.
-                    alteration_tuple = tuple((row_name, _stringfy(value))
-                                             for row_name, value in alterations.items()) # Generate a tuple of pairs
-                    # that denote changes in the fields with their new values.
+                    if not alterations:
+                        continue  # Nothing changed in this table.
                     # Generate the set clause.
-                    set_clause = ', '.join(f"{row_name} = {value}" for row_name, value in alteration_tuple)
+                    set_clause = _generate_set_clause(alterations)
                     # Update the object.
                     global_query_handler.execute_query(f"UPDATE {type_._table_name}"
                                                        f" SET {set_clause}"
                                                        f" WHERE {type_._obj_id_row} = {self.__getattribute__(self._obj_id_row)}")
+                    _move_in_group_indexes(type_._table_name, self.__getattribute__(self._obj_id_row), alterations)
                 self._changed_fields.clear()  # Reset the changed fields.
+                _notify_write(self._table_name, 'update', self)
+
+            def _update_versioned(self, alterations: Dict[str, Any]) -> None:
+                """
+                Update the fields of a versioned table, only if the version
+                    of the record is still the version it was fetched with.
+
+                :param alterations: Changed fields of this table.
+                :raise ConcurrentUpdateException: If the record was changed by someone else.
+                """
+                version = self.__dict__.get('_row_version', 0)
+                set_clause = f"{self._version_row} = {version + 1}"  # Always move to the next version.
+                if alterations:
+                    set_clause = _generate_set_clause(alterations) + ', ' + set_clause
+                global_query_handler.execute_query(f"UPDATE {self._table_name}"
+                                                   f" SET {set_clause}"
+                                                   f" WHERE {self._obj_id_row} = {getattr(self, self._obj_id_row)}"
+                                                   f" AND {self._version_row} = {version}")
+                if global_query_handler.last_row_count() == 0:
+                    raise ConcurrentUpdateException(f"{self._table_name} {getattr(self, self._obj_id_row)}"
+                                                    f" was modified after it was fetched.")
+                self.__dict__['_row_version'] = version + 1
 
             @classmethod
             def has(cls, object_id: int) -> bool:
@@ -290,12 +1524,26 @@ def bind_database(obj_id_row: str):
                 :param object_id: Object Identifer to check.
                 :return True if such a record exists, otherwise False.
                 """
+                if cls._id_index is not None:
+                    return int(object_id) in cls._id_index
                 where_clause = f"{cls._obj_id_row} = {object_id}"
                 query = f"SELECT * FROM {cls._table_name} WHERE {where_clause}"
                 if len(global_query_handler.execute_query(query)) > 0:
                     return True
                 return False
 
+            @classmethod
+            def invalidate_indexes(cls) -> None:
+                """
+                Force the id and group indexes of this table to be
+                    reloaded the next time they are used, must be called
+                    after its rows are inserted or deleted in bulk without
+                    going through this class.
+                """
+                for index in (cls._id_index, cls._group_index):
+                    if index is not None:
+                        index.data_version = None
+
             @classmethod
             def has_where(cls, criteria: str, value: Any) -> bool:
                 """
@@ -326,14 +1574,82 @@ def bind_database(obj_id_row: str):
                 :return the object whose data is drawn from the
                     record with the given object_id.
                 """
+                return cls._fetch_from('', object_id)
+
+            @classmethod
+            def _fetch_from(cls, schema: str, object_id: int) -> "DatabaseBound":
+                """
+                Get a member of this class from the tables of the given schema.
+
+                :param schema: Prefix of the tables, such as 'archive.', or an
+                    empty string for the tables in use.
+                :param object_id: Unique identifier of the record.
+                :return the object whose data is drawn from the record.
+                """
                 values = []  # Values that will be used to initialise the object.
                 where_clause = f"{cls._obj_id_row} = {object_id}"
-                query = f"SELECT * FROM {cls._table_name} WHERE {where_clause}"
+                columns = '*' if cls._version_row is None else ', '.join(cls._unique_fields + [cls._version_row])
+                query = f"SELECT {columns} FROM {schema}{cls._table_name} WHERE {where_clause}"
                 values.extend(*global_query_handler.execute_query(query))
+                version = values.pop() if cls._version_row is not None else None
                 for type_ in cls._table_inheritance:  # For each antecedent dataclass type, query the database for values.
                     where_clause = f"{type_._obj_id_row} = {object_id}"
-                    values = [*global_query_handler.execute_query(f"SELECT * FROM {type_._table_name} WHERE {where_clause}")[0]] + values  # Add the superclass attributes to the end.
-                return cls(*values)  # Initialise an object with these args.
+                    values = [*global_query_handler.execute_query(f"SELECT * FROM {schema}{type_._table_name} WHERE {where_clause}")[0]] + values  # Add the superclass attributes to the end.
+                object_ = cls(*values)  # Initialise an object with these args.
+                if version is not None:
+                    object_.__dict__['_row_version'] = version  # Not a field, so it is not cached as a change.
+                return object_
+
+            @classmethod
+            def has_archived(cls, object_id: int) -> bool:
+                """
+                Check if a record with the given object id was moved
+                    to the archive.
+
+                :param object_id: Object Identifer to check.
+                :return True if the archive has such a record, otherwise False.
+                """
+                if not global_query_handler.attach_archive():
+                    return False  # Nothing was archived yet.
+                query = f"SELECT {cls._obj_id_row} FROM archive.{cls._table_name} WHERE {cls._obj_id_row} = {object_id}"
+                try:
+                    return len(global_query_handler.execute_query(query)) > 0
+                except sqlite3.OperationalError:  # No record of this type was archived yet.
+                    return False
+
+            @classmethod
+            def fetch_archived(cls, object_id: int) -> "DatabaseBound":
+                """
+                Get a member of this class from the archive, archived
+                    records are read only, hence the object must not be
+                    updated or deleted.
+
+                :param object_id: Unique identifier of the archived record.
+                :return the object whose data is drawn from the archived record.
+                """
+                return cls._fetch_from('archive.', object_id)
+
+            @classmethod
+            def ids_where(cls, criteria: str, value: Any) -> List[int]:
+                """
+                Get the object ids of the members of this class according
+                    to the given criteria, without fetching the members.
+
+                :param criteria: Column name by whose value to results will
+                    be filtered.
+                :param value: Value of the column name.
+                :return A list of object ids, in ascending order.
+                """
+                if cls._group_index is not None and criteria == cls._group_index.field:
+                    return cls._group_index.ids_in(value)
+                owner = next((type_ for type_ in cls._table_inheritance if criteria in cls._table_inheritance[type_]), cls)
+                query = f"SELECT {cls._table_name}.{cls._obj_id_row} FROM {cls._table_name}"
+                if owner is not cls:
+                    query += f" JOIN {owner._table_name} ON {owner._table_name}.{owner._obj_id_row}" \
+                             f" = {cls._table_name}.{cls._obj_id_row}"
+                query += f" WHERE {owner._table_name}.{criteria} = {_stringfy(value)}" \
+                         f" ORDER BY {cls._table_name}.{cls._obj_id_row}"
+                return [object_id for object_id, in global_query_handler.execute_query(query)]
 
             @classmethod
             def fetch_where(cls, criteria: str, value: Any) -> List["DatabaseBound"]:
@@ -381,6 +1697,13 @@ def bind_database(obj_id_row: str):
                 global_query_handler.execute_query(f"INSERT INTO {self._table_name}"
                                                    f" {rows_clause} VALUES {values_clause}")
                 setattr(self, self._obj_id_row, global_query_handler.last_inserted_row_id())  # Set the id correctly.
+                if self._version_row is not None:
+                    self.__dict__['_row_version'] = 0  # Freshly inserted rows start from the first version.
+                if self._id_index is not None:
+                    self._id_index.add(getattr(self, self._obj_id_row))
+                if self._group_index is not None:
+                    self._group_index.add(getattr(self, self._obj_id_row))
+                _notify_write(self._table_name, 'create', self)
 
             @classmethod
             def create_unique(cls, values: list) -> "DatabaseBound":
@@ -392,7 +1715,13 @@ def bind_database(obj_id_row: str):
                 values_clause = '(' + ', '.join(_stringfy(value) for value in values) + ')'
                 global_query_handler.execute_query(f"INSERT INTO {cls._table_name}"
                                                    f" {rows_clause} VALUES {values_clause}")
-                return cls.fetch(values[0])
+                if cls._id_index is not None:
+                    cls._id_index.add(values[0])
+                if cls._group_index is not None:
+                    cls._group_index.add(values[0])
+                record = cls.fetch(values[0])
+                _notify_write(cls._table_name, 'create', record)
+                return record
 
             def delete(self) -> None:
                 """
@@ -401,6 +1730,12 @@ def bind_database(obj_id_row: str):
                     database.
                 """
                 global_query_handler.execute_query(f"DELETE FROM {self._table_name} WHERE {self._obj_id_row} = {getattr(self, self._obj_id_row)}")
+                if self._id_index is not None:
+                    self._id_index.discard(getattr(self, self._obj_id_row))
+                for index in _group_indexes:  # Either the row or the group it was in is gone.
+                    if self._table_name in (index.table_name, index.field_table):
+                        index.discard(getattr(self, self._obj_id_row))
+                _notify_write(self._table_name, 'delete', self)
         return DatabaseBound
     return wrapper
 
@@ -0,0 +1,234 @@
+"""
+This module contains the background maintenance of the database files,
+    keeping the query planner statistics fresh, returning free pages
+    to the file system and checkpointing the write ahead log.
+"""
+import logging
+from dataclasses import dataclass
+from os import getenv, makedirs
+from os.path import getsize, exists, join
+from threading import Thread, Event, Lock
+from time import monotonic, sleep, strftime
+from typing import List, Optional, Callable
+
+from mbsbackend.datatypes.analytics import AnalyticsSnapshot, global_analytics
+from mbsbackend.datatypes.database import QueryHandler, global_query_handler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MaintenanceStep:
+    """
+    Report of a single maintenance step run on a database.
+    """
+    database: str
+    step: str
+    duration: float  # In seconds.
+    detail: str
+
+
+class DatabaseMaintenance:
+    """
+    Runs the maintenance steps on every database file of a query handler,
+        either on demand or periodically in a background thread. Every
+        step takes the lock of the query handler only for a single
+        statement, so request threads are never blocked for long.
+    """
+    def __init__(self, query_handler: QueryHandler, interval: float = 3600, check_interval: float = 60,
+                 vacuum_pages: int = 64, freelist_threshold: int = 256, wal_threshold: int = 4 * 1024 * 1024,
+                 backup_directory: Optional[str] = None, backup_interval: float = 24 * 3600,
+                 analytics: Optional[AnalyticsSnapshot] = None, analytics_interval: float = 3600) -> None:
+        """
+        :param query_handler: Query handler whose databases are maintained.
+        :param interval: Seconds between two full maintenance runs.
+        :param check_interval: Seconds between two checks of the thresholds.
+        :param vacuum_pages: Number of pages freed by a single incremental vacuum statement.
+        :param freelist_threshold: Number of free pages that triggers an incremental vacuum.
+        :param wal_threshold: Size of the write ahead log in bytes that triggers a checkpoint.
+        :param backup_directory: Directory to back up the databases to, if they should be backed up.
+        :param backup_interval: Seconds between two backups.
+        :param analytics: Analytics snapshot to export periodically, if any.
+        :param analytics_interval: Seconds between two analytics exports.
+        """
+        self.query_handler = query_handler
+        self.interval = interval
+        self.check_interval = check_interval
+        self.vacuum_pages = vacuum_pages
+        self.freelist_threshold = freelist_threshold
+        self.wal_threshold = wal_threshold
+        self.backup_directory = backup_directory
+        self.backup_interval = backup_interval
+        self.analytics = analytics
+        self.analytics_interval = analytics_interval
+        self.last_report: List[MaintenanceStep] = []
+        self._last_full_run = self._last_backup = self._last_export = monotonic()
+        self._run_lock = Lock()  # Only one maintenance run at a time.
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def run(self, full: bool = True) -> List[MaintenanceStep]:
+        """
+        Run the maintenance steps on every database.
+
+        :param full: If True, run every step, otherwise only
+            run the steps whose thresholds are exceeded.
+        :return The report of the steps that were run.
+        """
+        report: List[MaintenanceStep] = []
+        with self._run_lock:
+            for name, handler in self.query_handler.database_handlers().items():
+                if full:
+                    report.append(self._timed(name, 'optimize', lambda: self._optimize(handler)))
+                free_pages = handler.execute_pragma("PRAGMA freelist_count")[0][0]
+                is_incremental = handler.execute_pragma("PRAGMA auto_vacuum")[0][0] == 2
+                if is_incremental and free_pages and (full or free_pages >= self.freelist_threshold):
+                    report.append(self._timed(name, 'incremental_vacuum', lambda: self._vacuum(handler)))
+                is_wal = handler.execute_pragma("PRAGMA journal_mode")[0][0] == 'wal'
+                if is_wal and (full or self._wal_size(handler) >= self.wal_threshold):
+                    report.append(self._timed(name, 'wal_checkpoint', lambda: self._checkpoint(handler)))
+            if full:
+                self._last_full_run = monotonic()
+        for step in report:
+            logger.info("Maintenance of %s: %s took %.3f s (%s)", step.database, step.step, step.duration, step.detail)
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def _timed(database: str, step: str, function: Callable[[], str]) -> MaintenanceStep:
+        """
+        Run a maintenance step and measure how long it took.
+
+        :param database: Name of the database.
+        :param step: Name of the step.
+        :param function: Function that runs the step and returns its details.
+        :return The report of the step.
+        """
+        start = monotonic()
+        detail = function()
+        return MaintenanceStep(database, step, monotonic() - start, detail)
+
+    @staticmethod
+    def _optimize(handler: QueryHandler) -> str:
+        """
+        Refresh the query planner statistics that are out of date.
+        """
+        handler.execute_pragma("PRAGMA optimize")
+        return "Statistics refreshed."
+
+    def _vacuum(self, handler: QueryHandler) -> str:
+        """
+        Return the free pages to the file system in batches, releasing
+            the lock between each batch.
+        """
+        initial_pages = free_pages = handler.execute_pragma("PRAGMA freelist_count")[0][0]
+        while free_pages > 0:
+            handler.execute_pragma(f"PRAGMA incremental_vacuum({self.vacuum_pages})")
+            sleep(0)  # Let the request threads waiting for the lock go first.
+            remaining = handler.execute_pragma("PRAGMA freelist_count")[0][0]
+            if remaining >= free_pages:  # No progress, possibly a reader is holding on to the pages.
+                break
+            free_pages = remaining
+        return f"Freed {initial_pages - free_pages} pages."
+
+    @staticmethod
+    def _checkpoint(handler: QueryHandler) -> str:
+        """
+        Copy the write ahead log back into the database without waiting for readers.
+        """
+        is_busy, log_pages, checkpointed_pages = handler.execute_pragma("PRAGMA wal_checkpoint(PASSIVE)")[0]
+        return f"Checkpointed {checkpointed_pages} of {log_pages} pages{' (busy)' if is_busy else ''}."
+
+    @staticmethod
+    def _wal_size(handler: QueryHandler) -> int:
+        """
+        Get the size of the write ahead log of a database in bytes.
+        """
+        file_name = [row[2] for row in handler.execute_pragma("PRAGMA database_list") if row[1] == 'main'][0]
+        wal_name = file_name + '-wal'
+        return getsize(wal_name) if exists(wal_name) else 0
+
+    def backup(self, directory: str) -> List[MaintenanceStep]:
+        """
+        Back up every database to a directory, without stopping the app.
+
+        :param directory: Directory to put the backups in, each backup
+            is named after its database and the time it was taken.
+        :return The report of the backups.
+        """
+        makedirs(directory, exist_ok=True)
+        timestamp = strftime('%Y%m%d-%H%M%S')
+        report = []
+        for name, handler in self.query_handler.database_handlers().items():
+            target_name = join(directory, f'{name}-{timestamp}.db')
+            report.append(self._timed(name, 'backup', lambda: self._backup(handler, target_name)))
+        for step in report:
+            logger.info("Backup of %s took %.3f s (%s)", step.database, step.duration, step.detail)
+        return report
+
+    @staticmethod
+    def _backup(handler: QueryHandler, target_name: str) -> str:
+        """
+        Back up a single database.
+        """
+        handler.backup(target_name)
+        return f"Backed up to {target_name}."
+
+    def export_analytics(self) -> MaintenanceStep:
+        """
+        Export the analytics snapshot from the databases.
+
+        :return The report of the export.
+        """
+        step = self._timed('main', 'analytics_export', self._export_analytics)
+        logger.info("Analytics export took %.3f s (%s)", step.duration, step.detail)
+        return step
+
+    def _export_analytics(self) -> str:
+        """
+        Export the analytics snapshot, a query per table.
+        """
+        self.analytics.export(self.query_handler)
+        return f"Exported to {self.analytics.directory}."
+
+    def start(self) -> None:
+        """
+        Start running the maintenance in a background thread, if not already started.
+        """
+        if self._thread is not None:
+            return
+        self._thread = Thread(target=self._run_periodically, name='database-maintenance', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run_periodically(self) -> None:
+        """
+        Check the thresholds every check interval and run the
+            full maintenance every interval.
+        """
+        while not self._stopped.wait(self.check_interval):
+            try:
+                self.run(full=monotonic() - self._last_full_run >= self.interval)
+                if self.backup_directory and monotonic() - self._last_backup >= self.backup_interval:
+                    self.backup(self.backup_directory)
+                    self._last_backup = monotonic()
+                if self.analytics is not None and monotonic() - self._last_export >= self.analytics_interval:
+                    self.export_analytics()
+                    self._last_export = monotonic()
+            except Exception:  # The maintenance thread must survive a failed run.
+                logger.exception("Database maintenance failed.")
+
+
+global_maintenance = DatabaseMaintenance(global_query_handler, float(getenv('FLASK_DB_MAINTENANCE_INTERVAL', '3600')),
+                                         backup_directory=getenv('FLASK_DB_BACKUP_DIRECTORY'),
+                                         backup_interval=float(getenv('FLASK_DB_BACKUP_INTERVAL', str(24 * 3600))),
+                                         analytics=global_analytics if getenv('FLASK_DB_ANALYTICS_INTERVAL') else None,
+                                         analytics_interval=float(getenv('FLASK_DB_ANALYTICS_INTERVAL', '3600')))
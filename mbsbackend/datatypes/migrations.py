@@ -0,0 +1,38 @@
+"""
+This module fills the tables that databases initialised by earlier
+    versions lack, their schema is brought up to date when they are
+    opened, see TestQueryHandler.
+"""
+from typing import Dict
+
+from mbsbackend.datatypes.classes.thesis_classes import DissertationStatus
+from mbsbackend.datatypes.database import QueryHandler, global_query_handler
+
+# The rows each derived table lacks, table by table. Rows that exist are left
+#   as they are, so that the migration can be run any number of times.
+backfilled_records: Dict[str, str] = {
+    'DissertationStatus': DissertationStatus.backfill_query(),
+    'StudentSummary': "INSERT INTO StudentSummary SELECT * FROM StudentSummarySource"
+                      " WHERE student_id NOT IN (SELECT student_id FROM StudentSummary)"
+}
+
+
+def migrate_database(query_handler: QueryHandler = global_query_handler) -> int:
+    """
+    Fill the rows the derived tables lack in a database initialised by
+        an earlier version, such as the tallies of the dissertations made
+        before DissertationStatus. Each database file is filled in a
+        single transaction.
+
+    :param query_handler: Query handler whose databases are migrated.
+    :return Number of rows filled.
+    """
+    filled = 0
+    for handler in query_handler.database_handlers().values():
+        tables = {name for name, in QueryHandler.execute_query(handler, "SELECT name FROM main.sqlite_master"
+                                                                        " WHERE type = 'table'")}
+        queries = [query for table, query in backfilled_records.items() if table in tables]
+        changes = handler.connection.total_changes
+        QueryHandler.execute_transaction(handler, queries)
+        filled += handler.connection.total_changes - changes
+    return filled
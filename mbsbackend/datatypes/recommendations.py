@@ -0,0 +1,125 @@
+"""
+This module recommends advisors to the students of a department in a
+    single batch, by matching the thesis topics of the students against
+    the doctoral specialties of the advisors.
+"""
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from mbsbackend.datatypes.database import global_query_handler
+
+_token_pattern = re.compile(r"\w+")
+
+
+def _term_frequencies(documents: Sequence[str], vocabulary: Dict[str, int]) -> np.ndarray:
+    """
+    Count the terms of the documents.
+
+    :param documents: Documents to count the terms of.
+    :param vocabulary: Column of each term.
+    :return A matrix with a row per document and a column per term.
+    """
+    frequencies = np.zeros((len(documents), len(vocabulary)))
+    for row, document in enumerate(documents):
+        for token in _token_pattern.findall(document.lower()):
+            frequencies[row, vocabulary[token]] += 1
+    return frequencies
+
+
+def _tf_idf(frequencies: np.ndarray, document_frequencies: np.ndarray, document_count: int) -> np.ndarray:
+    """
+    Weight the term frequencies by the inverse document frequencies
+        and normalise each row to unit length.
+    """
+    weights = frequencies * (np.log((1 + document_count) / (1 + document_frequencies)) + 1)
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+
+
+def rank_advisors(topics: Sequence[str], specialties: Sequence[str], loads: Sequence[int],
+                  count: int = 3, load_penalty: float = 0.1) -> List[List[int]]:
+    """
+    Rank the advisors for each student, by the cosine similarity of
+        the thesis topic of the student and the doctoral specialty of
+        the advisor, divided by 1 + load_penalty * the advisor's load.
+
+    :param topics: Thesis topics of the students.
+    :param specialties: Doctoral specialties of the advisors.
+    :param loads: Number of students each advisor already advises.
+    :param count: Maximum number of advisors to rank per student.
+    :param load_penalty: How much each student of an advisor lowers their score.
+    :return For each student, the indices of the best matching advisors,
+        best first. Advisors that share no terms with the topic are left out.
+    """
+    if not topics or not specialties:
+        return [[] for _ in topics]
+    vocabulary: Dict[str, int] = {}
+    for document in [*topics, *specialties]:
+        for token in _token_pattern.findall(document.lower()):
+            vocabulary.setdefault(token, len(vocabulary))
+    student_terms = _term_frequencies(topics, vocabulary)
+    advisor_terms = _term_frequencies(specialties, vocabulary)
+    document_frequencies = (student_terms > 0).sum(axis=0) + (advisor_terms > 0).sum(axis=0)
+    document_count = len(topics) + len(specialties)
+    similarities = _tf_idf(student_terms, document_frequencies, document_count) \
+        @ _tf_idf(advisor_terms, document_frequencies, document_count).T
+    scores = similarities / (1 + load_penalty * np.asarray(loads, dtype=float))
+    ranking = np.argsort(-scores, axis=1, kind='stable')[:, :count]
+    return [[int(advisor) for advisor in row if scores[student, advisor] > 0] for student, row in enumerate(ranking)]
+
+
+def suggest_advisors(student_ids: List[int], department_id: int, count: int = 3) -> Dict[int, List[int]]:
+    """
+    Suggest advisors of a department to its students.
+
+    :param student_ids: IDs of the students, in the department.
+    :param department_id: ID of the department.
+    :param count: Maximum number of advisors suggested per student.
+    :return The advisor ids suggested to each student with a thesis topic.
+    """
+    if not student_ids:
+        return {}
+    ids = ', '.join(str(student_id) for student_id in student_ids)
+    with global_query_handler.department_scope(department_id):
+        students = global_query_handler.execute_query("SELECT student_id, thesis_topic FROM Student"
+                                                      f" WHERE student_id IN ({ids}) AND thesis_topic IS NOT NULL"
+                                                      " ORDER BY student_id")
+        advisors = global_query_handler.execute_query("SELECT Advisor.advisor_id, Advisor.doctoral_speciality,"
+                                                      " (SELECT COUNT(*) FROM Instructor"
+                                                      " WHERE Instructor.advisor_id = Advisor.advisor_id)"
+                                                      " FROM Advisor JOIN USER_ ON USER_.user_id = Advisor.advisor_id"
+                                                      f" WHERE USER_.department_id = {department_id}"
+                                                      " AND Advisor.doctoral_speciality IS NOT NULL"
+                                                      " ORDER BY Advisor.advisor_id")
+    rankings = rank_advisors([topic for _, topic in students], [specialty for _, specialty, _ in advisors],
+                             [load for _, _, load in advisors], count)
+    return {student_id: [advisors[advisor][0] for advisor in ranking]
+            for (student_id, _), ranking in zip(students, rankings)}
+
+
+def recommend_advisors(student_ids: List[int], department_id: int, count: int = 3) -> Dict[int, List[int]]:
+    """
+    Suggest advisors of a department to its students and save the
+        suggestions as recommendations, in a single insert that skips
+        the recommendations that already exist, so that concurrent
+        calls do not save the same recommendation twice.
+
+    :param student_ids: IDs of the students, in the department.
+    :param department_id: ID of the department.
+    :param count: Maximum number of advisors recommended per student.
+    :return The advisor ids recommended to each student.
+    """
+    suggestions = suggest_advisors(student_ids, department_id, count)
+    values = ', '.join(f"({student_id}, {advisor_id})"
+                       for student_id, advisor_ids in suggestions.items() for advisor_id in advisor_ids)
+    if values:
+        with global_query_handler.department_scope(department_id):
+            global_query_handler.execute_query("INSERT INTO Recommended (student_id, advisor_id)"
+                                               " SELECT Suggested.column1, Suggested.column2"
+                                               f" FROM (VALUES {values}) AS Suggested WHERE NOT EXISTS"
+                                               " (SELECT * FROM Recommended"
+                                               " WHERE Recommended.student_id = Suggested.column1"
+                                               " AND Recommended.advisor_id = Suggested.column2)")
+    return {student_id: advisor_ids for student_id, advisor_ids in suggestions.items() if advisor_ids}
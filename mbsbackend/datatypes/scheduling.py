@@ -0,0 +1,169 @@
+"""
+This module keeps the dissertation slots of each jury member in memory,
+    sorted by date, so that scheduling conflicts are found with a binary
+    search rather than by scanning every dissertation of every member.
+"""
+from bisect import bisect_left, insort
+from heapq import merge
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from mbsbackend.datatypes.database import global_query_handler, listen_to_resets, listen_to_writes
+
+dissertation_duration = 2 * 60 * 60  # Length of a dissertation slot, in seconds.
+_slot_alignment = 60 * 60  # Suggested slots start on the hour.
+
+
+class _JuryCalendar:
+    """
+    The dissertation slots of each jury member as sorted lists of their
+        start dates. The slots are kept up to date by the write listeners
+        below, changes made by any other connection cause the slots to be
+        reloaded. Reloads build the slots aside and publish them at once,
+        so that readers never see a partial calendar.
+    """
+    def __init__(self) -> None:
+        self.slots: Dict[int, List[Tuple[int, int]]] = {}  # Sorted (jury_date, member_id) per jury id.
+        self.members: Dict[int, Tuple[int, int]] = {}  # Jury id and jury date of each membership.
+        self.data_version: Optional[int] = None  # Data version of the database the last time slots were loaded.
+        self._lock = Lock()  # Serialises the writers, readers do not take it.
+
+    def load(self) -> None:
+        """
+        Load the slots from the database.
+        """
+        data_version = global_query_handler.scoped_data_version()  # Taken first, later changes cause another reload.
+        slots: Dict[int, List[Tuple[int, int]]] = {}
+        members: Dict[int, Tuple[int, int]] = {}
+        for member_id, jury_id, jury_date in global_query_handler.execute_latest_query(
+                "SELECT Member.member_id, Member.jury_id, Dissertation.jury_date FROM Member"
+                " JOIN Dissertation ON Dissertation.dissertation_id = Member.dissertation_id"
+                " ORDER BY Dissertation.jury_date, Member.member_id"):
+            members[member_id] = (jury_id, jury_date)
+            slots.setdefault(jury_id, []).append((jury_date, member_id))  # Already sorted by the query.
+        with self._lock:
+            self.slots, self.members = slots, members
+            self.data_version = data_version  # Stamped only once the new slots are published.
+
+    def slots_of(self, jury_id: int) -> List[Tuple[int, int]]:
+        """
+        Get the slots of a jury member.
+
+        :param jury_id: ID of the jury member.
+        :return Their slots, sorted by date.
+        """
+        if self.data_version != global_query_handler.scoped_data_version():  # Someone else changed the database.
+            self.load()
+        return self.slots.get(jury_id, [])
+
+    def add(self, member_id: int, jury_id: int, jury_date: int) -> None:
+        with self._lock:
+            self._discard(member_id)
+            self.members[member_id] = (jury_id, jury_date)
+            insort(self.slots.setdefault(jury_id, []), (jury_date, member_id))
+
+    def discard(self, member_id: int) -> None:
+        with self._lock:
+            self._discard(member_id)
+
+    def _discard(self, member_id: int) -> None:
+        if member_id not in self.members:
+            return
+        jury_id, jury_date = self.members.pop(member_id)
+        slots = self.slots[jury_id]
+        del slots[bisect_left(slots, (jury_date, member_id))]
+
+    def invalidate(self) -> None:
+        """
+        Force the slots to be reloaded the next time they are used.
+        """
+        self.data_version = None
+
+
+_calendar = _JuryCalendar()
+
+
+def is_busy(jury_id: int, jury_date: int, duration: int = dissertation_duration) -> bool:
+    """
+    Check if a jury member has a dissertation overlapping a slot.
+
+    :param jury_id: ID of the jury member.
+    :param jury_date: Start date of the slot.
+    :param duration: Length of the slot and of the dissertations.
+    :return True if one of their dissertations overlaps the slot.
+    """
+    slots = _calendar.slots_of(jury_id)
+    first_overlapping = bisect_left(slots, (jury_date - duration + 1,))  # First slot that ends after this one starts.
+    return first_overlapping < len(slots) and slots[first_overlapping][0] < jury_date + duration
+
+
+def busy_jury_members(jury_ids: Sequence[int], jury_date: int, duration: int = dissertation_duration) -> List[int]:
+    """
+    Find the jury members who have a dissertation overlapping a slot.
+
+    :param jury_ids: IDs of the jury members.
+    :param jury_date: Start date of the slot.
+    :param duration: Length of the slot and of the dissertations.
+    :return IDs of the busy jury members, in the given order.
+    """
+    return [jury_id for jury_id in dict.fromkeys(jury_ids) if is_busy(jury_id, jury_date, duration)]
+
+
+def free_slots(jury_ids: Sequence[int], after: int, count: int = 5,
+               duration: int = dissertation_duration) -> List[int]:
+    """
+    Suggest slots in which every one of the jury members is free.
+
+    :param jury_ids: IDs of the jury members.
+    :param after: Date the slots may start from.
+    :param count: Number of slots to suggest.
+    :param duration: Length of the slots and of the dissertations.
+    :return Start dates of the earliest free slots, starting on the hour.
+    """
+    candidate = -(-after // _slot_alignment) * _slot_alignment
+    busy = merge(*(slots[bisect_left(slots, (after - duration + 1,)):]
+                   for slots in (_calendar.slots_of(jury_id) for jury_id in dict.fromkeys(jury_ids))))
+    suggestions: List[int] = []
+    for start, _ in busy:  # Fill the gaps between the busy slots of every member, in order.
+        while len(suggestions) < count and candidate + duration <= start:
+            suggestions.append(candidate)
+            candidate += duration
+        if len(suggestions) == count:
+            return suggestions
+        if candidate < start + duration:
+            candidate = -(-(start + duration) // _slot_alignment) * _slot_alignment
+    while len(suggestions) < count:
+        suggestions.append(candidate)
+        candidate += duration
+    return suggestions
+
+
+def invalidate_calendar() -> None:
+    """
+    Force the slots to be reloaded the next time they are used, must be
+        called after Member or Dissertation rows are written in bulk
+        without going through the bound classes.
+    """
+    _calendar.invalidate()
+
+
+def _on_member_write(operation: str, member: Any) -> None:
+    if operation == 'create':
+        rows = global_query_handler.execute_latest_query("SELECT jury_date FROM Dissertation"
+                                                         f" WHERE dissertation_id = {member.dissertation_id}")
+        if rows:
+            _calendar.add(member.member_id, member.jury_id, rows[0][0])
+    elif operation == 'delete':
+        _calendar.discard(member.member_id)
+    else:
+        _calendar.invalidate()
+
+
+def _on_dissertation_write(operation: str, dissertation: Any) -> None:
+    if operation != 'create':  # The date of its members' slots may have changed.
+        _calendar.invalidate()
+
+
+listen_to_writes('Member', _on_member_write)
+listen_to_writes('Dissertation', _on_dissertation_write)
+listen_to_resets(invalidate_calendar)
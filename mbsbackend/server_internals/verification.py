@@ -3,50 +3,131 @@ This file contains decorators that can be put on top
     of certain classes to test certain preconditions.
 """
 from functools import wraps
+from inspect import signature
 from json.decoder import JSONDecodeError
-from json import loads, dumps
+from json import JSONEncoder, loads, dumps
+from typing import Dict, Iterable, Optional, Tuple, get_args, get_origin
 
 from flask import Response, request
 
+_missing = object()  # Marks a key absent from the payload.
 
-def requires_json(**decorator_kwargs):
+
+def _serialize(value):
+    """
+    Serialize the objects of database bound classes that appear in a
+        response, with the serializer compiled for their class.
+    """
+    if hasattr(value, 'serialize') and hasattr(value, '_table_name'):
+        return value.serialize()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+# Responses are built from fresh dictionaries and lists, so the encoder skips
+#   the circular reference checks, and writes no whitespace between tokens.
+_encode = JSONEncoder(check_circular=False, separators=(',', ':'), default=_serialize).encode
+
+
+def _error(message: str) -> Response:
+    return Response(dumps({'msg': message}), status=400, mimetype='application/json')
+
+
+def _type_check(type_: type):
+    """
+    Get the check a value of the given type must pass, booleans are
+        not accepted as integers or numbers even though Python considers
+        them so. A list type such as List[int] also checks the type of
+        each element.
+    """
+    if get_origin(type_) is list:
+        is_element = _type_check(*get_args(type_))
+        return lambda value: isinstance(value, list) and all(is_element(element) for element in value)
+    if type_ is int:
+        return lambda value: isinstance(value, int) and not isinstance(value, bool)
+    elif type_ is float:
+        return lambda value: isinstance(value, (int, float)) and not isinstance(value, bool)
+    return lambda value: isinstance(value, type_)
+
+
+def _type_name(type_: type) -> str:
+    if get_origin(type_) is list:
+        return f"list[{_type_name(*get_args(type_))}]"
+    return type_.__name__
+
+
+def compile_schema(required_keys: Iterable[str] = (),
+                   key_types: Optional[Dict[str, type]] = None) -> Tuple[tuple, ...]:
+    """
+    Compile the schema of a payload to the checks of its keys, so that
+        a payload is validated in a single pass over them.
+
+    :param required_keys: Keys the payload must contain.
+    :param key_types: Types the values of the keys must be of, when
+        they are present, List[type] for lists whose elements must be
+        of a type.
+    :return A (key, is required, type check, type name) tuple per key.
+    """
+    if isinstance(required_keys, str):
+        raise TypeError("Expected the required keys to be an iterable of keys, not a single key.")
+    key_types = key_types or {}
+    keys = [*dict.fromkeys([*required_keys, *key_types])]  # Required keys first, without repetitions.
+    required = set(required_keys)
+    return tuple((key, key in required, _type_check(key_types[key]) if key in key_types else None,
+                  _type_name(key_types[key]) if key in key_types else None) for key in keys)
+
+
+def validate(schema: Tuple[tuple, ...], data) -> Optional[str]:
+    """
+    Validate a parsed payload against a compiled schema.
+
+    :param schema: Schema compiled with compile_schema.
+    :param data: The parsed payload.
+    :return The error message if the payload is invalid, None otherwise.
+    """
+    if not isinstance(data, dict):
+        return 'ERROR: Expected a JSON object in Request body.'
+    for key, is_required, check, type_name in schema:
+        value = data.get(key, _missing)
+        if value is _missing:
+            if is_required:
+                return 'ERROR: Malformed request, does not contain required keys.'
+        elif check is not None and not check(value):
+            return f'ERROR: Malformed request, {key} must be of type {type_name}.'
+    return None
+
+
+def requires_json(required_keys: Iterable[str] = (), key_types: Optional[Dict[str, type]] = None):
     """
     When decorated with this function, a route is required to have
-        at least one argument, this argument will be tested if it
-        is valid JSON, furthermore it must also contain the required
-        keys if these are provided.
+        valid JSON object in its request body, furthermore it must also
+        contain the required keys, and its keys must be of the given
+        types, if these are provided. The schema is compiled once, when
+        the route is decorated, and the body is parsed once per request.
+
+    If the route has a payload parameter, the parsed payload is passed
+        to it, so that the route does not parse the body again.
 
     :param required_keys: In addition to being valid JSON, the payload
         must contain these keys.
+    :param key_types: Types the values of the keys must be of.
     """
-    if 'required_keys' not in decorator_kwargs:
-        required_keys = []
-    else:
-        required_keys = decorator_kwargs['required_keys']
+    schema = compile_schema(required_keys, key_types)
 
     def json_required(route):
+        takes_payload = 'payload' in signature(route).parameters
+
         @wraps(route)
         def wrapper(*args, **kwargs):
-            """
-            The wrapper function.
-
-            :param payload: The wrapped function *must* have at least
-                one argument, the first argument of this function will
-                be the argument to be tested.
-            """
             try:
-                data = loads(request.data)
-                # Now check if the required keys are all in the data.
-                if not all([required_key in data for required_key in required_keys]):
-                    resp = Response(dumps({'msg': 'ERROR: Malformed request, does not contain required keys.'}),
-                                    status=400, mimetype='application/json')
-                else:
-                    resp = route(*args, **kwargs)
-                return resp
-            except JSONDecodeError:
-                resp = Response(dumps({'msg': 'ERROR: Expected valid JSON in Request body.'}),
-                                status=400, mimetype='application/json')
-                return resp
+                data = loads(request.get_data())
+            except (JSONDecodeError, UnicodeDecodeError):
+                return _error('ERROR: Expected valid JSON in Request body.')
+            error = validate(schema, data)
+            if error is not None:
+                return _error(error)
+            if takes_payload:
+                kwargs['payload'] = data
+            return route(*args, **kwargs)
         return wrapper
     return json_required
 
@@ -55,26 +136,29 @@ def returns_json(route):
     """
     Routes decorated with this decorator will get their first return argument
         converted to JSON and their second interpreted as the return status code,
-        the content type will be set to application/json.
+        the content type will be set to application/json. Objects of database
+        bound classes in the return value are converted with their serializer.
     """
     @wraps(route)
     def wrapper(*args, **kwargs):
         try:
             value, status = route(*args, **kwargs)
-            return Response(dumps(value), status=status, mimetype='application/json')
+            return Response(_encode(value), status=status, mimetype='application/json')
         except ValueError:
             raise TypeError("Expected the function return type to be tuple[dict, int].")
     return wrapper
 
 
-def full_json(**decorator_kwargs):
+def full_json(required_keys: Iterable[str] = (), key_types: Optional[Dict[str, type]] = None):
     """
     Routes decorated with this decorator expect JSON in their request
         body and return json as a response.
+
+    :param required_keys: Keys the payload must contain.
+    :param key_types: Types the values of the keys must be of.
     """
+    json_required = requires_json(required_keys, key_types)
+
     def decorator(route):
-        @wraps(route)
-        def wrapper(*args, **kwargs):
-            return requires_json(**decorator_kwargs)(returns_json(route))(*args, **kwargs)  # Apply the two decorators.
-        return wrapper
+        return json_required(returns_json(route))  # Apply the two decorators, once.
     return decorator
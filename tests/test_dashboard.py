@@ -0,0 +1,158 @@
+from os import environ
+from shutil import rmtree
+
+import flask_unittest
+from flask.testing import FlaskClient
+
+environ['FLASK_DB_NAME'] = 'test.db'  # This must be set before first importing the backend itself.
+from mbsbackend import create_app
+from mbsbackend.datatypes.analytics import global_analytics, snapshot_tables
+from mbsbackend.datatypes.classes.thesis_classes import dissertation_statuses
+from mbsbackend.datatypes.database import global_query_handler
+
+
+class TestAdvisorDashboard(flask_unittest.ClientTestCase):
+    app = create_app()
+
+    def setUp(self, client: FlaskClient) -> None:
+        client.post('/jwt', json={"username": "oliver@iyte.edu.tr", "password": "test+7348"})
+        self.maxDiff = None
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+
+    def test_get_dashboard(self, client: FlaskClient) -> None:
+        """
+        Get the students and the defenders of an advisor who is also a jury member.
+        """
+        resp = client.get('/dashboard')
+        self.assertStatus(resp, 200)
+        self.assertEqual(resp.json['proposals'], [])
+        self.assertEqual([student['student_id'] for student in resp.json['students']], [17, 26])
+        self.assertEqual(resp.json['students'][0]['latest_thesis_id'], 1)
+        self.assertEqual(resp.json['students'][0]['status'], 'Undecided')
+        self.assertIsNone(resp.json['students'][1]['status'])
+        self.assertEqual(resp.json['defenders'], [{"student_id": 17, "name_": "Jane", "surname": "Grey",
+                                                   "jury_date": 1621129275, "status": "Undecided",
+                                                   "has_evaluated": False}])
+        self.assertEqual(resp.json['pending_evaluations'], [17])
+
+
+class TestJuryDashboard(flask_unittest.ClientTestCase):
+    app = create_app()
+
+    def setUp(self, client: FlaskClient) -> None:
+        client.post('/jwt', json={"username": "obrien@metu.edu.tr", "password": "test+7348"})
+        self.maxDiff = None
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+
+    def test_get_dashboard(self, client: FlaskClient) -> None:
+        """
+        Get the defenders of an external jury member.
+        """
+        resp = client.get('/dashboard')
+        self.assertStatus(resp, 200)
+        self.assertEqual([defender['student_id'] for defender in resp.json['defenders']], [17, 15, 22, 21, 31, 32, 33])
+        self.assertNotIn(21, resp.json['pending_evaluations'])  # Its dissertation is not approved yet.
+        self.assertIn(22, resp.json['pending_evaluations'])
+
+
+class TestDBRDashboard(flask_unittest.ClientTestCase):
+    app = create_app()
+
+    def setUp(self, client: FlaskClient) -> None:
+        client.post('/jwt', json={"username": "welman@pers.iyte.edu.tr", "password": "test+7348"})
+        self.maxDiff = None
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+
+    def test_get_dashboard(self, client: FlaskClient) -> None:
+        """
+        Get the state of every student in the department.
+        """
+        resp = client.get('/dashboard')
+        self.assertStatus(resp, 200)
+        students = {student['student_id']: student for student in resp.json['students']}
+        self.assertEqual(students[2]['recommended_advisors'], [1, 3])
+        self.assertFalse(students[2]['needs_recommendation'])
+        self.assertEqual(students[17]['advisor_id'], 16)
+        self.assertEqual(students[17]['status'], 'Undecided')
+        self.assertEqual(sum(resp.json['status_counts'].values()),
+                         len([student for student in students.values() if student['status'] is not None]))
+
+    def test_student_forbidden(self, client: FlaskClient) -> None:
+        """
+        Students do not have dashboards.
+        """
+        client.delete('/jwt')
+        client.post('/jwt', json={"username": "grey@std.iyte.edu.tr", "password": "test+7348"})
+        self.assertStatus(client.get('/dashboard'), 403)
+
+
+class TestMissingStatus(flask_unittest.ClientTestCase):
+    app = create_app()
+
+    def setUp(self, client: FlaskClient) -> None:
+        with global_query_handler.department_scope(0):  # Of the student 17.
+            self.status_row = global_query_handler.execute_query(
+                "SELECT * FROM DissertationStatus WHERE dissertation_id = 0")[0]
+            global_query_handler.execute_query("DELETE FROM DissertationStatus WHERE dissertation_id = 0")
+            global_query_handler.execute_query("INSERT INTO Evaluation VALUES (900, 0, 20, 'Correction')")
+            global_query_handler.execute_query("INSERT INTO Evaluation VALUES (901, 0, 16, 'Correction')")
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+        with global_query_handler.department_scope(0):
+            global_query_handler.execute_query(f"INSERT INTO DissertationStatus VALUES {self.status_row}")
+            global_query_handler.execute_query("DELETE FROM Evaluation WHERE evaluation_id IN (900, 901)")
+
+    def test_default_status(self, client: FlaskClient) -> None:
+        """
+        A dissertation without a status row has its status derived from
+            its evaluations alike in its info, the dashboards and the
+            statistics.
+        """
+        client.post('/jwt', json={"username": "oliver@iyte.edu.tr", "password": "test+7348"})
+        self.assertEqual(client.get('/dissertation/17').json['status'], 'Correction')
+        resp = client.get('/dashboard')
+        self.assertEqual(resp.json['students'][0]['status'], 'Correction')
+        self.assertEqual(resp.json['defenders'][0]['status'], 'Correction')
+        self.assertIsNone(resp.json['students'][1]['status'])  # Has no dissertation.
+        client.delete('/jwt')
+        client.post('/jwt', json={"username": "welman@pers.iyte.edu.tr", "password": "test+7348"})
+        resp = client.get('/dashboard')
+        students = {student['student_id']: student for student in resp.json['students']}
+        self.assertEqual(students[17]['status'], 'Correction')
+        self.assertNotIn('null', resp.json['status_counts'])
+        self.assertEqual(sum(resp.json['status_counts'].values()),
+                         len([student for student in students.values() if student['status'] is not None]))
+        query, _ = snapshot_tables['dissertations']
+        statuses = {row[0]: row[3] for row in global_query_handler.execute_gathered_query(query)}
+        self.assertEqual(statuses[0], dissertation_statuses.index('Correction'))
+
+
+class TestStatistics(flask_unittest.ClientTestCase):
+    app = create_app()
+
+    def setUp(self, client: FlaskClient) -> None:
+        client.post('/jwt', json={"username": "welman@pers.iyte.edu.tr", "password": "test+7348"})
+        self.directory = global_analytics.directory
+        global_analytics.directory = 'analytics_route_test'
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+        rmtree(global_analytics.directory)
+        global_analytics.directory = self.directory
+
+    def test_get_statistics(self, client: FlaskClient) -> None:
+        """
+        Get the statistics of the department, exported on the first request.
+        """
+        resp = client.get('/statistics?bins=5')
+        self.assertStatus(resp, 200)
+        self.assertEqual(len(resp.json['department']['plagiarism_ratio']['histogram']['counts']), 5)
+        self.assertIn('0', resp.json['departments'])
+        self.assertStatus(client.get('/statistics?bins=0'), 400)
@@ -0,0 +1,1030 @@
+import sqlite3
+from dataclasses import asdict
+import unittest
+from os import environ, remove
+from shutil import rmtree
+from os.path import exists
+from threading import Thread
+from time import sleep
+from unittest.mock import patch
+
+environ['FLASK_DB_NAME'] = 'test.db'  # This must be set before first importing the backend itself.
+from mbsbackend.datatypes.database import TestQueryHandler, ConcurrentUpdateException, ShardedQueryHandler, \
+    ShardRoutingException, QueryHandler, QueryDeadlineException, global_query_handler, invalidate_id_indexes, \
+    _id_indexes
+from mbsbackend.datatypes.classes.user_classes import Student, DBR, Dissertation, Jury, Advisor, departments
+from mbsbackend.datatypes.maintenance import DatabaseMaintenance
+from mbsbackend.datatypes.archive import archive_graduated_students, archived_records, graduated_status
+from mbsbackend.datatypes.migrations import migrate_database
+from mbsbackend.datatypes.access_control import may_evaluate, may_advise, invalidate_access_sets, _advisees
+from mbsbackend.datatypes.recommendations import rank_advisors, recommend_advisors
+from mbsbackend.datatypes.scheduling import busy_jury_members, free_slots, dissertation_duration, \
+    invalidate_calendar, _calendar
+from mbsbackend.datatypes.analytics import AnalyticsSnapshot, department_statistics, statistics_by_department
+from mbsbackend.datatypes.classes.thesis_classes import Member, Thesis, Has, Evaluation
+from mbsbackend.datatypes.classes.user_relationships import Instructor, Proposal
+
+
+class TestGroupCommit(unittest.TestCase):
+    """
+    Test if concurrent writes committed as a group keep their own results.
+    """
+    db_name = 'group_commit_test.db'
+
+    def setUp(self) -> None:
+        self.handler = TestQueryHandler(self.db_name, group_commit_window=0.05)
+
+    def tearDown(self) -> None:
+        self.handler.connection.close()
+        if exists(self.db_name):
+            remove(self.db_name)
+
+    def test_group_commit(self) -> None:
+        """
+        Insert from several threads at once, one of which violates a constraint.
+        """
+        results = {}
+
+        def write(index: int) -> None:
+            name = 'Computer Engineering' if index == 0 else f'Department {index}'  # First one is a duplicate.
+            try:
+                self.handler.execute_query(f"INSERT INTO Department (department_name, turkish_department_name)"
+                                           f" VALUES ('{name}', 'Bolum {index}')")
+                results[index] = self.handler.last_inserted_row_id()
+            except sqlite3.Error as error:
+                results[index] = error
+
+        threads = [Thread(target=write, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsInstance(results[0], sqlite3.IntegrityError)
+        row_ids = [results[index] for index in range(1, 8)]
+        self.assertEqual(len(set(row_ids)), 7, "Each write must get its own row id.")
+        rows = self.handler.execute_query("SELECT department_id FROM Department WHERE department_name LIKE 'Department %'")
+        self.assertCountEqual([row[0] for row in rows], row_ids)
+
+    def test_waiter_deadline(self) -> None:
+        """
+        A write that waits for its group past its time budget is withdrawn,
+            the rest of the group is still committed.
+        """
+        self.handler.group_commit_window = 0.3
+        results = {}
+
+        def write(index: int, budget) -> None:
+            self.handler.set_time_budget(budget)
+            try:
+                self.handler.execute_query(f"INSERT INTO Department (department_name, turkish_department_name)"
+                                           f" VALUES ('Department {index}', 'Bolum {index}')")
+                results[index] = 'committed'
+            except QueryDeadlineException:
+                results[index] = 'timed out'
+
+        leader = Thread(target=write, args=(0, None))
+        leader.start()
+        sleep(0.05)  # So that the second write joins the group of the first.
+        write(1, 0.05)
+        self.handler.set_time_budget(None)
+        leader.join()
+        self.assertEqual(results, {0: 'committed', 1: 'timed out'})
+        rows = self.handler.execute_query("SELECT department_name FROM Department WHERE department_name LIKE 'Department %'")
+        self.assertEqual(rows, [('Department 0',)])
+
+    def test_leader_deadline(self) -> None:
+        """
+        A leader that cannot take the lock within its time budget fails
+            its group rather than waiting.
+        """
+        self.handler.set_time_budget(0.05)
+        self.handler.lock.acquire()
+        try:
+            with self.assertRaises(QueryDeadlineException):
+                self.handler.execute_query("INSERT INTO Department (department_name, turkish_department_name)"
+                                           " VALUES ('Department 0', 'Bolum 0')")
+        finally:
+            self.handler.lock.release()
+            self.handler.set_time_budget(None)
+
+    def test_group_failure(self) -> None:
+        """
+        If the group cannot be committed, every write in it fails.
+        """
+        cursor = self.handler.cursor
+
+        class FailingCursor:
+            def __getattr__(self, name: str):
+                return getattr(cursor, name)
+
+            def execute(self, query: str):
+                if query == "RELEASE group_write":
+                    raise sqlite3.OperationalError("Cannot release the savepoint.")
+                return cursor.execute(query)
+        self.handler.cursor = FailingCursor()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                self.handler.execute_query("INSERT INTO Department (department_name, turkish_department_name)"
+                                           " VALUES ('Department 0', 'Bolum 0')")
+        finally:
+            self.handler.cursor = cursor
+        self.assertEqual(self.handler.execute_query("SELECT * FROM Department WHERE department_name = 'Department 0'"),
+                         [])
+
+
+class TestRowVersions(unittest.TestCase):
+    """
+    Test if updates made with stale copies of versioned records are rejected.
+    """
+    def tearDown(self) -> None:
+        student = Student.fetch(0)
+        student.semester = 2
+        student.update()
+
+    def test_stale_update(self) -> None:
+        """
+        Update the same student through two copies fetched at the same time.
+        """
+        first_copy, second_copy = Student.fetch(0), Student.fetch(0)
+        first_copy.semester = 3
+        first_copy.update()
+        second_copy.semester = 4
+        with self.assertRaises(ConcurrentUpdateException):
+            second_copy.update()
+        self.assertEqual(Student.fetch(0).semester, 3)
+
+
+class TestIdIndex(unittest.TestCase):
+    """
+    Test if the in-memory id indexes notice changes made by other connections.
+    """
+    def tearDown(self) -> None:
+        with sqlite3.connect('test.db') as db:
+            db.execute("DELETE FROM DBR WHERE dbr_id = 999")
+
+    def test_external_changes(self) -> None:
+        """
+        Insert and delete a record from another connection.
+        """
+        self.assertTrue(DBR.has(18))
+        self.assertFalse(DBR.has(999))
+        with sqlite3.connect('test.db') as db:
+            db.execute("INSERT INTO DBR VALUES (999)")
+        self.assertTrue(DBR.has(999))
+        with sqlite3.connect('test.db') as db:
+            db.execute("DELETE FROM DBR WHERE dbr_id = 999")
+        self.assertFalse(DBR.has(999))
+
+    def test_reload_in_scope(self) -> None:
+        """
+        An index reloaded in a read scope sees the rows committed after
+            the snapshot of the scope was taken, rather than losing them.
+        """
+        global_query_handler.begin_read_scope()
+        try:
+            global_query_handler.execute_query("SELECT * FROM DBR")  # Take the snapshot.
+            with sqlite3.connect('test.db') as db:
+                db.execute("INSERT INTO DBR VALUES (999)")
+            invalidate_id_indexes()
+            self.assertTrue(DBR.has(999))
+        finally:
+            global_query_handler.end_read_scope()
+        self.assertTrue(DBR.has(999))
+
+    def test_stamped_after_publish(self) -> None:
+        """
+        Checks made while the ids are being reloaded do not see the new
+            data version next to the old ids.
+        """
+        index = DBR._id_index
+        execute_query = global_query_handler.execute_query
+        stamps_while_loading = []
+
+        def query_during_load(query: str, *args, **kwargs):
+            if query == index.query:
+                stamps_while_loading.append(index.data_version)
+            return execute_query(query, *args, **kwargs)
+        invalidate_id_indexes()
+        with patch.object(global_query_handler, 'execute_query', side_effect=query_during_load):
+            self.assertTrue(DBR.has(18))
+        self.assertEqual(stamps_while_loading, [None])
+
+    def test_polled_once_per_scope(self) -> None:
+        """
+        Check the indexes many times in a read scope, the data version is
+            polled only at the first check.
+        """
+        DBR.has(18)  # Load the index outside of the scope.
+        global_query_handler.begin_read_scope()
+        try:
+            with patch.object(global_query_handler, 'data_version', wraps=global_query_handler.data_version) as poll:
+                for _ in range(10):
+                    self.assertTrue(DBR.has(18))
+                    self.assertTrue(may_advise(16, 17))
+                    busy_jury_members([18], 0)
+                self.assertEqual(poll.call_count, 1)
+        finally:
+            global_query_handler.end_read_scope()
+
+    def test_reset_invalidates(self) -> None:
+        """
+        Resetting a database forces the in-memory copies to be reloaded,
+            as the new connection may report the data version they were
+            stamped with.
+        """
+        DBR.has(18)
+        may_advise(16, 17)
+        busy_jury_members([18], 0)
+        handler = TestQueryHandler('reset_test.db')
+        try:
+            handler.reset_database()
+        finally:
+            handler.connection.close()
+            remove('reset_test.db')
+        self.assertTrue(all(index.data_version is None for index in _id_indexes))
+        self.assertIsNone(_advisees.data_version)
+        self.assertIsNone(_calendar.data_version)
+
+
+class TestShardedQueryHandler(unittest.TestCase):
+    """
+    Test if department rows are kept and found in their own shards.
+    """
+    db_name = 'shard_test.db'
+    shard_directory = 'shard_test'
+
+    def setUp(self) -> None:
+        self.handler = ShardedQueryHandler(self.db_name, self.shard_directory)
+
+    def tearDown(self) -> None:
+        for handler in [self.handler, *self.handler.shards.values()]:
+            handler.connection.close()
+        remove(self.db_name)
+        rmtree(self.shard_directory)
+
+    def test_rows_moved_to_shards(self) -> None:
+        """
+        Rows of a department are moved out of the global database.
+        """
+        history = self.handler.shards[1]
+        self.assertCountEqual(history.execute_query("SELECT student_id FROM Instructor"), [(21,), (22,)])
+        global_rows = QueryHandler.execute_query(self.handler, "SELECT * FROM Instructor WHERE student_id = 21")
+        self.assertEqual(global_rows, [])
+        self.assertEqual(self.handler.execute_query("SELECT advisor_id FROM Instructor WHERE student_id = 21"), [(23,)])
+
+    def test_write_routing(self) -> None:
+        """
+        Inserts go to the shard of the student, updates to the shard of the row.
+        """
+        self.handler.execute_query("INSERT INTO Recommended (student_id, advisor_id) VALUES (27, 24)")
+        recommendation_id = self.handler.last_inserted_row_id()
+        self.assertEqual(self.handler.shards[1].execute_query("SELECT advisor_id FROM Recommended"
+                                                              f" WHERE recommendation_id = {recommendation_id}"), [(24,)])
+        self.assertEqual(self.handler.shards[0].execute_query("SELECT * FROM Recommended"
+                                                              f" WHERE recommendation_id = {recommendation_id}"), [])
+        self.handler.execute_query(f"UPDATE Recommended SET advisor_id = 25 WHERE recommendation_id = {recommendation_id}")
+        self.assertEqual(self.handler.last_row_count(), 1)
+        self.assertEqual(self.handler.execute_query("SELECT advisor_id FROM Recommended"
+                                                    f" WHERE recommendation_id = {recommendation_id}"), [(25,)])
+
+    def test_unscoped_aggregates(self) -> None:
+        """
+        Reads whose results cannot be concatenated across shards must be
+            scoped or gathered explicitly.
+        """
+        count = "SELECT COUNT(*) FROM Instructor"
+        load = ("SELECT Advisor.advisor_id, (SELECT COUNT(*) FROM Instructor"
+                " WHERE Instructor.advisor_id = Advisor.advisor_id) FROM Advisor ORDER BY Advisor.advisor_id")
+        expected_count = sum(shard.execute_query(count)[0][0] for shard in self.handler.shards.values())
+        for query in (count, load):
+            with self.assertRaises(ShardRoutingException):
+                self.handler.execute_query(query)
+        with self.handler.department_scope(1):
+            self.assertEqual(self.handler.execute_query(count), [(2,)])
+            self.assertIn((23, 2), self.handler.execute_query(load))
+        counts = self.handler.execute_gathered_query(count)
+        self.assertEqual(len(counts), len(self.handler.shards))
+        self.assertEqual(sum(shard_count for shard_count, in counts), expected_count)
+
+    def test_missing_tables(self) -> None:
+        """
+        Department tables a shard lacks are created when it is opened again.
+        """
+        statuses = self.handler.shards[1].execute_query("SELECT COUNT(*) FROM DissertationStatus")
+        self.handler.shards[1].execute_query("DROP TABLE DissertationStatus")
+        for handler in [self.handler, *self.handler.shards.values()]:
+            handler.connection.close()
+        self.handler = ShardedQueryHandler(self.db_name, self.shard_directory)
+        self.assertEqual(self.handler.shards[1].execute_query("SELECT COUNT(*) FROM DissertationStatus"), [(0,)])
+        self.assertEqual(migrate_database(self.handler), statuses[0][0])
+
+    def test_unroutable_queries(self) -> None:
+        """
+        Queries the handler cannot route are refused instead of being sent
+            to the wrong shard.
+        """
+        unroutable = ["SELECT USER_.name FROM USER_, Instructor WHERE USER_.user_id = Instructor.student_id",
+                      "INSERT INTO Recommended (student_id, advisor_id) VALUES (21, 24), (27, 24)",
+                      "UPDATE Recommended SET advisor_id = 25 WHERE student_id = 21 OR student_id = 27",
+                      "SELECT latest_thesis_id FROM StudentSummary WHERE student_id = 21"]
+        for query in unroutable:
+            with self.subTest(query=query), self.assertRaises(ShardRoutingException):
+                self.handler.execute_query(query)
+        self.assertEqual(self.handler.execute_gathered_query("SELECT * FROM Recommended WHERE advisor_id = 24"), [])
+
+
+class TestTimeBudget(unittest.TestCase):
+    """
+    Test if queries running past their time budget are interrupted.
+    """
+    def tearDown(self) -> None:
+        global_query_handler.set_time_budget(None)
+
+    def test_runaway_query(self) -> None:
+        """
+        Run a query that never ends on its own.
+        """
+        global_query_handler.set_time_budget(0.05)
+        with self.assertRaises(QueryDeadlineException):
+            global_query_handler.execute_query("SELECT COUNT(*) FROM (WITH RECURSIVE counter(x) AS"
+                                               " (SELECT 1 UNION ALL SELECT x + 1 FROM counter) SELECT x FROM counter)")
+        self.assertFalse(global_query_handler.lock.locked())
+        global_query_handler.set_time_budget(None)
+        self.assertTrue(DBR.has(18))
+
+
+class TestMaintenance(unittest.TestCase):
+    """
+    Test if the maintenance returns the free pages and reports its steps.
+    """
+    db_name = 'maintenance_test.db'
+
+    def setUp(self) -> None:
+        self.handler = TestQueryHandler(self.db_name)
+
+    def tearDown(self) -> None:
+        self.handler.connection.close()
+        remove(self.db_name)
+
+    def test_maintenance(self) -> None:
+        """
+        Free some pages by deleting a lot of theses, then run the maintenance.
+        """
+        for index in range(500):
+            self.handler.execute_query(f"INSERT INTO Thesis (file_path, original_name) VALUES"
+                                       f" ('theses/{index}.pdf', '{'long_name_' * 50}{index}.pdf')")
+        self.handler.execute_query("DELETE FROM Thesis WHERE thesis_id > 5")
+        self.assertGreater(self.handler.execute_pragma("PRAGMA freelist_count")[0][0], 0)
+        report = DatabaseMaintenance(self.handler).run()
+        self.assertCountEqual([step.step for step in report], ['optimize', 'incremental_vacuum'])
+        self.assertTrue(all(step.duration >= 0 for step in report))
+        self.assertEqual(self.handler.execute_pragma("PRAGMA freelist_count")[0][0], 0)
+
+
+class TestBackup(unittest.TestCase):
+    """
+    Test if the database can be backed up while it is being written to.
+    """
+    db_name = 'backup_test.db'
+    backup_name = 'backup_test_copy.db'
+
+    def setUp(self) -> None:
+        self.handler = TestQueryHandler(self.db_name)
+
+    def tearDown(self) -> None:
+        self.handler.connection.close()
+        remove(self.db_name)
+        remove(self.backup_name)
+
+    def test_online_backup(self) -> None:
+        """
+        Back up a page at a time while another thread inserts departments.
+        """
+        def write() -> None:
+            for index in range(20):
+                self.handler.execute_query(f"INSERT INTO Department (department_name) VALUES ('Department {index}')")
+
+        writer = Thread(target=write)
+        writer.start()
+        self.handler.backup(self.backup_name, pages=1, pause=0.001)
+        writer.join()
+        self.handler.backup(self.backup_name)
+        with sqlite3.connect(self.backup_name) as backup:
+            self.assertEqual(backup.execute("SELECT COUNT(*) FROM Department").fetchone()[0], 23)
+
+
+class TestArchive(unittest.TestCase):
+    """
+    Test if the records of graduated students are moved to the archive.
+    """
+    db_name = 'archive_test.db'
+    archive_name = 'archive_test_archive.db'
+
+    def setUp(self) -> None:
+        self.handler = TestQueryHandler(self.db_name)
+
+    def tearDown(self) -> None:
+        self.handler.connection.close()
+        remove(self.db_name)
+        if exists(self.archive_name):
+            remove(self.archive_name)
+
+    def test_archive_graduated_students(self) -> None:
+        """
+        Graduate a student with a thesis and a dissertation, then archive.
+        """
+        self.handler.execute_query(f"UPDATE Student SET graduation_status = '{graduated_status}' WHERE student_id = 17")
+        counts = {table: self.handler.execute_query(f"SELECT COUNT(*) FROM {table}")[0][0]
+                  for table in archived_records}
+        self.assertEqual(archive_graduated_students(self.handler), 1)
+        self.assertEqual(self.handler.execute_query("SELECT * FROM Student WHERE student_id = 17"), [])
+        self.assertEqual(self.handler.execute_query("SELECT * FROM USER_ WHERE user_id = 17"), [])
+        self.assertEqual(self.handler.execute_query("SELECT * FROM Defending WHERE student_id = 17"), [])
+        for table, count in counts.items():
+            remaining = self.handler.execute_query(f"SELECT COUNT(*) FROM main.{table}")[0][0]
+            archived = self.handler.execute_query(f"SELECT COUNT(*) FROM archive.{table}")[0][0]
+            self.assertEqual(remaining + archived, count, f"Records of {table} must be moved, not lost.")
+        self.assertEqual(self.handler.execute_query("SELECT name_ FROM archive.USER_ WHERE user_id = 17"), [('Jane',)])
+        self.assertEqual(self.handler.execute_query("SELECT COUNT(*) FROM archive.Thesis"), [(2,)])
+        self.assertEqual(archive_graduated_students(self.handler), 0)
+
+
+class TestMigration(unittest.TestCase):
+    """
+    Test if a database initialised by an earlier version is brought up to date.
+    """
+    db_name = 'migration_test.db'
+    derived_tables = ('DissertationStatus', 'StudentSummary')
+
+    def setUp(self) -> None:
+        handler = TestQueryHandler(self.db_name)
+        self.expected = {table: handler.execute_query(f"SELECT * FROM {table} ORDER BY 1")
+                         for table in self.derived_tables}
+        handler.connection.close()
+        with sqlite3.connect(self.db_name) as db:  # Remove what the earlier versions did not have.
+            for name, in db.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'"
+                                    " AND (sql LIKE '%StudentSummary%' OR sql LIKE '%row_version%')").fetchall():
+                db.execute(f"DROP TRIGGER {name}")
+            db.execute("DROP VIEW StudentSummarySource")
+            for table in self.derived_tables:
+                db.execute(f"DROP TABLE {table}")
+            db.execute("ALTER TABLE Student DROP COLUMN row_version")
+        db.close()
+
+    def tearDown(self) -> None:
+        self.handler.connection.close()
+        remove(self.db_name)
+
+    def test_migrate_database(self) -> None:
+        """
+        The missing column, tables and triggers are added, then the derived tables are filled.
+        """
+        self.handler = TestQueryHandler(self.db_name)
+        self.assertEqual(self.handler.execute_query("SELECT row_version FROM Student WHERE student_id = 17"), [(0,)])
+        self.assertEqual(migrate_database(self.handler), sum(len(rows) for rows in self.expected.values()))
+        for table, rows in self.expected.items():
+            self.assertEqual(self.handler.execute_query(f"SELECT * FROM {table} ORDER BY 1"), rows)
+        self.handler.execute_query("UPDATE Student SET thesis_topic = 'Migrations' WHERE student_id = 17")
+        self.assertEqual(self.handler.execute_query("SELECT row_version FROM Student WHERE student_id = 17"), [(1,)])
+        self.handler.execute_query("DELETE FROM Has WHERE student_id = 17")
+        self.assertEqual(self.handler.execute_query("SELECT latest_thesis_id FROM StudentSummary"
+                                                    " WHERE student_id = 17"), [(-1,)])
+        self.assertEqual(migrate_database(self.handler), 0)
+        self.handler.connection.close()
+        self.handler = TestQueryHandler(self.db_name)  # Opening an up to date database changes nothing.
+        self.assertEqual(migrate_database(self.handler), 0)
+
+
+class TestReadScope(unittest.TestCase):
+    """
+    Test if the reads in a read scope see a single snapshot.
+    """
+    def tearDown(self) -> None:
+        global_query_handler.end_read_scope()
+        with sqlite3.connect('test.db') as db:
+            db.execute("UPDATE Department SET turkish_department_name = 'Bilgisayar Mühendisliği'"
+                       " WHERE department_id = 0")
+        global_query_handler.execute_query("DELETE FROM DBR WHERE dbr_id = 998")
+
+    def test_snapshot(self) -> None:
+        """
+        Changes of other connections are only seen after the scope, own
+            writes are seen immediately.
+        """
+        query = "SELECT turkish_department_name FROM Department WHERE department_id = 0"
+        global_query_handler.begin_read_scope()
+        before = global_query_handler.execute_query(query)
+        with sqlite3.connect('test.db') as db:
+            db.execute("UPDATE Department SET turkish_department_name = 'Degisti' WHERE department_id = 0")
+        self.assertEqual(global_query_handler.execute_query(query), before)
+        global_query_handler.execute_query("INSERT INTO DBR VALUES (998)")
+        self.assertEqual(global_query_handler.execute_query("SELECT * FROM DBR WHERE dbr_id = 998"), [(998,)])
+        global_query_handler.end_read_scope()
+        self.assertEqual(global_query_handler.execute_query(query), [('Degisti',)])
+
+
+class TestDissertationInfo(unittest.TestCase):
+    """
+    Test if the dissertation info is remembered within a read scope.
+    """
+    def tearDown(self) -> None:
+        global_query_handler.end_read_scope()
+
+    def test_memoized_until_write(self) -> None:
+        """
+        The info is computed once, until the thread writes.
+        """
+        global_query_handler.begin_read_scope()
+        dissertation_info = Student.fetch(17).dissertation_info
+        self.assertEqual(dissertation_info['jury_ids'], [20, 16])
+        self.assertIs(Dissertation.info_of(17), dissertation_info)
+        global_query_handler.execute_query("UPDATE Dissertation SET is_approved = is_approved WHERE dissertation_id = 0")
+        self.assertIsNot(Dissertation.info_of(17), dissertation_info)
+        self.assertEqual(Dissertation.info_of(17), dissertation_info)
+
+
+class TestStudentSummary(unittest.TestCase):
+    """
+    Test if the student summaries follow the changes to their relations.
+    """
+    db_name = 'summary_test.db'
+
+    def setUp(self) -> None:
+        self.handler = TestQueryHandler(self.db_name)
+
+    def tearDown(self) -> None:
+        self.handler.connection.close()
+        remove(self.db_name)
+
+    def test_summaries_follow_writes(self) -> None:
+        """
+        Upload a thesis, propose an advisor, create a dissertation and undo it.
+        """
+        summary = "SELECT latest_thesis_id, is_advisors_recommended, has_dissertation FROM StudentSummary" \
+                  " WHERE student_id = 27"
+        self.assertEqual(self.handler.execute_query(summary), [(-1, 0, 0)])
+        self.handler.execute_query("INSERT INTO Thesis VALUES (100, 'theses/100.pdf', 'a.pdf', 0, 'Topic', 10)")
+        self.handler.execute_query("INSERT INTO Has VALUES (100, 100, 27)")
+        self.handler.execute_query("INSERT INTO Proposal (student_id, advisor_id) VALUES (27, 24)")
+        self.handler.execute_query("INSERT INTO Dissertation VALUES (100, 0, FALSE)")
+        self.handler.execute_query("INSERT INTO Defending VALUES (100, 100, 27)")
+        self.assertEqual(self.handler.execute_query(summary), [(100, 1, 0)])
+        self.handler.execute_query("INSERT INTO Member VALUES (100, 100, 20)")
+        self.assertEqual(self.handler.execute_query(summary), [(100, 1, 1)])
+        self.handler.execute_query("DELETE FROM Proposal WHERE student_id = 27")
+        self.handler.execute_query("DELETE FROM Thesis WHERE thesis_id = 100")
+        self.assertEqual(self.handler.execute_query(summary), [(-1, 0, 1)])
+        self.assertCountEqual(self.handler.execute_query("SELECT * FROM StudentSummary"),
+                              self.handler.execute_query("SELECT * FROM StudentSummarySource"))
+
+
+class TestReferenceTable(unittest.TestCase):
+    """
+    Test if the departments are served from memory until invalidated.
+    """
+    def tearDown(self) -> None:
+        with sqlite3.connect('test.db') as db:
+            db.execute("DELETE FROM Department WHERE department_id = 99")
+            db.execute("UPDATE Department SET department_name = 'History' WHERE department_id = 1")
+        departments.invalidate()
+
+    def test_invalidation(self) -> None:
+        """
+        Changes are seen after invalidation, new departments as soon as they are asked for.
+        """
+        self.assertEqual(departments[1].department_name, 'History')
+        with sqlite3.connect('test.db') as db:
+            db.execute("UPDATE Department SET department_name = 'Ancient History' WHERE department_id = 1")
+            db.execute("INSERT INTO Department VALUES (99, 'Physics', 'Fizik')")
+        self.assertEqual(departments[1].department_name, 'History')
+        self.assertEqual(departments[99].turkish_department_name, 'Fizik')
+        departments.invalidate()
+        self.assertEqual(departments[1].department_name, 'Ancient History')
+        with self.assertRaises(TypeError):
+            departments.records[100] = None
+
+
+class TestJuryRoster(unittest.TestCase):
+    """
+    Test if the jury rosters follow the creation of jury members.
+    """
+    def tearDown(self) -> None:
+        global_query_handler.execute_query("DELETE FROM JURY WHERE jury_id IN (1, 3) OR jury_id > 33")
+        global_query_handler.execute_query("DELETE FROM USER_ WHERE user_id > 33")
+        invalidate_id_indexes()
+
+    def test_roster_invalidation(self) -> None:
+        """
+        A new outside member shows up, provisioning makes the listed advisors juries.
+        """
+        self.assertEqual(Jury.roster_of(1), [23, 24, 25, 20])
+        new_member = Jury.add_new_jury({'name_': 'Ada', 'surname': 'Lovelace', 'email': 'ada@example.com',
+                                        'institution': 'Analytical Society', 'phone_number': '0'}, 2)
+        self.assertEqual(Jury.roster_of(1), [23, 24, 25, 20, new_member.jury_id])
+        Student.has(0)  # Loads the student ids, which provisioning must not invalidate.
+        student_ids_version = Student._id_index.data_version
+        self.assertEqual(Advisor.provision_juries([1, 3, 0, 23]), 2)
+        self.assertEqual(Student._id_index.data_version, student_ids_version)
+        self.assertTrue(Jury.has(1) and Jury.has(3))
+        self.assertFalse(Jury.has(0))
+
+
+class TestGroupIndex(unittest.TestCase):
+    """
+    Test if the department rosters follow the changes to the users.
+    """
+    def tearDown(self) -> None:
+        student = Student.fetch(0)
+        student.department_id = 0
+        student.update()
+
+    def test_department_change(self) -> None:
+        """
+        Move a student to another department and back.
+        """
+        history = Student.ids_where('department_id', 1)
+        self.assertNotIn(0, history)
+        student = Student.fetch(0)
+        student.department_id = 1
+        student.update()
+        self.assertEqual(Student.ids_where('department_id', 1), sorted(history + [0]))
+        self.assertNotIn(0, Student.ids_where('department_id', 0))
+        self.assertEqual(DBR.ids_where('department_id', 1), [
+            dbr_id for dbr_id, in global_query_handler.execute_query(
+                "SELECT dbr_id FROM DBR JOIN USER_ ON user_id = dbr_id WHERE department_id = 1 ORDER BY dbr_id")])
+
+    def test_stamped_after_publish(self) -> None:
+        """
+        Rosters read while the groups are being reloaded do not see the
+            new data version next to the old groups.
+        """
+        index = Student._group_index
+        execute_query = global_query_handler.execute_query
+        stamps_while_loading = []
+
+        def query_during_load(query: str, *args, **kwargs):
+            if query == index.query:
+                stamps_while_loading.append(index.data_version)
+            return execute_query(query, *args, **kwargs)
+        invalidate_id_indexes()
+        with patch.object(global_query_handler, 'execute_query', side_effect=query_during_load):
+            self.assertIn(0, Student.ids_where('department_id', 0))
+        self.assertEqual(stamps_while_loading, [None])
+
+    def test_concurrent_moves(self) -> None:
+        """
+        Move the same ids between groups from several threads, each id
+            ends up in exactly one group.
+        """
+        index = Student._group_index
+        ids = index.ids_in(0)[:5]
+
+        def move_back_and_forth(value: int) -> None:
+            for _ in range(500):
+                for object_id in ids:
+                    index.move(object_id, value)
+        threads = [Thread(target=move_back_and_forth, args=(value,)) for value in (0, 1, 0, 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for object_id in ids:
+            self.assertEqual(sum(group.count(object_id) for group in index.groups.values()), 1)
+            self.assertIn(object_id, index.groups[index.values[object_id]])
+        invalidate_id_indexes()  # The moves were not written to the database.
+
+
+class TestAccessSets(unittest.TestCase):
+    """
+    Test if the access sets follow the changes to the relationships.
+    """
+    def test_jury_membership(self) -> None:
+        """
+        Add a jury member to a dissertation and remove it.
+        """
+        self.assertTrue(may_evaluate(20, 17))
+        self.assertTrue(may_evaluate(16, 17))
+        self.assertFalse(may_evaluate(23, 17))
+        member = Member(-1, 0, 23)
+        member.create()
+        self.assertTrue(may_evaluate(23, 17))
+        member.delete()
+        self.assertFalse(may_evaluate(23, 17))
+
+    def test_advisor(self) -> None:
+        """
+        Assign an advisor to a student and remove it.
+        """
+        self.assertTrue(may_advise(16, 17))
+        self.assertFalse(may_advise(23, 28))
+        instructor = Instructor(-1, 28, 23)
+        instructor.create()
+        self.assertTrue(may_advise(23, 28))
+        instructor.delete()
+        self.assertFalse(may_advise(23, 28))
+        self.assertTrue(may_advise(16, 17))
+
+    def test_external_change(self) -> None:
+        """
+        Changes made by another connection are seen.
+        """
+        self.assertFalse(may_advise(23, 28))
+        connection = sqlite3.connect(environ.get('FLASK_DB_NAME', 'test.db'))
+        connection.execute("INSERT INTO Instructor (student_id, advisor_id) VALUES (28, 23)")
+        connection.commit()
+        try:
+            self.assertTrue(may_advise(23, 28))
+        finally:
+            connection.execute("DELETE FROM Instructor WHERE student_id = 28")
+            connection.commit()
+            connection.close()
+        self.assertFalse(may_advise(23, 28))
+
+    def test_reload_keeps_pairs(self) -> None:
+        """
+        Checks made while the pairs are being reloaded still see the old pairs.
+        """
+        execute_query = global_query_handler.execute_query
+        seen_while_loading = []
+
+        def query_during_load(query: str, *args, **kwargs):
+            if query == _advisees.query:
+                seen_while_loading.append(_advisees.students.get(16, {}).get(17, 0) > 0)
+            return execute_query(query, *args, **kwargs)
+        self.assertTrue(may_advise(16, 17))
+        invalidate_access_sets()
+        with patch.object(global_query_handler, 'execute_query', side_effect=query_during_load):
+            self.assertTrue(may_advise(16, 17))
+        self.assertEqual(seen_while_loading, [True])
+
+
+class TestLatestThesis(unittest.TestCase):
+    """
+    Test if the latest thesis of a student, read from their summary,
+        follows uploads and deletions.
+    """
+    def test_upload_and_delete(self) -> None:
+        """
+        Upload a thesis for a student, then delete it and the one before.
+        """
+        student = Student.fetch(26)
+        self.assertEqual(student.latest_thesis_id, 2)
+        self.assertEqual(student.latest_thesis_name, 'Artificial Intelligence In Speedrunning')
+        thesis = Thesis(-1, 'theses/latest_test.pdf', 'latest_test.pdf', 30, 'Artificial Intelligence', 1621129300)
+        thesis.create()
+        ownership = Has(-1, thesis.thesis_id, 26)
+        ownership.create()
+        self.assertEqual(student.latest_thesis_id, thesis.thesis_id)
+        self.assertEqual(student.latest_thesis.plagiarism_ratio, 30)
+        ownership.delete()
+        thesis.delete()
+        self.assertEqual(student.latest_thesis_id, 2)
+        global_query_handler.execute_query("DELETE FROM Has WHERE has_id = 2")
+        self.assertEqual(student.latest_thesis_id, -1)
+        self.assertIsNone(student.latest_thesis)
+        global_query_handler.execute_query("INSERT INTO Has VALUES (2, 2, 26)")
+        self.assertEqual(student.latest_thesis_id, 2)
+
+
+class TestDissertationStatus(unittest.TestCase):
+    """
+    Test if the dissertation status follows the approvals and evaluations.
+    """
+    def tearDown(self) -> None:
+        student = Student.fetch(26)
+        if student.dissertation_info:
+            dissertation = student.dissertation
+            global_query_handler.execute_query(f"DELETE FROM Evaluation"
+                                               f" WHERE dissertation_id = {dissertation.dissertation_id}")
+            dissertation.delete_dissertation()
+
+    def test_status_follows_evaluations(self) -> None:
+        """
+        Propose, approve and evaluate a dissertation.
+        """
+        student = Student.fetch(26)
+        dissertation = student.create_dissertation_for([20], 1621129275)
+        self.assertEqual(Dissertation.info_of(26)['status'], 'Pending')
+        self.assertIn(26, Dissertation.students_with_status('Pending', 0))
+        dissertation.approve()
+        self.assertEqual(Dissertation.info_of(26)['status'], 'Undecided')
+        dissertation.evaluate(20, 'Approved')
+        self.assertEqual(Dissertation.info_of(26)['status'], 'Undecided')
+        dissertation.evaluate(16, 'Correction')
+        self.assertEqual(dissertation.get_info(26)['status'], 'Correction')
+        self.assertEqual(Evaluation.get_consensus(dissertation.dissertation_id, 2), 'Correction')
+        self.assertIn(26, Dissertation.students_with_status('Correction'))
+        self.assertNotIn(26, Dissertation.students_with_status('Undecided', 0))
+
+
+class TestRecommendationEngine(unittest.TestCase):
+    """
+    Test if the advisors are ranked by their specialties and loads.
+    """
+    def tearDown(self) -> None:
+        global_query_handler.execute_query("DELETE FROM Recommended WHERE student_id = 27")
+        global_query_handler.execute_query("UPDATE Student SET thesis_topic = 'Earthsea History Before Erreth-Akbe'"
+                                           " WHERE student_id = 27")
+
+    def test_rank_advisors(self) -> None:
+        """
+        Rank advisors by the similarity of their specialties to the topics.
+        """
+        specialties = ['Bronze Age Collapse', 'Persian Empire', 'Julio-Claudian Dynasty']
+        rankings = rank_advisors(['Collapse of the Persian Empire', 'Earthsea'], specialties, [0, 0, 0])
+        self.assertEqual(rankings, [[1, 0], []])
+
+    def test_load_penalty(self) -> None:
+        """
+        Advisors with the same specialty are ranked by their loads.
+        """
+        rankings = rank_advisors(['Operating Systems'], ['Operating Systems'] * 3, [2, 0, 1], count=2)
+        self.assertEqual(rankings, [[1, 2]])
+
+    def test_recommend_advisors(self) -> None:
+        """
+        Recommend advisors to a student of the History department.
+        """
+        global_query_handler.execute_query("UPDATE Student SET thesis_topic = 'Trade in the Persian Empire'"
+                                           " WHERE student_id = 27")
+        self.assertEqual(recommend_advisors([27], 1), {27: [24]})
+        self.assertEqual([recommendation.advisor_id for recommendation in Student.fetch(27).recommendations], [24])
+        self.assertNotIn(27, DBR.fetch(next(iter(DBR.ids_where('department_id', 1)))).students_without_recommendations)
+
+    def test_repeated_recommendations(self) -> None:
+        """
+        Recommending the same advisors again does not save them twice.
+        """
+        global_query_handler.execute_query("UPDATE Student SET thesis_topic = 'Trade in the Persian Empire'"
+                                           " WHERE student_id = 27")
+        recommend_advisors([27], 1)
+        recommend_advisors([27], 1)
+        self.assertEqual([recommendation.advisor_id for recommendation in Student.fetch(27).recommendations], [24])
+
+
+class TestJuryCalendar(unittest.TestCase):
+    """
+    Test if the conflicts between the dissertations of jury members are found.
+    """
+    jury_date = 1621129275  # Date of dissertations of the jury member 20.
+
+    def tearDown(self) -> None:
+        student = Student.fetch(26)
+        if student.dissertation_info:
+            student.dissertation.delete_dissertation()
+
+    def test_conflicts(self) -> None:
+        """
+        Only the slots overlapping a dissertation are busy.
+        """
+        self.assertEqual(busy_jury_members([20, 24], self.jury_date + 3600), [20])
+        self.assertEqual(busy_jury_members([20, 24], self.jury_date - dissertation_duration + 1), [20])
+        self.assertEqual(busy_jury_members([20, 24], self.jury_date + dissertation_duration + 1), [])
+
+    def test_free_slots(self) -> None:
+        """
+        Suggested slots are free for every member and start on the hour.
+        """
+        slots = free_slots([20, 16], self.jury_date - 3600, 3)
+        self.assertEqual(len(slots), 3)
+        self.assertEqual(slots, sorted(slots))
+        for slot in slots:
+            self.assertEqual(slot % 3600, 0)
+            self.assertEqual(busy_jury_members([20, 16], slot), [])
+
+    def test_new_dissertation(self) -> None:
+        """
+        The slots follow the dissertations created and deleted.
+        """
+        jury_date = self.jury_date + 10 * dissertation_duration
+        self.assertEqual(busy_jury_members([16, 20], jury_date), [])
+        Student.fetch(26).create_dissertation_for([20], jury_date)
+        self.assertEqual(busy_jury_members([16, 20], jury_date), [16, 20])
+        self.assertNotIn(jury_date, free_slots([20], jury_date - dissertation_duration, 3))
+        Student.fetch(26).dissertation.delete_dissertation()
+        self.assertEqual(busy_jury_members([16, 20], jury_date), [])
+
+    def test_reload_keeps_slots(self) -> None:
+        """
+        Conflicts checked while the slots are being reloaded are still found.
+        """
+        execute_query = global_query_handler.execute_query
+        seen_while_loading = []
+
+        def query_during_load(query: str, *args, **kwargs):
+            if query.startswith("SELECT Member.member_id"):
+                seen_while_loading.append(bool(_calendar.slots.get(20)))
+            return execute_query(query, *args, **kwargs)
+        self.assertEqual(busy_jury_members([20], self.jury_date), [20])
+        invalidate_calendar()
+        with patch.object(global_query_handler, 'execute_query', side_effect=query_during_load):
+            self.assertEqual(busy_jury_members([20], self.jury_date), [20])
+        self.assertEqual(seen_while_loading, [True])
+
+
+class TestAnalyticsSnapshot(unittest.TestCase):
+    """
+    Test if the statistics computed from the snapshot match the database.
+    """
+    directory = 'analytics_test'
+
+    def setUp(self) -> None:
+        self.snapshot = AnalyticsSnapshot(self.directory)
+
+    def tearDown(self) -> None:
+        rmtree(self.directory)
+
+    def test_department_statistics(self) -> None:
+        """
+        Compare the statistics of a department with the same statistics queried.
+        """
+        statistics = department_statistics(self.snapshot.load(), 0)
+        ratios = [ratio for ratio, in global_query_handler.execute_query(
+            "SELECT plagiarism_ratio FROM Thesis JOIN Has ON Has.thesis_id = Thesis.thesis_id"
+            " JOIN USER_ ON USER_.user_id = Has.student_id WHERE USER_.department_id = 0")]
+        self.assertEqual(statistics['plagiarism_ratio']['count'], len(ratios))
+        self.assertEqual(sum(statistics['plagiarism_ratio']['histogram']['counts']), len(ratios))
+        self.assertAlmostEqual(statistics['plagiarism_ratio']['mean'], sum(ratios) / len(ratios))
+        with global_query_handler.department_scope(0):
+            statuses = dict(global_query_handler.execute_query(
+                "SELECT status, COUNT(*) FROM DissertationStatus JOIN Defending"
+                " ON Defending.dissertation_id = DissertationStatus.dissertation_id"
+                " JOIN USER_ ON USER_.user_id = Defending.student_id WHERE USER_.department_id = 0 GROUP BY status"))
+        self.assertEqual({status: count for status, count in statistics['dissertations']['statuses'].items() if count},
+                         statuses)
+        by_department = statistics_by_department(self.snapshot.columns)
+        self.assertEqual(by_department[0]['theses'], len(ratios))
+        self.assertEqual(by_department[0]['dissertations'], sum(statuses.values()))
+
+    def test_new_export(self) -> None:
+        """
+        A new export is picked up by the next load.
+        """
+        self.snapshot.load()
+        first_export = self.snapshot.exported_at
+        global_query_handler.execute_query("INSERT INTO Instructor (student_id, advisor_id) VALUES (28, 24)")
+        try:
+            self.snapshot.export()
+            loads = self.snapshot.load()['advisors']
+            self.assertGreater(self.snapshot.exported_at, first_export)
+            self.assertEqual(int(loads['load'][loads['advisor_id'] == 24][0]), 1)
+        finally:
+            global_query_handler.execute_query("DELETE FROM Instructor WHERE student_id = 28")
+
+    def test_load_during_export(self) -> None:
+        """
+        A load made while an export is being written sees the previous export as a whole.
+        """
+        theses = len(self.snapshot.load()['theses']['thesis_id'])
+        first_export = self.snapshot.exported_at
+        execute_gathered_query = global_query_handler.execute_gathered_query
+        seen_while_exporting = []
+
+        def query_during_export(query: str):
+            if query.startswith("SELECT Dissertation.dissertation_id"):  # The theses are already written.
+                reader = AnalyticsSnapshot(self.directory)
+                columns = reader.load()
+                seen_while_exporting.append((len(columns['theses']['thesis_id']), reader.exported_at))
+            return execute_gathered_query(query)
+        with global_query_handler.department_scope(0):  # Of the student 28.
+            global_query_handler.execute_query("INSERT INTO Thesis (file_path, original_name, plagiarism_ratio,"
+                                               " submission_date) VALUES ('theses/new.pdf', 'new.pdf', 5, 1621129280)")
+            thesis_id = global_query_handler.last_inserted_row_id()
+            global_query_handler.execute_query(f"INSERT INTO Has (thesis_id, student_id) VALUES ({thesis_id}, 28)")
+        try:
+            with patch.object(global_query_handler, 'execute_gathered_query', side_effect=query_during_export):
+                self.snapshot.export()
+            self.assertEqual(seen_while_exporting, [(theses, first_export)])
+            self.assertEqual(len(self.snapshot.load()['theses']['thesis_id']), theses + 1)
+        finally:
+            with global_query_handler.department_scope(0):
+                global_query_handler.execute_query(f"DELETE FROM Has WHERE thesis_id = {thesis_id}")
+                global_query_handler.execute_query(f"DELETE FROM Thesis WHERE thesis_id = {thesis_id}")
+
+
+class TestSerializers(unittest.TestCase):
+    """
+    Test if the serializers of the bound classes match asdict, except
+        for the hidden fields.
+    """
+    def test_hidden_fields(self) -> None:
+        """
+        The password is hidden by User_, hence by every kind of user.
+        """
+        for class_, user_id in ((Student, 17), (Advisor, 1), (Jury, 20), (DBR, 18)):
+            with self.subTest(class_=class_):
+                user = class_.fetch(user_id)
+                expected = asdict(user)
+                del expected['password']
+                self.assertEqual(user.serialize(), expected)
+        thesis_id = global_query_handler.execute_query("SELECT MIN(thesis_id) FROM Thesis")[0][0]
+        serialized = Thesis.fetch(thesis_id).serialize()
+        self.assertNotIn('file_path', serialized)
+        self.assertEqual(serialized['thesis_id'], thesis_id)
+
+    def test_flat_copy(self) -> None:
+        proposal = Proposal(-1, 17, 3)
+        serialized = proposal.serialize()
+        self.assertEqual(serialized, {'proposal_id': -1, 'student_id': 17, 'advisor_id': 3})
+        serialized['advisor_id'] = 4
+        self.assertEqual(proposal.advisor_id, 3)
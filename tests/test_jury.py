@@ -106,3 +106,42 @@ class TestAddJuryAsAdvisor(flask_unittest.ClientTestCase):
         resp = client.get(f'/jury/{resp.json["jury_id"]}')
         self.assertStatus(resp, 200)
         self.assertLessEqual(jury_add_command.items(), resp.json.items())
+
+
+class TestProvisionJuries(flask_unittest.ClientTestCase):
+    """
+    Advisors added out of band are listed as jury members, and made
+        ones by the provisioning command rather than by listing them.
+    """
+    app = create_app()
+    advisor_id = 900
+
+    def setUp(self, client: FlaskClient) -> None:
+        with connect('test.db') as db:
+            cur = db.cursor()
+            cur.execute(f"INSERT INTO User_ VALUES ({self.advisor_id}, 'Halil', 'Inalcik', 'NULL',"
+                        " 'inalcik@iyte.edu.tr', 1)")
+            cur.execute(f"INSERT INTO Advisor VALUES ({self.advisor_id}, 'Ottoman Empire')")
+            db.commit()
+        client.post('/jwt', json={"username": "hopkins@iyte.edu.tr", "password": "test+7348"})
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+        with connect('test.db') as db:
+            cur = db.cursor()
+            cur.execute(f"DELETE FROM Jury WHERE jury_id = {self.advisor_id}")
+            cur.execute(f"DELETE FROM Advisor WHERE advisor_id = {self.advisor_id}")
+            cur.execute(f"DELETE FROM User_ WHERE user_id = {self.advisor_id}")
+            db.commit()
+
+    def test_advisor_without_jury_row(self, client: FlaskClient) -> None:
+        resp = client.get('/jury')
+        self.assertStatus(resp, 200)
+        self.assertIn(self.advisor_id, resp.json['jury_members'])
+        resp = client.get(f'/jury/{self.advisor_id}')
+        self.assertStatus(resp, 404)  # Listing the jury members does not write.
+        result = self.app.test_cli_runner().invoke(args=['db-provision-juries', str(self.advisor_id)])
+        self.assertEqual(result.output, "Made 1 advisors jury members.\n")
+        resp = client.get(f'/jury/{self.advisor_id}')
+        self.assertStatus(resp, 200)
+        self.assertEqual(resp.json['jury_id'], self.advisor_id)
@@ -98,3 +98,11 @@ class TestDBRRecommendationsFail(flask_unittest.ClientTestCase):
         resp = client.get('/recommendations/needed')
         self.assertStatus(resp, 200)
         self.assertDictEqual(students_without_recommendations, resp.json)
+
+    def test_recommend_with_invalid_count(self, client: FlaskClient) -> None:
+        """
+        Attempt to recommend advisors to the students in need, fails because the count is not a positive integer.
+        """
+        for count in (True, 0, '3'):
+            resp = client.post('/recommendations/needed', json={'count': count})
+            self.assertStatus(resp, 400)
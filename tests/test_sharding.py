@@ -0,0 +1,104 @@
+import sys
+from os import environ, remove
+from shutil import rmtree
+from unittest.mock import patch
+
+import flask_unittest
+from flask.testing import FlaskClient
+
+environ['FLASK_DB_NAME'] = 'test.db'  # This must be set before first importing the backend itself.
+from mbsbackend import create_app
+from mbsbackend.datatypes import database
+from mbsbackend.datatypes.database import ShardedQueryHandler, global_query_handler
+
+
+class TestShardedRoutes(flask_unittest.ClientTestCase):
+    """
+    Test if the main routes answer the same when the departments are sharded.
+    """
+    app = create_app()
+    db_name = 'sharded_routes_test.db'
+    shard_directory = 'sharded_routes_test'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.handler = ShardedQueryHandler(cls.db_name, cls.shard_directory)
+        cls.patches = [patch.object(module, 'global_query_handler', cls.handler) for name, module in
+                       list(sys.modules.items()) if name.startswith('mbsbackend')
+                       and getattr(module, 'global_query_handler', None) is global_query_handler]
+        for module_patch in cls.patches:
+            module_patch.start()
+        cls._forget_cached_rows()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        for module_patch in cls.patches:
+            module_patch.stop()
+        cls._forget_cached_rows()
+        for handler in [cls.handler, *cls.handler.shards.values()]:
+            handler.connection.close()
+        remove(cls.db_name)
+        rmtree(cls.shard_directory)
+
+    @staticmethod
+    def _forget_cached_rows() -> None:
+        """
+        Drop the rows cached from the other query handler.
+        """
+        database.invalidate_id_indexes()
+        database.invalidate_reference_tables()
+        database._notify_reset()
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+
+    def test_advisor_dashboard(self, client: FlaskClient) -> None:
+        """
+        The latest theses of the students are read from the shards, not from their stale summaries.
+        """
+        client.post('/jwt', json={"username": "oliver@iyte.edu.tr", "password": "test+7348"})
+        resp = client.get('/dashboard')
+        self.assertStatus(resp, 200)
+        self.assertEqual([student['student_id'] for student in resp.json['students']], [17, 26])
+        self.assertEqual(resp.json['students'][0]['latest_thesis_id'], 1)
+        self.assertEqual(resp.json['students'][0]['status'], 'Undecided')
+        self.assertEqual(resp.json['pending_evaluations'], [17])
+
+    def test_jury_dashboard(self, client: FlaskClient) -> None:
+        """
+        Defenders of several departments are gathered.
+        """
+        client.post('/jwt', json={"username": "obrien@metu.edu.tr", "password": "test+7348"})
+        resp = client.get('/dashboard')
+        self.assertStatus(resp, 200)
+        self.assertCountEqual([defender['student_id'] for defender in resp.json['defenders']],
+                              [17, 15, 22, 21, 31, 32, 33])
+        resp = client.get('/dissertation/22')
+        self.assertStatus(resp, 200)
+
+    def test_dbr_dashboard(self, client: FlaskClient) -> None:
+        """
+        The department of the DBR is read from its own shard.
+        """
+        client.post('/jwt', json={"username": "welman@pers.iyte.edu.tr", "password": "test+7348"})
+        resp = client.get('/dashboard')
+        self.assertStatus(resp, 200)
+
+    def test_student_info(self, client: FlaskClient) -> None:
+        """
+        Students read their own summary, which falls back to their theses.
+        """
+        client.post('/jwt', json={"username": "grey@std.iyte.edu.tr", "password": "test+7348"})
+        resp = client.get('/users')
+        self.assertStatus(resp, 200)
+        self.assertEqual(resp.json['student']['latest_thesis_id'], 1)
+
+    def test_add_recommendation(self, client: FlaskClient) -> None:
+        """
+        Writes are routed to the shard of the student.
+        """
+        client.post('/jwt', json={"username": "welman@pers.iyte.edu.tr", "password": "test+7348"})
+        resp = client.post('/recommendations/2', json={'advisor_id': 6})
+        self.assertStatus(resp, 201)
+        resp = client.get('/recommendations/2')
+        self.assertIn(6, resp.json['recommended_advisors'])
@@ -5,6 +5,7 @@ from flask.testing import FlaskClient
 
 environ['FLASK_DB_NAME'] = 'test.db'  # This must be set before first importing the backend itself.
 from mbsbackend import create_app
+from mbsbackend.server_internals.verification import full_json
 
 
 class TestRestrictedEndpoint(flask_unittest.ClientTestCase):
@@ -24,3 +25,59 @@ class TestRestrictedEndpoint(flask_unittest.ClientTestCase):
         """
         resp = client.get('/advisors')
         self.assertStatus(resp, 403)
+
+
+class TestRequestValidation(flask_unittest.ClientTestCase):
+    app = create_app()
+
+    def setUp(self, client: FlaskClient) -> None:
+        client.post('/jwt', json={"username": "hopkins@iyte.edu.tr", "password": "test+7348"})
+
+    def tearDown(self, client: FlaskClient) -> None:
+        client.delete('/jwt')  # Logout.
+
+    def test_missing_required_key(self, client: FlaskClient) -> None:
+        """
+        Adding a jury member without all of their details should fail
+            before reaching the route.
+        """
+        resp = client.post('/jury', json={"name_": "Charlotte Froese", "surname": "Fischer"})
+        self.assertStatus(resp, 400)
+        self.assertEqual(resp.json['msg'], 'ERROR: Malformed request, does not contain required keys.')
+
+    def test_wrong_key_type(self, client: FlaskClient) -> None:
+        resp = client.post('/evaluation/22', json={"evaluation": 3})
+        self.assertStatus(resp, 400)
+        self.assertEqual(resp.json['msg'], 'ERROR: Malformed request, evaluation must be of type str.')
+        resp = client.post('/dissertation/22', json={"jury_members": [], "dissertation_date": True})
+        self.assertStatus(resp, 400)
+
+    def test_wrong_element_type(self, client: FlaskClient) -> None:
+        """
+        Jury members that are not ids should fail before reaching
+            the route.
+        """
+        for jury_members in [["x"], [{}], [20, True], [20.5]]:
+            resp = client.post('/dissertation/22', json={"jury_members": jury_members, "dissertation_date": 0})
+            self.assertStatus(resp, 400)
+            self.assertEqual(resp.json['msg'], 'ERROR: Malformed request, jury_members must be of type list[int].')
+        resp = client.post('/dissertation/22', json={"jury_members": [], "dissertation_date": 0, "new_members": [3]})
+        self.assertStatus(resp, 400)
+
+    def test_invalid_json(self, client: FlaskClient) -> None:
+        resp = client.post('/evaluation/22', data='{"evaluation": ', content_type='application/json')
+        self.assertStatus(resp, 400)
+        self.assertEqual(resp.json['msg'], 'ERROR: Expected valid JSON in Request body.')
+        resp = client.post('/evaluation/22', json=["evaluation"])
+        self.assertStatus(resp, 400)
+        self.assertEqual(resp.json['msg'], 'ERROR: Expected a JSON object in Request body.')
+
+    def test_misspelled_schema(self, _: FlaskClient) -> None:
+        """
+        A misspelled schema should fail when the route is decorated,
+            rather than silently disable the validation.
+        """
+        with self.assertRaises(TypeError):
+            full_json(requiried_keys=('name_',))
+        with self.assertRaises(TypeError):
+            full_json(required_keys='name_')